@@ -18,6 +18,16 @@ from SimPEG import Solver as SimpegSolver
 __all__ = ['BaseEMProblem', 'BaseEMSurvey', 'BaseEMSrc']
 
 
+def _diagMul(u, v):
+    # sdiag(u)*v. If u holds the fields of several sources (n, nSrc), each
+    # column of u multiplies v (or the matching column of v)
+    if np.ndim(u) == 2 and u.shape[1] > 1:
+        if np.ndim(v) == 1:
+            return u * v[:, None]
+        return u * v
+    return Utils.sdiag(u)*v
+
+
 
 ###############################################################################
 #                                                                             #
@@ -107,6 +117,17 @@ class BaseEMProblem(Problem.BaseProblem):
                 toDelete += self._clear_on_mu_update
         return toDelete
 
+    def _clean_factors(self):
+        """
+        Clean the matrix factors listed in clean_on_model_update. These depend
+        on the physical properties, so they are also cleared if a property is
+        set directly rather than through a model.
+        """
+        for mat in self.clean_on_model_update:
+            if getattr(self, mat, None) is not None:
+                getattr(self, mat).clean()  # clean factors
+                setattr(self, mat, None)  # set to none
+
     @properties.observer('mu')
     def _clear_mu_mats_on_mu_update(self, change):
         if change['previous'] is change['value']:
@@ -120,6 +141,7 @@ class BaseEMProblem(Problem.BaseProblem):
         for mat in self._clear_on_mu_update:
             if hasattr(self, mat):
                 delattr(self, mat)
+        self._clean_factors()
 
     @properties.observer('mui')
     def _clear_mu_mats_on_mui_update(self, change):
@@ -134,6 +156,7 @@ class BaseEMProblem(Problem.BaseProblem):
         for mat in self._clear_on_mu_update:
             if hasattr(self, mat):
                 delattr(self, mat)
+        self._clean_factors()
 
     @properties.observer('sigma')
     def _clear_sigma_mats_on_sigma_update(self, change):
@@ -148,6 +171,7 @@ class BaseEMProblem(Problem.BaseProblem):
         for mat in self._clear_on_sigma_update:
             if hasattr(self, mat):
                 delattr(self, mat)
+        self._clean_factors()
 
     @properties.observer('rho')
     def _clear_sigma_mats_on_rho_update(self, change):
@@ -162,6 +186,7 @@ class BaseEMProblem(Problem.BaseProblem):
         for mat in self._clear_on_sigma_update:
             if hasattr(self, mat):
                 delattr(self, mat)
+        self._clean_factors()
 
     @property
     def Me(self):
@@ -232,8 +257,8 @@ class BaseEMProblem(Problem.BaseProblem):
 
         if v is not None:
             if adjoint is True:
-                return self._MfMuiDeriv.T*(Utils.sdiag(u)*v)
-            return Utils.sdiag(u)*(self._MfMuiDeriv*v)
+                return self._MfMuiDeriv.T*_diagMul(u, v)
+            return _diagMul(u, self._MfMuiDeriv*v)
         else:
             if adjoint is True:
                 return self._MfMuiDeriv.T*(Utils.sdiag(u))
@@ -294,8 +319,8 @@ class BaseEMProblem(Problem.BaseProblem):
 
         if v is not None:
             if adjoint:
-                return self._MeMuDeriv.T * (Utils.sdiag(u)*v)
-            return Utils.sdiag(u)*(self._MeMuDeriv * v)
+                return self._MeMuDeriv.T * _diagMul(u, v)
+            return _diagMul(u, self._MeMuDeriv*v)
         else:
             if adjoint is True:
                 return self._MeMuDeriv.T * Utils.sdiag(u)
@@ -359,8 +384,8 @@ class BaseEMProblem(Problem.BaseProblem):
 
         if v is not None:
             if adjoint:
-                return self._MeSigmaDeriv.T * (Utils.sdiag(u)*v)
-            return Utils.sdiag(u)*(self._MeSigmaDeriv * v)
+                return self._MeSigmaDeriv.T * _diagMul(u, v)
+            return _diagMul(u, self._MeSigmaDeriv*v)
         else:
             if adjoint is True:
                 return self._MeSigmaDeriv.T * Utils.sdiag(u)
@@ -422,8 +447,8 @@ class BaseEMProblem(Problem.BaseProblem):
 
         if v is not None:
             if adjoint is True:
-                return self._MfRhoDeriv.T*(Utils.sdiag(u)*v)
-            return Utils.sdiag(u)*(self._MfRhoDeriv*v)
+                return self._MfRhoDeriv.T*_diagMul(u, v)
+            return _diagMul(u, self._MfRhoDeriv*v)
         else:
             if adjoint is True:
                 return self._MfRhoDeriv.T*(Utils.sdiag(u))
@@ -481,6 +506,8 @@ class BaseEMSurvey(Survey.BaseSurvey):
         :rtype: numpy.ndarray
         :return: data
         """
+        if isinstance(f, Survey.Data):
+            return f  # forward-only problems stream the data
         data = Survey.Data(self)
         for src in self.srcList:
             for rx in src.rxList:
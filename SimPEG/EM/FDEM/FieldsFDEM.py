@@ -320,6 +320,41 @@ class FieldsFDEM(SimPEG.Problem.Fields):
         )
 
 
+class StreamedFields(object):
+    """
+    Fields of a few sources computed from their solution, which is not
+    stored in a fields object. It stands in for the fields object of the
+    problem when the receivers of a forward-only problem are evaluated,
+    e.g. :code:`rx.eval(src, mesh, StreamedFields(f, u, srcList))`.
+
+    Only the fields of the sources in srcList can be accessed, other
+    attributes are those of f.
+
+    :param FieldsFDEM f: fields object of the problem (no storage is used)
+    :param numpy.ndarray solution: solution of the sources (nP, nSrc)
+    :param list srcList: sources
+    """
+
+    def __init__(self, f, solution, srcList):
+        self.f = f
+        self.solution = solution
+        self.srcList = list(srcList)
+        self._cache = {}
+
+    def __getitem__(self, key):
+        src, name = key
+        i = [s is src for s in self.srcList].index(True)
+        if (i, name) not in self._cache:
+            self._cache[(i, name)] = Utils.mkvc(self.f._fromSolution(
+                name, self.solution[:, [i]], [src]
+            ), 2)
+        return self._cache[(i, name)]
+
+    def __getattr__(self, attr):
+        # grid locations, derivatives, ... of the fields of the problem
+        return getattr(self.f, attr)
+
+
 class Fields3D_e(FieldsFDEM):
     """
     Fields object for Problem3D_e.
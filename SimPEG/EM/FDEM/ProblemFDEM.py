@@ -1,7 +1,8 @@
 from SimPEG import Problem, Utils, Props, Solver as SimpegSolver
 from .SurveyFDEM import Survey as SurveyFDEM
 from .FieldsFDEM import (
-    FieldsFDEM, Fields3D_e, Fields3D_b, Fields3D_h, Fields3D_j
+    FieldsFDEM, Fields3D_e, Fields3D_b, Fields3D_h, Fields3D_j,
+    StreamedFields
 )
 from SimPEG.EM.Base import BaseEMProblem
 from SimPEG.EM.Utils import omega
@@ -9,6 +10,7 @@ from SimPEG.EM.Utils import omega
 import numpy as np
 import scipy.sparse as sp
 from scipy.constants import mu_0
+from multiprocessing.pool import ThreadPool
 
 
 class BaseFDEMProblem(BaseEMProblem):
@@ -60,13 +62,101 @@ class BaseFDEMProblem(BaseEMProblem):
 
     Props.Reciprocal(mu, mui)
 
+    #: clear the matrix factors on any model updates
+    clean_on_model_update = ['_Ainv']
+    #: memory budget (GB) for the stored factors of A, None for no limit
+    maxFactorMemory = None
+    #: number of frequencies solved at the same time (1 is serial)
+    n_cpu = 1
+    #: memory budget (GB) for the factorizations running at the same time,
+    #: limits the number of workers (None for no limit)
+    parallelMemory = None
+    _holdFactors = False  # keep factors in use by a worker from eviction
+    #: if True, fields returns the data projected as each frequency is
+    #: solved and the fields are not stored (no Jvec or Jtvec)
+    forwardOnly = False
+
+    @property
+    def Ainv(self):
+        """
+        Factors of the system matrix, indexed by frequency. These are shared
+        by fields, Jvec and Jtvec and cleared on a model update.
+        """
+        if getattr(self, '_Ainv', None) is None:
+            self._Ainv = Utils.SolverUtils.SolverCache(
+                self.Solver, self.solverOpts, maxMemory=self.maxFactorMemory,
+                counter=self.counter,
+                name='{}.Ainv'.format(self.__class__.__name__)
+            )
+        return self._Ainv
+
+    def getAinv(self, freq, adjoint=False):
+        """
+        Factors of the system matrix at a given frequency
+
+        :param float freq: Frequency
+        :param bool adjoint: factors of the transpose of the system matrix
+        :rtype: SimPEG.Solver
+        :return: solver for A (or its transpose)
+        """
+        return self.Ainv.get(
+            freq, lambda: self.getA(freq), transpose=adjoint,
+            hold=self._holdFactors
+        )
+
+    def _nWorkers(self, freqs):
+        """
+        Number of frequencies that are solved at the same time. This is
+        limited by n_cpu and by the number of factorizations that fit in
+        parallelMemory.
+        """
+        nWorkers = min(int(self.n_cpu), len(freqs))
+        if nWorkers > 1 and self.parallelMemory is not None:
+            factorMemory = Utils.SolverUtils._factorMemory(
+                None, self.getA(freqs[0]), self.Ainv.fillFactor
+            ) * 1e-9
+            nWorkers = min(
+                nWorkers, int(self.parallelMemory // max(factorMemory, 1e-12))
+            )
+        return max(nWorkers, 1)
+
+    def _freqMap(self, func):
+        """
+        Evaluate func(freq) for all frequencies of the survey, on a pool of
+        n_cpu threads if n_cpu > 1. The results are returned in the order of
+        survey.freqs, so they can be assembled as in the serial case.
+
+        :param callable func: function of the frequency
+        :rtype: list
+        :return: [func(freq) for freq in survey.freqs]
+        """
+        freqs = self.survey.freqs
+        nWorkers = self._nWorkers(freqs)
+        if nWorkers == 1:
+            return [func(freq) for freq in freqs]
+
+        def work(freq):
+            try:
+                return func(freq)
+            finally:
+                self.Ainv.release(freq)
+
+        self._holdFactors = True
+        pool = ThreadPool(nWorkers)
+        try:
+            return pool.map(work, freqs, chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+            self._holdFactors = False
+
     def fields(self, m=None):
         """
         Solve the forward problem for the fields.
 
         :param numpy.array m: inversion model (nP,)
         :rtype: numpy.array
-        :return f: forward solution
+        :return f: forward solution (the data if forwardOnly)
         """
 
         if m is not None:
@@ -74,16 +164,46 @@ class BaseFDEMProblem(BaseEMProblem):
 
         f = self.fieldsPair(self.mesh, self.survey)
 
-        for freq in self.survey.freqs:
-            A = self.getA(freq)
+        def solve(freq):
             rhs = self.getRHS(freq)
-            Ainv = self.Solver(A, **self.solverOpts)
-            u = Ainv * rhs
+            Ainv = self.getAinv(freq)
+            return Ainv * rhs
+
+        if self.forwardOnly:
+            return self._streamData(f, solve)
+
+        for freq, u in zip(self.survey.freqs, self._freqMap(solve)):
             Srcs = self.survey.getSrcByFreq(freq)
             f[Srcs, self._solutionType] = u
-            Ainv.clean()
         return f
 
+    def _streamData(self, f, solve):
+        """
+        Data projected from the solution of each frequency as soon as it is
+        computed. The solutions are not stored in f, only those of the
+        frequencies being solved are held in memory.
+
+        :param FieldsFDEM f: fields object of the problem (no storage is used)
+        :param callable solve: solve(freq) returns the solution (nP, nSrc)
+        :rtype: SimPEG.Survey.Data
+        :return: predicted data
+        """
+        def project(freq):
+            Srcs = self.survey.getSrcByFreq(freq)
+            u = np.reshape(solve(freq), (-1, len(Srcs)), order='F')
+            # the receivers evaluate the fields of this frequency only
+            f_freq = StreamedFields(f, u, Srcs)
+            return [
+                (src, rx, rx.eval(src, self.mesh, f_freq))
+                for src in Srcs for rx in src.rxList
+            ]
+
+        data = self.dataPair(self.survey)
+        for d_freq in self._freqMap(project):
+            for src, rx, d in d_freq:
+                data[src, rx] = Utils.mkvc(d)
+        return data
+
     def Jvec(self, m, v, f=None):
         """
         Sensitivity times a vector.
@@ -101,13 +221,10 @@ class BaseFDEMProblem(BaseEMProblem):
 
         self.model = m
 
-        # Jv = self.dataPair(self.survey)
-        Jv = []
-
-        for freq in self.survey.freqs:
-            A = self.getA(freq)
-            # create the concept of Ainv (actually a solve)
-            Ainv = self.Solver(A, **self.solverOpts)
+        def Jvec_freq(freq):
+            Jv = []
+            # factors are shared with the forward
+            Ainv = self.getAinv(freq)
 
             for src in self.survey.getSrcByFreq(freq):
                 u_src = f[src, self._solutionType]
@@ -119,7 +236,12 @@ class BaseFDEMProblem(BaseEMProblem):
                     Jv.append(
                         rx.evalDeriv(src, self.mesh, f, du_dm_v=du_dm_v, v=v)
                     )
-            Ainv.clean()
+            return Jv
+
+        # Jv = self.dataPair(self.survey)
+        Jv = []
+        for Jv_freq in self._freqMap(Jvec_freq):
+            Jv += Jv_freq
         return np.hstack(Jv)
 
     def Jtvec(self, m, v, f=None):
@@ -142,11 +264,11 @@ class BaseFDEMProblem(BaseEMProblem):
         if not isinstance(v, self.dataPair):
             v = self.dataPair(self.survey, v)
 
-        Jtv = np.zeros(m.size)
-
-        for freq in self.survey.freqs:
-            AT = self.getA(freq).T
-            ATinv = self.Solver(AT, **self.solverOpts)
+        def Jtvec_freq(freq):
+            Jtv = []
+            # A is complex symmetric (A.T == A, not Hermitian), so the
+            # transposed solve re-uses the forward factors
+            ATinv = self.getAinv(freq, adjoint=True)
 
             for src in self.survey.getSrcByFreq(freq):
                 u_src = f[src, self._solutionType]
@@ -170,13 +292,18 @@ class BaseFDEMProblem(BaseEMProblem):
 
                     # TODO: this should be taken care of by the reciever?
                     if rx.component is 'real':
-                        Jtv +=   np.array(df_dmT, dtype=complex).real
+                        Jtv.append(  np.array(df_dmT, dtype=complex).real)
                     elif rx.component is 'imag':
-                        Jtv += - np.array(df_dmT, dtype=complex).real
+                        Jtv.append(- np.array(df_dmT, dtype=complex).real)
                     else:
                         raise Exception('Must be real or imag')
+            return Jtv
 
-            ATinv.clean()
+        # sum the contributions in the same order as the serial loop
+        Jtv = np.zeros(m.size)
+        for Jtv_freq in self._freqMap(Jtvec_freq):
+            for Jtv_rx in Jtv_freq:
+                Jtv += Jtv_rx
 
         return Utils.mkvc(Jtv)
 
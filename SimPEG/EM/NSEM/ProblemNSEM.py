@@ -52,15 +52,11 @@ class BaseNSEMProblem(BaseFDEMProblem):
            f = self.fields(m)
         # Set current model
         self.model = m
-        # Initiate the Jv object
-        Jv = self.dataPair(self.survey)
 
-        # Loop all the frequenies
-        for freq in self.survey.freqs:
-            # Get the system
-            A = self.getA(freq)
-            # Factor
-            Ainv = self.Solver(A, **self.solverOpts)
+        def Jvec_freq(freq):
+            Jv = []
+            # Get the factors of the system, shared with the forward
+            Ainv = self.getAinv(freq)
 
             for src in self.survey.getSrcByFreq(freq):
                 # We need fDeriv_m = df/du*du/dm + df/dm
@@ -76,8 +72,15 @@ class BaseNSEMProblem(BaseFDEMProblem):
                 # Calculate the projection derivatives
                 for rx in src.rxList:
                     # Calculate dP/du*du/dm*v
-                    Jv[src, rx] = rx.evalDeriv(src, self.mesh, f, mkvc(du_dm_v)) # wrt uPDeriv_u(mkvc(du_dm))
-            Ainv.clean()
+                    Jv.append((src, rx, rx.evalDeriv(src, self.mesh, f, mkvc(du_dm_v)))) # wrt uPDeriv_u(mkvc(du_dm))
+            return Jv
+
+        # Initiate the Jv object
+        Jv = self.dataPair(self.survey)
+        # Loop all the frequenies
+        for Jv_freq in self._freqMap(Jvec_freq):
+            for src, rx, Jv_rx in Jv_freq:
+                Jv[src, rx] = Jv_rx
         # Return the vectorized sensitivities
         return mkvc(Jv)
 
@@ -101,12 +104,11 @@ class BaseNSEMProblem(BaseFDEMProblem):
         if not isinstance(v, self.dataPair):
             v = self.dataPair(self.survey, v)
 
-        Jtv = np.zeros(m.size)
-
-        for freq in self.survey.freqs:
-            AT = self.getA(freq).T
-
-            ATinv = self.Solver(AT, **self.solverOpts)
+        def Jtvec_freq(freq):
+            Jtv = []
+            # Transposed solve with the factors of the forward (A is
+            # symmetric)
+            ATinv = self.getAinv(freq, adjoint=True)
 
             for src in self.survey.getSrcByFreq(freq):
                 # u_src needs to have both polarizations
@@ -126,13 +128,18 @@ class BaseNSEMProblem(BaseFDEMProblem):
                     # du_dmT needs to be of size (nP,) number of model parameters
                     real_or_imag = rx.component
                     if real_or_imag == 'real':
-                        Jtv +=  np.array(du_dmT, dtype=complex).real
+                        Jtv.append(np.array(du_dmT, dtype=complex).real)
                     elif real_or_imag == 'imag':
-                        Jtv +=  -np.array(du_dmT, dtype=complex).real
+                        Jtv.append(-np.array(du_dmT, dtype=complex).real)
                     else:
                         raise Exception('Must be real or imag')
-            # Clean the factorization, clear memory.
-            ATinv.clean()
+            return Jtv
+
+        # sum the contributions in the same order as the serial loop
+        Jtv = np.zeros(m.size)
+        for Jtv_freq in self._freqMap(Jtvec_freq):
+            for Jtv_rx in Jtv_freq:
+                Jtv += Jtv_rx
         return Jtv
 
 ###################################
@@ -284,25 +291,27 @@ class Problem1D_ePrimSec(BaseNSEMProblem):
             self.model = m
         # Make the fields object
         F = self.fieldsPair(self.mesh, self.survey)
-        # Loop over the frequencies
-        for freq in self.survey.freqs:
+
+        def solve(freq):
             if self.verbose:
                 startTime = time.time()
                 print('Starting work for {:.3e}'.format(freq))
                 sys.stdout.flush()
-            A = self.getA(freq)
             rhs  = self.getRHS(freq)
-            Ainv = self.Solver(A, **self.solverOpts)
+            Ainv = self.getAinv(freq)
             e_s = Ainv * rhs
 
+            if self.verbose:
+                print('Ran for {:f} seconds'.format(time.time()-startTime))
+                sys.stdout.flush()
+            return e_s
+
+        # Loop over the frequencies
+        for freq, e_s in zip(self.survey.freqs, self._freqMap(solve)):
             # Store the fields
             Src = self.survey.getSrcByFreq(freq)[0]
             # NOTE: only store the e_solution(secondary), all other components calculated in the fields object
             F[Src, 'e_1dSolution'] = e_s
-
-            if self.verbose:
-                print('Ran for {:f} seconds'.format(time.time()-startTime))
-                sys.stdout.flush()
         return F
 
 
@@ -452,27 +461,29 @@ class Problem3D_ePrimSec(BaseNSEMProblem):
             self.model = m
 
         F = self.fieldsPair(self.mesh, self.survey)
-        for freq in self.survey.freqs:
+
+        def solve(freq):
             if self.verbose:
                 startTime = time.time()
                 print('Starting work for {:.3e}'.format(freq))
                 sys.stdout.flush()
-            A = self.getA(freq)
             rhs = self.getRHS(freq)
             # Solve the system
-            Ainv = self.Solver(A, **self.solverOpts)
+            Ainv = self.getAinv(freq)
             e_s = Ainv * rhs
 
-            # Store the fields
+            if self.verbose:
+                print('Ran for {:f} seconds'.format(time.time()-startTime))
+                sys.stdout.flush()
+            return e_s
+
+        # Frequencies are solved in parallel if n_cpu > 1, the fields are
+        # stored in the order of the survey
+        for freq, e_s in zip(self.survey.freqs, self._freqMap(solve)):
             Src = self.survey.getSrcByFreq(freq)[0]
             # Store the fields
             # Use self._solutionType
             F[Src, 'e_pxSolution'] = e_s[:, 0]
             F[Src, 'e_pySolution'] = e_s[:, 1]
             # Note curl e = -iwb so b = -curl/iw
-
-            if self.verbose:
-                print('Ran for {:f} seconds'.format(time.time()-startTime))
-                sys.stdout.flush()
-            Ainv.clean()
         return F
@@ -6,11 +6,16 @@ from __future__ import unicode_literals
 from SimPEG import Utils
 from SimPEG.EM.Base import BaseEMProblem
 from .SurveyDC import Survey
+from . import RxDC as Rx
+from . import SrcDC as Src
 from .FieldsDC import FieldsDC, Fields_CC, Fields_N
 import numpy as np
 import scipy as sp
+import scipy.sparse as sparse
+import hashlib
 from SimPEG.Utils import Zero
 from .BoundaryUtils import getxBCyBC_CC
+from . import SensitivityDC
 
 
 class BaseDCProblem(BaseEMProblem):
@@ -22,23 +27,207 @@ class BaseDCProblem(BaseEMProblem):
     Ainv = None
     storeJ = False
     _Jmatrix = None
+    maxBlockMemory = 0.5  #: Memory (GB) of the blocks of adjoint solves of J
+    sensitivityPath = None  #: Directory of a memory mapped J (None in memory)
+    _AinvKey = None
+    _f = None
+    _fKey = None
+    superposition = False  #: Solve once per electrode (phi receivers only)
+    _electrodes = None
+    _electrodeFields = None
+    _electrodeFieldsKey = None
+
+    @property
+    def modelKey(self):
+        """
+        Fingerprint of the conductivity model. The factors of A and the
+        fields are re-used as long as it is unchanged.
+        """
+        return hashlib.sha1(
+            np.ascontiguousarray(self.sigma, dtype=float)
+        ).hexdigest()
+
+    def _count(self, prop):
+        if self.counter is not None:
+            self.counter.count(
+                '{}.{}'.format(self.__class__.__name__, prop)
+            )
+
+    def getAinv(self):
+        """
+        Factors of A for the current model, only re-computed if the
+        conductivity has changed.
+        """
+        key = self.modelKey
+        if self.Ainv is not None and self._AinvKey == key:
+            self._count('Ainv.hit')
+            return self.Ainv
+
+        self._count('Ainv.miss')
+        if self.Ainv is not None:
+            self.Ainv.clean()
+
+        A = self.getA()
+        solverOpts = dict(self.solverOpts)
+        if getattr(self.Solver, '_geometric', False):
+            # geometric solvers (e.g. SolverMG) need the mesh
+            solverOpts.setdefault('mesh', self.mesh)
+        self.Ainv = self.Solver(A, **solverOpts)
+        self._AinvKey = key
+        return self.Ainv
 
     def fields(self, m=None):
         if m is not None:
             self.model = m
 
-        if self.Ainv is not None:
-            self.Ainv.clean()
+        # Re-use the fields of the same model and survey
+        key = (self.survey, self.modelKey)
+        if self._f is not None and self._fKey == key:
+            self._count('fields.hit')
+            return self._f
+        self._count('fields.miss')
 
         f = self.fieldsPair(self.mesh, self.survey)
-        A = self.getA()
-        self.Ainv = self.Solver(A, **self.solverOpts)
-        RHS = self.getRHS()
-        u = self.Ainv * RHS
+        if self.superposition:
+            u = self._superposeFields()
+        else:
+            Ainv = self.getAinv()
+            RHS = self.getRHS()
+            u = Ainv * RHS
         Srcs = self.survey.srcList
         f[Srcs, self._solutionType] = u
+
+        self._f, self._fKey = f, key
         return f
 
+    def getElectrodes(self):
+        """
+        Unique electrodes of the survey, see Survey.getElectrodes, and for
+        each datum (in the order of the data) the index of its A, B, M and
+        N electrodes, with the weights of the B and N electrodes (0 for
+        pole sources and receivers).
+
+        :rtype: tuple
+        :return: (locations (nE, dim), indices (nD, 4), wB (nD,), wN (nD,))
+        """
+        if self._electrodes is not None and self._electrodes[0] is self.survey:
+            return self._electrodes[1]
+
+        locs, inds = self.survey.getElectrodes()
+
+        rows, wB, wN = [], [], []
+        start = 0
+        for src in self.survey.srcList:
+            for rx in src.rxList:
+                assert rx.rxType == 'phi', (
+                    'Superposition is only implemented for phi receivers'
+                )
+                ind = np.arange(start, start+rx.nD)
+                start += rx.nD
+
+                if isinstance(rx, Rx.Dipole):
+                    pole = (
+                        np.linalg.norm(rx.locs[0]-rx.locs[1], axis=1) <=
+                        rx.threshold
+                    )
+                    # Dipoles first, as in Rx.Dipole.getP
+                    rows.append(np.r_[ind[~pole], ind[pole]])
+                    wN.append(np.r_[-np.ones((~pole).sum()), np.zeros(pole.sum())])
+                else:
+                    rows.append(ind)
+                    wN.append(np.zeros(rx.nD))
+
+                if isinstance(src, Src.Pole):
+                    wB.append(np.zeros(rx.nD))
+                else:
+                    wB.append(-np.ones(rx.nD))
+
+        electrodes = (
+            locs, inds[np.hstack(rows), :], np.hstack(wB), np.hstack(wN)
+        )
+        self._electrodes = (self.survey, electrodes)
+        return electrodes
+
+    def getElectrodeFields(self):
+        """
+        Potentials of unit pole sources at the current electrodes (U) and
+        adjoint fields of pole receivers at the potential electrodes (V).
+        Each is solved once per unique electrode, the fields and
+        sensitivities of all sources and receivers are assembled by
+        superposition and reciprocity.
+
+        :rtype: tuple
+        :return: (U, V, indices (nD, 4) of the columns of U and V for the
+            A, B, M and N electrodes of each datum)
+        """
+        key = (self.survey, self.modelKey)
+        if (
+            self._electrodeFields is not None and
+            self._electrodeFieldsKey == key
+        ):
+            return self._electrodeFields
+
+        locs, inds, _, _ = self.getElectrodes()
+        Ainv = self.getAinv()
+
+        srcE = np.unique(inds[:, :2])
+        rxE = np.unique(inds[:, 2:])
+
+        # Unit pole sources, as in Src.Pole
+        if self._formulation == 'HJ':
+            n = self.mesh.nC
+            cells = Utils.closestPoints(self.mesh, locs[srcE], gridLoc='CC')
+            Q = sparse.csr_matrix(
+                (np.ones(srcE.size), (cells, np.arange(srcE.size))),
+                shape=(n, srcE.size)
+            )
+            Gloc = 'CC'
+        elif self._formulation == 'EB':
+            n = self.mesh.nN
+            Q = self.mesh.getInterpolationMat(locs[srcE], locType='N').T
+            Gloc = 'N'
+
+        # Pole receivers measuring phi at the electrodes
+        P = self.mesh.getInterpolationMat(locs[rxE], Gloc)
+
+        U = Ainv * Q.toarray()
+        V = Ainv * P.T.toarray()
+
+        # Columns of U and V of each electrode
+        colU = -np.ones(locs.shape[0], dtype=int)
+        colU[srcE] = np.arange(srcE.size)
+        colV = -np.ones(locs.shape[0], dtype=int)
+        colV[rxE] = np.arange(rxE.size)
+
+        cols = np.c_[
+            colU[inds[:, 0]], colU[inds[:, 1]],
+            colV[inds[:, 2]], colV[inds[:, 3]]
+        ]
+
+        self._electrodeFields = (
+            U.reshape((n, -1)), V.reshape((n, -1)), cols
+        )
+        self._electrodeFieldsKey = key
+        return self._electrodeFields
+
+    def _superposeFields(self):
+        """
+        Fields of all sources from the potentials of the electrodes
+        """
+        _, _, wB, _ = self.getElectrodes()
+        U, _, cols = self.getElectrodeFields()
+
+        Srcs = self.survey.srcList
+        u = np.zeros((U.shape[0], len(Srcs)))
+        start = 0
+        for i, src in enumerate(Srcs):
+            # A and B electrodes of the first datum of the source
+            u[:, i] = src.current * (
+                U[:, cols[start, 0]] + wB[start] * U[:, cols[start, 1]]
+            )
+            start += src.nD
+        return u
+
     def getJ(self, m, f=None):
         """
             Generate Full sensitivity matrix
@@ -70,19 +259,44 @@ class BaseDCProblem(BaseEMProblem):
         if f is None:
             f = self.fields(m)
 
+        if self.superposition:
+            return self._superposeJvec(v, f)
+
         Jv = []
+        Ainv = self.getAinv()
 
         for src in self.survey.srcList:
             u_src = f[src, self._solutionType]  # solution vector
             dA_dm_v = self.getADeriv(u_src, v)
             dRHS_dm_v = self.getRHSDeriv(src, v)
-            du_dm_v = self.Ainv * (- dA_dm_v + dRHS_dm_v)
+            du_dm_v = Ainv * (- dA_dm_v + dRHS_dm_v)
             for rx in src.rxList:
                 df_dmFun = getattr(f, '_{0!s}Deriv'.format(rx.projField), None)
                 df_dm_v = df_dmFun(src, du_dm_v, v, adjoint=False)
                 Jv.append(rx.evalDeriv(src, self.mesh, f, df_dm_v))
         return np.hstack(Jv)
 
+    def _superposeJvec(self, v, f):
+        """
+        J*v from the adjoint fields of the potential electrodes
+        """
+        _, _, _, wN = self.getElectrodes()
+        _, V, cols = self.getElectrodeFields()
+
+        Jv = []
+        start = 0
+        for src in self.survey.srcList:
+            u_src = f[src, self._solutionType]  # solution vector
+            dA_dm_v = self.getADeriv(u_src, v)
+            dRHS_dm_v = self.getRHSDeriv(src, v)
+            # Potentials of A^-1 (-dA_dm_v + dRHS_dm_v) at the electrodes
+            phi = V.T.dot(- dA_dm_v + dRHS_dm_v)
+
+            rows = slice(start, start+src.nD)
+            Jv.append(phi[cols[rows, 2]] + wN[rows] * phi[cols[rows, 3]])
+            start += src.nD
+        return np.hstack(Jv)
+
     def Jtvec(self, m, v, f=None):
         """
             Compute adjoint sensitivity matrix (J^T) and vector (v) product.
@@ -106,52 +320,94 @@ class BaseDCProblem(BaseEMProblem):
             Full J matrix can be computed by inputing v=None
         """
 
-        if v is not None:
-            # Ensure v is a data object.
-            if not isinstance(v, self.dataPair):
-                v = self.dataPair(self.survey, v)
-            Jtv = np.zeros(m.size)
-        else:
-            # This is for forming full sensitivity matrix
-            Jtv = np.zeros((self.model.size, self.survey.nD), order='F')
-            istrt = int(0)
-            iend = int(0)
+        if self.superposition:
+            return self._superposeJtvec(m, v, f)
+
+        Ainv = self.getAinv()
+
+        if v is None:
+            # This is for forming full sensitivity matrix, by blocks of
+            # receivers
+            def JtFun(src, ATinvdf_duT):
+                u_src = f[src, self._solutionType]
+                dA_dmT = self.getADeriv(u_src, ATinvdf_duT, adjoint=True)
+                dRHS_dmT = self.getRHSDeriv(src, ATinvdf_duT, adjoint=True)
+                return -dA_dmT + dRHS_dmT
+
+            return SensitivityDC.assembleJ(
+                self, f, Ainv, JtFun, self.model.size,
+                maxBlockMemory=self.maxBlockMemory, path=self.sensitivityPath
+            ).T
+
+        # Ensure v is a data object.
+        if not isinstance(v, self.dataPair):
+            v = self.dataPair(self.survey, v)
+        Jtv = np.zeros(m.size)
 
         for src in self.survey.srcList:
             u_src = f[src, self._solutionType].copy()
             for rx in src.rxList:
                 # wrt f, need possibility wrt m
-                if v is not None:
-                    PTv = rx.evalDeriv(
-                        src, self.mesh, f, v[src, rx], adjoint=True
-                    )
-                else:
-                    # This is for forming full sensitivity matrix
-                    PTv = rx.getP(self.mesh, rx.projGLoc(f)).toarray().T
+                PTv = rx.evalDeriv(
+                    src, self.mesh, f, v[src, rx], adjoint=True
+                )
                 df_duTFun = getattr(f, '_{0!s}Deriv'.format(rx.projField),
                                     None)
                 df_duT, df_dmT = df_duTFun(src, None, PTv, adjoint=True)
 
-                ATinvdf_duT = self.Ainv * df_duT
+                ATinvdf_duT = Ainv * df_duT
 
                 dA_dmT = self.getADeriv(u_src, ATinvdf_duT, adjoint=True)
                 dRHS_dmT = self.getRHSDeriv(src, ATinvdf_duT, adjoint=True)
                 du_dmT = -dA_dmT + dRHS_dmT
-                if v is not None:
-                    Jtv += (df_dmT + du_dmT).astype(float)
-                else:
-                    iend = istrt + rx.nD
-                    if rx.nD == 1:
-                        Jtv[:, istrt] = (df_dmT + du_dmT)
-                    else:
-                        Jtv[:, istrt:iend] = (df_dmT + du_dmT)
-                    istrt += rx.nD
+                Jtv += (df_dmT + du_dmT).astype(float)
+
+        return Utils.mkvc(Jtv)
+
+    def _superposeJtvec(self, m, v=None, f=None):
+        """
+        J.T*v, or J.T if v is None, by reciprocity: the adjoint fields of
+        the receivers are combinations of the adjoint fields of the
+        potential electrodes.
+        """
+        _, _, _, wN = self.getElectrodes()
+        _, V, cols = self.getElectrodeFields()
 
         if v is not None:
-            return Utils.mkvc(Jtv)
+            if isinstance(v, self.dataPair):
+                v = v.tovec()
+            Jtv = np.zeros(m.size)
         else:
-            # return np.hstack(Jtv)
-            return Jtv
+            # This is for forming full sensitivity matrix
+            Jtv = np.zeros((self.model.size, self.survey.nD), order='F')
+
+        start = 0
+        for src in self.survey.srcList:
+            u_src = f[src, self._solutionType].copy()
+            rows = slice(start, start+src.nD)
+            iM, iN = cols[rows, 2], cols[rows, 3]
+
+            if v is not None:
+                # P.T*v on the potential electrodes
+                PTv = np.zeros(V.shape[1])
+                np.add.at(PTv, iM, v[rows])
+                np.add.at(PTv, iN, wN[rows] * v[rows])
+                ATinvdf_duT = V.dot(PTv)
+            else:
+                ATinvdf_duT = V[:, iM] + V[:, iN] * wN[rows]
+
+            dA_dmT = self.getADeriv(u_src, ATinvdf_duT, adjoint=True)
+            dRHS_dmT = self.getRHSDeriv(src, ATinvdf_duT, adjoint=True)
+            du_dmT = -dA_dmT + dRHS_dmT
+            if v is not None:
+                Jtv += du_dmT.astype(float)
+            else:
+                Jtv[:, rows] = du_dmT.reshape((Jtv.shape[0], -1))
+            start += src.nD
+
+        if v is not None:
+            return Utils.mkvc(Jtv)
+        return Jtv
 
     def getSourceTerm(self):
         """
@@ -180,6 +436,10 @@ class BaseDCProblem(BaseEMProblem):
         toDelete = super(BaseDCProblem, self).deleteTheseOnModelUpdate
         if self._Jmatrix is not None:
             toDelete += ['_Jmatrix']
+        if self._f is not None:
+            toDelete += ['_f']
+        if self._electrodeFields is not None:
+            toDelete += ['_electrodeFields']
         return toDelete
 
 
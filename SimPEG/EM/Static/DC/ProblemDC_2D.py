@@ -11,7 +11,10 @@ from .FieldsDC import FieldsDC, Fields_CC, Fields_N
 import numpy as np
 from SimPEG.Utils import Zero
 from .BoundaryUtils import getxBCyBC_CC
+from . import Quadrature
 from scipy.special import kn
+from multiprocessing.pool import ThreadPool
+import threading
 
 
 class BaseDCProblem_2D(BaseEMProblem):
@@ -21,45 +24,238 @@ class BaseDCProblem_2D(BaseEMProblem):
     surveyPair = Survey_ky
     fieldsPair = Fields_ky  # SimPEG.EM.Static.Fields_2D
     fieldsPair_fwd = FieldsDC
-    nky = 15
-    kys = np.logspace(-4, 1, nky)
-    Ainv = [None for i in range(nky)]
-    nT = nky  # Only for using TimeFields
+    kyQuadrature = 'trapezoidal'  #: 'trapezoidal' or 'optimized'
+    kyError = None  #: Expected relative error of the wavenumber integration
+    _nky = None
+    _kys = None
+    _kyWeights = None
+    _Ainv = None
+    #: number of wavenumbers solved at the same time (1 is serial)
+    n_cpu = 1
+    #: concurrency limit: estimated memory (GB) of the factorizations that
+    #: run at the same time, which limits the number of workers (None for
+    #: no limit). The factors of all nky wavenumbers are still stored for
+    #: Jvec and Jtvec, so this does not bound the stored memory
+    parallelMemory = None
     storeJ = False
     _Jmatrix = None
     fix_Jmatrix = False
 
+    @property
+    def nky(self):
+        """
+        Number of wavenumbers, 15 for the trapezoidal and 7 for the
+        optimized quadrature by default
+        """
+        if self._kys is not None:
+            return len(self._kys)
+        if self._nky is not None:
+            return self._nky
+        if self.kyQuadrature == 'optimized':
+            return 7
+        return 15
+
+    @nky.setter
+    def nky(self, value):
+        self._nky = int(value)
+        self._kys, self._kyWeights = None, None
+
+    @property
+    def nT(self):
+        # Only for using TimeFields
+        return self.nky
+
+    @property
+    def kys(self):
+        """
+        Wavenumbers of the 2D problems
+        """
+        if self._kys is None:
+            self.setKyQuadrature()
+        return self._kys
+
+    @kys.setter
+    def kys(self, value):
+        self._kys = np.asarray(value, dtype=float)
+        self._kyWeights = None
+        self.kyError = None
+
+    @property
+    def kyWeights(self):
+        """
+        Quadrature weights of the wavenumbers, the potentials at y=0 are
+        1/pi * sum(kyWeights * potentials(kys))
+        """
+        if self._kyWeights is None:
+            if self._kys is None:
+                self.setKyQuadrature()
+            else:
+                self._kyWeights = Quadrature.trapezoidalWeights(self._kys)
+        return self._kyWeights
+
+    def _kyDistances(self, nr=100):
+        """
+        Distances between the electrodes of the survey and the cells of the
+        mesh, at least the smallest cell size: nr quantiles of the distances
+        (log-spaced between the cell size and the size of the mesh if the
+        problem is not paired).
+        """
+        rmin = min(h.min() for h in self.mesh.h)
+        if not self.ispaired:
+            rmax = max(h.sum() for h in self.mesh.h)
+            return np.logspace(np.log10(rmin), np.log10(max(rmax, rmin)), nr)
+
+        self.survey.getABMN_locations()
+        electrodes = Utils.uniqueRows(np.vstack([
+            self.survey.a_locations, self.survey.b_locations,
+            self.survey.m_locations, self.survey.n_locations
+        ]))[0]
+
+        # quantiles of the distances of each electrode, then of all of them
+        q = np.linspace(0., 100., nr)
+        rs = np.hstack([
+            np.percentile(
+                np.linalg.norm(self.mesh.gridCC - loc, axis=1), q
+            )
+            for loc in electrodes
+        ])
+        return np.maximum(np.percentile(rs, q), rmin)
+
+    def setKyQuadrature(self):
+        """
+        Sets the wavenumbers and weights of the quadrature given by
+        kyQuadrature, and the expected error of the integration
+        (:code:`kyError`) for the distances between the electrodes and the
+        cells of the mesh.
+
+        'trapezoidal' integrates over log-spaced wavenumbers, 'optimized'
+        fits the wavenumbers and non-negative weights to the analytic
+        response of a pole source at these distances, see
+        Quadrature.optimizedKys.
+        """
+        nky = self.nky
+        rs = self._kyDistances()
+
+        if self.kyQuadrature == 'optimized':
+            kys, weights, _ = Quadrature.optimizedKys(rs, nky=nky)
+        elif self.kyQuadrature == 'trapezoidal':
+            kys = np.logspace(-4, 1, nky)
+            weights = Quadrature.trapezoidalWeights(kys)
+        else:
+            raise Exception(
+                "kyQuadrature must be either 'trapezoidal' or 'optimized'"
+            )
+
+        self._kys, self._kyWeights = kys, weights
+        self.kyError = np.abs(
+            Quadrature.quadratureError(kys, weights, rs)
+        ).max()
+
+        if self.verbose:
+            print(
+                ">> {0:d} wavenumbers, expected error {1:.2e}".format(
+                    nky, self.kyError
+                )
+            )
+
+    @property
+    def Ainv(self):
+        """
+        Factors of the 2D system matrices, one per wavenumber. These are
+        stored on the problem, so that several 2.5D problems (e.g. DC and IP)
+        keep their own factors.
+        """
+        if self._Ainv is None:
+            self._Ainv = [None for i in range(self.nky)]
+        return self._Ainv
+
+    @Ainv.setter
+    def Ainv(self, value):
+        self._Ainv = value
+
+    def _nWorkers(self):
+        """
+        Number of wavenumbers that are solved at the same time. This is
+        limited by n_cpu and by the number of factorizations that fit in
+        parallelMemory. Only the concurrency is limited: the factors of
+        every wavenumber are kept once they are computed.
+        """
+        nWorkers = min(int(self.n_cpu), self.nky)
+        if nWorkers > 1:
+            # also builds the mass matrices before the threads start
+            A = self.getA(self.kys[0])
+            if self.parallelMemory is not None:
+                factorMemory = Utils.SolverUtils._factorMemory(
+                    None, A
+                ) * 1e-9
+                nWorkers = min(
+                    nWorkers,
+                    int(self.parallelMemory // max(factorMemory, 1e-12))
+                )
+        return max(nWorkers, 1)
+
+    def _kyMap(self, func):
+        """
+        Evaluate func(iky) for all wavenumbers, on a pool of n_cpu threads if
+        n_cpu > 1. The results are returned in the order of kys.
+
+        :param callable func: function of the index of the wavenumber
+        :rtype: list
+        :return: [func(iky) for iky in range(nky)]
+        """
+        nWorkers = self._nWorkers()
+        if nWorkers == 1:
+            return [func(iky) for iky in range(self.nky)]
+
+        pool = ThreadPool(nWorkers)
+        try:
+            return pool.map(func, range(self.nky), chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+
+    def _solveKys(self):
+        """
+        Factors the system matrix and solves for all the sources at each
+        wavenumber. The previous factors of the problem are cleaned.
+
+        :rtype: list
+        :return: solutions (nC or nN, nSrc) at each wavenumber
+        """
+        for Ainv in self.Ainv:
+            if Ainv is not None:
+                Ainv.clean()
+        self.Ainv = [None for i in range(self.nky)]
+
+        def solve(iky):
+            ky = self.kys[iky]
+            A = self.getA(ky)
+            self.Ainv[iky] = self.Solver(A, **self.solverOpts)
+            RHS = self.getRHS(ky)
+            return self.Ainv[iky] * RHS
+
+        return self._kyMap(solve)
+
     def fields(self, m):
         print ("Compute fields")
         if m is not None:
             self.model = m
-        if self.Ainv[0] is not None:
-            for i in range(self.nky):
-                self.Ainv[i].clean()
         f = self.fieldsPair(self.mesh, self.survey)
         Srcs = self.survey.srcList
-        for iky in range(self.nky):
-            ky = self.kys[iky]
-            A = self.getA(ky)
-            self.Ainv[iky] = self.Solver(A, **self.solverOpts)
-            RHS = self.getRHS(ky)
-            u = self.Ainv[iky] * RHS
+        for iky, u in enumerate(self._solveKys()):
             f[Srcs, self._solutionType, iky] = u
         return f
 
     def fields_to_space(self, f, y=0.):
         f_fwd = self.fieldsPair_fwd(self.mesh, self.survey)
-        # Evaluating Integration using Trapezoidal rules
-        nky = self.kys.size
-        dky = np.diff(self.kys)
-        dky = np.r_[dky[0], dky]
-        phi0 = 1./np.pi*f[:, self._solutionType, 0]
-        phi = np.zeros_like(phi0)
-        for iky in range(nky):
-            phi1 = 1./np.pi*f[:, self._solutionType, iky]
-            phi += phi1*dky[iky]/2.*np.cos(self.kys[iky]*y)
-            phi += phi0*dky[iky]/2.*np.cos(self.kys[iky]*y)
-            phi0 = phi1.copy()
+        # Evaluating Integration using the wavenumber quadrature
+        weights = self.kyWeights
+        phi = np.zeros_like(f[:, self._solutionType, 0])
+        for iky in range(self.nky):
+            phi += (
+                1./np.pi*f[:, self._solutionType, iky]*weights[iky] *
+                np.cos(self.kys[iky]*y)
+            )
         f_fwd[:, self._solutionType] = phi
         return f_fwd
 
@@ -92,18 +288,12 @@ class BaseDCProblem_2D(BaseEMProblem):
         if f is None:
             f = self.fields(m)
 
-        # TODO: This is not a good idea !! should change that as a list
-        Jv = self.dataPair(self.survey)  # same size as the data
-        Jv0 = self.dataPair(self.survey)
-
         # Assume y=0.
         # This needs some thoughts to implement in general when src is dipole
-        dky = np.diff(self.kys)
-        dky = np.r_[dky[0], dky]
-        y = 0.
+        weights = self.kyWeights
 
-        # TODO: this loop is pretty slow .. (Parellize)
-        for iky in range(self.nky):
+        def Jvec_ky(iky):
+            Jv = []
             ky = self.kys[iky]
             for src in self.survey.srcList:
                 u_src = f[src, self._solutionType, iky]  # solution vector
@@ -114,17 +304,15 @@ class BaseDCProblem_2D(BaseEMProblem):
                     df_dmFun = getattr(f, '_{0!s}Deriv'.format(rx.projField),
                                        None)
                     df_dm_v = df_dmFun(iky, src, du_dm_v, v, adjoint=False)
-                    # Trapezoidal intergration
-                    Jv1_temp = 1./np.pi*rx.evalDeriv(ky, src, self.mesh, f,
-                                                     df_dm_v)
-                    if iky == 0:
-                        # First assigment
-                        Jv[src, rx] = Jv1_temp*dky[iky]*np.cos(ky*y)
-                    else:
-                        Jv[src, rx] += Jv1_temp*dky[iky]/2.*np.cos(ky*y)
-                        Jv[src, rx] += Jv0[src, rx]*dky[iky]/2.*np.cos(ky*y)
-                    Jv0[src, rx] = Jv1_temp.copy()
-        return Utils.mkvc(Jv)
+                    # Wavenumber quadrature
+                    Jv.append(
+                        1./np.pi*rx.evalDeriv(ky, src, self.mesh, f, df_dm_v) *
+                        weights[iky]
+                    )
+            return np.hstack(Jv)
+
+        # Wavenumbers are solved in parallel if n_cpu > 1
+        return Utils.mkvc(sum(self._kyMap(Jvec_ky)))
 
     def Jtvec(self, m, v, f=None):
         """
@@ -152,22 +340,16 @@ class BaseDCProblem_2D(BaseEMProblem):
             # Ensure v is a data object.
             if not isinstance(v, self.dataPair):
                 v = self.dataPair(self.survey, v)
-            Jtv = np.zeros(m.size, dtype=float)
 
             # Assume y=0.
-            dky = np.diff(self.kys)
-            dky = np.r_[dky[0], dky]
-            y = 0.
-
-            for src in self.survey.srcList:
-                for rx in src.rxList:
-                    Jtv_temp1 = np.zeros(m.size, dtype=float)
-                    Jtv_temp0 = np.zeros(m.size, dtype=float)
-
-                    # TODO: this loop is pretty slow .. (Parellize)
-                    for iky in range(self.nky):
-                        u_src = f[src, self._solutionType, iky]
-                        ky = self.kys[iky]
+            weights = self.kyWeights
+
+            def Jtvec_ky(iky):
+                Jtv = np.zeros(m.size, dtype=float)
+                ky = self.kys[iky]
+                for src in self.survey.srcList:
+                    u_src = f[src, self._solutionType, iky]
+                    for rx in src.rxList:
                         # wrt f, need possibility wrt m
                         PTv = rx.evalDeriv(ky, src, self.mesh, f, v[src, rx],
                                            adjoint=True)
@@ -185,37 +367,31 @@ class BaseDCProblem_2D(BaseEMProblem):
                                                     adjoint=True)
                         du_dmT = -dA_dmT + dRHS_dmT
                         Jtv_temp1 = 1./np.pi*(df_dmT + du_dmT).astype(float)
-                        # Trapezoidal intergration
-                        if iky == 0:
-                            # First assigment
-                            Jtv += Jtv_temp1*dky[iky]*np.cos(ky*y)
-                        else:
-                            Jtv += Jtv_temp1*dky[iky]/2.*np.cos(ky*y)
-                            Jtv += Jtv_temp0*dky[iky]/2.*np.cos(ky*y)
-                        Jtv_temp0 = Jtv_temp1.copy()
-            return Utils.mkvc(Jtv)
+                        # Wavenumber quadrature
+                        Jtv += Jtv_temp1*weights[iky]
+                return Jtv
+
+            # Wavenumbers are solved in parallel if n_cpu > 1
+            return Utils.mkvc(sum(self._kyMap(Jtvec_ky)))
 
         # This is for forming full sensitivity
         else:
 
             # This is for forming full sensitivity matrix
             Jt = np.zeros((self.model.size, self.survey.nD), order='F')
-            istrt = int(0)
-            iend = int(0)
+            lock = threading.Lock()
 
             # Assume y=0.
-            dky = np.diff(self.kys)
-            dky = np.r_[dky[0], dky]
-            y = 0.
-            for src in self.survey.srcList:
-                for rx in src.rxList:
-                    iend = istrt + rx.nD
-                    Jtv_temp1 = np.zeros((m.size, rx.nD), dtype=float)
-                    Jtv_temp0 = np.zeros((m.size, rx.nD), dtype=float)
-                    # TODO: this loop is pretty slow .. (Parellize)
-                    for iky in range(self.nky):
-                        u_src = f[src, self._solutionType, iky]
-                        ky = self.kys[iky]
+            weights = self.kyWeights
+
+            def Jt_ky(iky):
+                ky = self.kys[iky]
+                istrt = int(0)
+                iend = int(0)
+                for src in self.survey.srcList:
+                    u_src = f[src, self._solutionType, iky]
+                    for rx in src.rxList:
+                        iend = istrt + rx.nD
                         # wrt f, need possibility wrt m
                         P = rx.getP(self.mesh, rx.projGLoc(f)).toarray()
 
@@ -224,22 +400,16 @@ class BaseDCProblem_2D(BaseEMProblem):
                         dA_dmT = self.getADeriv(ky, u_src, ATinvdf_duT,
                                                 adjoint=True)
                         Jtv_temp1 = 1./np.pi*(-dA_dmT)
-                        # Trapezoidal intergration
-                        if iky == 0:
-                            # First assigment
+                        # Wavenumber quadrature, one worker adds at a time
+                        with lock:
                             if rx.nD == 1:
-                                Jt[:, istrt] += Jtv_temp1*dky[iky]*np.cos(ky*y)
+                                Jt[:, istrt] += Jtv_temp1*weights[iky]
                             else:
-                                Jt[:, istrt:iend] += Jtv_temp1*dky[iky]*np.cos(ky*y)
-                        else:
-                            if rx.nD == 1:
-                                Jt[:, istrt] += Jtv_temp1*dky[iky]/2.*np.cos(ky*y)
-                                Jt[:, istrt] += Jtv_temp0*dky[iky]/2.*np.cos(ky*y)
-                            else:
-                                Jt[:, istrt:iend] += Jtv_temp1*dky[iky]/2.*np.cos(ky*y)
-                                Jt[:, istrt:iend] += Jtv_temp0*dky[iky]/2.*np.cos(ky*y)
-                        Jtv_temp0 = Jtv_temp1.copy()
-                    istrt += rx.nD
+                                Jt[:, istrt:iend] += Jtv_temp1*weights[iky]
+                        istrt += rx.nD
+
+            # Wavenumbers are solved in parallel if n_cpu > 1
+            self._kyMap(Jt_ky)
             return Jt
 
     def getSourceTerm(self, ky):
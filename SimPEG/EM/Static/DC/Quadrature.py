@@ -0,0 +1,121 @@
+"""
+Wavenumber quadratures of the 2.5D DC problems.
+
+The potential at y=0 is the inverse cosine transform of the 2D potentials
+
+.. math::
+
+    \\phi(x, z) = \\frac{1}{\\pi} \\int_0^\\infty
+        \\tilde{\\phi}(x, k_y, z) dk_y
+        \\approx \\frac{1}{\\pi} \\sum_i w_i \\tilde{\\phi}(x, k_i, z)
+
+For a pole source in a homogeneous space, :math:`\\tilde{\\phi} \\propto
+K_0(k_y r)` and :math:`\\int_0^\\infty K_0(k_y r) dk_y = \\pi / (2r)`, which
+is used to measure the error of a quadrature over a range of distances.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import numpy as np
+from scipy.special import k0
+from scipy.optimize import minimize, nnls
+
+
+def trapezoidalWeights(kys):
+    """
+    Weights of the trapezoidal integration over the wavenumbers kys. The
+    integral below kys[0] is approximated by a rectangle of width
+    kys[1]-kys[0].
+
+    :param numpy.ndarray kys: wavenumbers
+    :rtype: numpy.ndarray
+    :return: weights
+    """
+    kys = np.asarray(kys, dtype=float)
+    dky = np.diff(kys)
+    weights = np.zeros(kys.size)
+    weights[0] = dky[0]
+    weights[1:] += dky/2.
+    weights[:-1] += dky/2.
+    return weights
+
+
+def quadratureError(kys, weights, rs):
+    """
+    Relative error of the quadrature on the wavenumber integral of a pole
+    source at distances rs
+
+    :param numpy.ndarray kys: wavenumbers
+    :param numpy.ndarray weights: quadrature weights
+    :param numpy.ndarray rs: source-receiver distances
+    :rtype: numpy.ndarray
+    :return: relative error at each distance
+    """
+    rs = np.asarray(rs, dtype=float)
+    A = rs[:, None] * k0(rs[:, None] * np.asarray(kys)[None, :])
+    return A.dot(weights) * 2./np.pi - 1.
+
+
+def _kernel(kys, rs):
+    # 2/pi*r*K0(k*r): the quadrature is exact where its rows sum to one
+    return 2./np.pi * rs[:, None] * k0(rs[:, None] * kys[None, :])
+
+
+def _fitWeights(kys, rs):
+    # Non-negative least-squares weights such that sum(w*r*K0(k*r)) = pi/2,
+    # positive weights do not amplify the round-off of the potentials
+    return nnls(_kernel(kys, rs), np.ones(rs.size))[0]
+
+
+def optimizedKys(rs, nky=7):
+    """
+    Wavenumbers and non-negative weights of a quadrature optimized for a set
+    of source-receiver distances, e.g. the distances between the electrodes
+    and the cells of the mesh.
+
+    The wavenumbers are found by minimizing the error of the quadrature on
+    the analytic response of a pole source at the distances rs, with the
+    weights given by a non-negative least-squares fit for each set of
+    wavenumbers. The wavenumbers are bounded by 0.01/max(rs) and
+    10/min(rs).
+
+    :param numpy.ndarray rs: source-receiver distances
+    :param int nky: number of wavenumbers
+    :rtype: tuple
+    :return: (wavenumbers, weights, maximum relative error)
+    """
+    rs = np.asarray(rs, dtype=float)
+    lower = -np.log10(rs.max()) - 2.
+    upper = -np.log10(rs.min()) + 1.
+
+    def misfit(logk):
+        kys = 10.**np.clip(logk, lower, upper)
+        try:
+            weights = _fitWeights(kys, rs)
+        except RuntimeError:
+            # nnls did not converge, misfit of zero weights
+            return 1.
+        r = _kernel(kys, rs).dot(weights) - 1.
+        return r.dot(r) / rs.size
+
+    # Initial guess: wavenumbers spanning the inverse distances. The
+    # simplex search handles the kinks of the non-negative fit, and is
+    # refined by a gradient search
+    logk0 = np.linspace(-np.log10(rs.max()), -np.log10(rs.min()), nky)
+    out = minimize(
+        misfit, logk0, method='Nelder-Mead',
+        options={'maxiter': 4000*nky, 'xatol': 1e-6, 'fatol': 1e-16}
+    )
+    out = minimize(
+        misfit, out.x, method='L-BFGS-B', bounds=[(lower, upper)]*nky,
+        options={'ftol': 1e-16, 'gtol': 1e-12, 'maxiter': 1000}
+    )
+
+    kys = np.sort(10.**np.clip(out.x, lower, upper))
+    weights = _fitWeights(kys, rs)
+    err = np.abs(quadratureError(kys, weights, rs)).max()
+
+    return kys, weights, err
@@ -127,10 +127,13 @@ class Dipole_ky(BaseRx):
             self._Ps[mesh] = P
         return P
 
-    def eval(self, kys, src, mesh, f):
+    def eval(self, kys, src, mesh, f, weights=None):
         P = self.getP(mesh, self.projGLoc(f))
         Pf = P*f[src, self.projField, :]
-        return self.IntTrapezoidal(kys, Pf, y=0.)
+        if weights is None:
+            return self.IntTrapezoidal(kys, Pf, y=0.)
+        # Wavenumber quadrature
+        return 1./np.pi*Pf.dot(weights)
 
     def evalDeriv(self, ky, src, mesh, f, v, adjoint=False):
         P = self.getP(mesh, self.projGLoc(f))
@@ -208,10 +211,13 @@ class Pole_ky(BaseRx):
 
         return P
 
-    def eval(self, kys, src, mesh, f):
+    def eval(self, kys, src, mesh, f, weights=None):
         P = self.getP(mesh, self.projGLoc(f))
         Pf = P*f[src, self.projField, :]
-        return self.IntTrapezoidal(kys, Pf, y=0.)
+        if weights is None:
+            return self.IntTrapezoidal(kys, Pf, y=0.)
+        # Wavenumber quadrature
+        return 1./np.pi*Pf.dot(weights)
 
     def evalDeriv(self, ky, src, mesh, f, v, adjoint=False):
         P = self.getP(mesh, self.projGLoc(f))
@@ -0,0 +1,145 @@
+"""
+Blocked assembly of the full sensitivity matrix of the DC, IP and SIP
+problems.
+
+The adjoint fields of the receivers do not depend on the source, so the
+projections of many receivers are stacked into one sparse block of right
+hand sides. Each block is solved at once and the rows of J are written in
+place, in a preallocated array (optionally memory mapped on disk).
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import atexit
+import os
+import tempfile
+import weakref
+import numpy as np
+import scipy.sparse as sp
+
+try:
+    from weakref import finalize
+except ImportError:
+    finalize = None  # Python 2
+
+_releaseRefs = set()  # weak references of the Python 2 fallback
+
+
+def createJ(shape, path=None):
+    """
+    Preallocated sensitivity matrix
+
+    :param tuple shape: (nD, nP)
+    :param str path: directory of a memory mapped J, None to keep J in memory.
+        The file of a memory mapped J is deleted when J is released
+    :rtype: numpy.ndarray
+    :return: J, rows of data
+    """
+    if path is None:
+        return np.zeros(shape)
+
+    path = os.path.abspath(os.path.expanduser(path))
+    if not os.path.exists(path):
+        os.makedirs(path)
+    fid, fname = tempfile.mkstemp(dir=path, prefix='J_', suffix='.npy')
+    os.close(fid)
+
+    J = np.lib.format.open_memmap(
+        fname, mode='w+', dtype=float, shape=tuple(shape)
+    )
+    # The file is deleted once J and its views are released, e.g. when J is
+    # rebuilt after a model update, or at exit
+    _onRelease(J, _removeFile, fname)
+    return J
+
+
+def _onRelease(obj, func, *args):
+    # call func(*args) when obj is garbage collected, or at exit
+    if finalize is not None:
+        finalize(obj, func, *args)
+        return
+
+    def callback(ref):
+        _releaseRefs.discard(ref)
+        func(*args)
+
+    _releaseRefs.add(weakref.ref(obj, callback))
+    atexit.register(func, *args)
+
+
+def _removeFile(fname):
+    # remove a file that may already be deleted
+    try:
+        os.remove(fname)
+    except OSError:
+        pass
+
+
+def _blocks(prob, f, nCol):
+    # Groups of (src, rows of J, projections) of at most nCol data, in
+    # the order of the survey. Large sources are split in several blocks.
+    block, nBlock, start = [], 0, 0
+    for src in prob.survey.srcList:
+        P = sp.vstack(
+            [rx.getP(prob.mesh, rx.projGLoc(f)) for rx in src.rxList]
+        ).tocsr()
+        for i0 in range(0, P.shape[0], nCol):
+            Pi = P[i0:i0+nCol]
+            if nBlock + Pi.shape[0] > nCol:
+                yield block
+                block, nBlock = [], 0
+            block.append((src, slice(start, start+Pi.shape[0]), Pi))
+            nBlock += Pi.shape[0]
+            start += Pi.shape[0]
+    if len(block) > 0:
+        yield block
+
+
+def assembleJ(prob, f, Ainv, JtFun, nP, nD=None, maxBlockMemory=0.5,
+              path=None):
+    """
+    Full sensitivity matrix of a problem with potential receivers.
+
+    The adjoint fields :code:`Ainv * P.T` of blocks of receivers are solved
+    at once, with blocks of at most maxBlockMemory (GB) of right hand sides.
+
+    :param SimPEG.Problem.BaseProblem prob: DC, IP or SIP problem
+    :param SimPEG.Fields f: fields
+    :param Ainv: factors of the system matrix
+    :param callable JtFun: JtFun(src, X) returns the columns of J.T
+        (nP, nCol) of the data of src from their adjoint fields X
+    :param int nP: number of model parameters
+    :param int nD: number of rows of J (survey.nD by default)
+    :param float maxBlockMemory: memory (GB) of a block of right hand sides
+    :param str path: directory of a memory mapped J, optional
+    :rtype: numpy.ndarray
+    :return: J (nD, nP)
+    """
+    if nD is None:
+        nD = prob.survey.nD
+
+    J = createJ((nD, nP), path=path)
+    if prob._formulation == 'EB':
+        nMesh = prob.mesh.nN
+    else:
+        nMesh = prob.mesh.nC
+    nCol = max(int(maxBlockMemory*1e9 / (8. * nMesh)), 1)
+
+    for block in _blocks(prob, f, nCol):
+        # One solve for all the receivers of the block
+        PT = sp.vstack([P for _, _, P in block]).T.toarray()
+        X = np.reshape(Ainv * PT, (PT.shape[0], -1))
+        col = 0
+        for src, rows, P in block:
+            nRow = P.shape[0]
+            Jt = JtFun(src, X[:, col:col+nRow])
+            J[rows, :] = np.asarray(Jt).reshape((nP, nRow)).T
+            col += nRow
+
+    if isinstance(J, np.memmap):
+        J.flush()
+
+    return J
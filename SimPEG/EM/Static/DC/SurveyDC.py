@@ -111,6 +111,23 @@ class Survey(BaseEMSurvey, properties.HasProperties):
         self.m_locations = np.vstack(m_locations)
         self.n_locations = np.vstack(n_locations)
 
+    def getElectrodes(self):
+        """
+        Unique electrode locations of the survey. The A, B, M and N
+        electrodes of pole sources and pole receivers are repeated, as in
+        getABMN_locations.
+
+        :rtype: tuple
+        :return: (electrode locations (nE, dim), index of the A, B, M and N
+            electrodes of each datum (nD, 4))
+        """
+        self.getABMN_locations()
+        locs, _, inds = SimPEG.Utils.uniqueRows(np.vstack((
+            self.a_locations, self.b_locations,
+            self.m_locations, self.n_locations
+        )))
+        return locs, inds.reshape((-1, 4), order='F')
+
     def drapeTopo(self, mesh, actind, option='top'):
         if self.a_locations is None:
             self.getABMN_locations()
@@ -314,7 +331,10 @@ class Survey_ky(Survey):
         """
         data = SimPEG.Survey.Data(self)
         kys = self.prob.kys
+        weights = self.prob.kyWeights
         for src in self.srcList:
             for rx in src.rxList:
-                data[src, rx] = rx.eval(kys, src, self.mesh, f)
+                data[src, rx] = rx.eval(
+                    kys, src, self.mesh, f, weights=weights
+                )
         return data
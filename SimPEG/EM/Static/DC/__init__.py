@@ -7,5 +7,7 @@ from .FieldsDC import FieldsDC, Fields_CC, Fields_N
 from .FieldsDC_2D import Fields_ky, Fields_ky_CC, Fields_ky_N
 from .BoundaryUtils import getxBCyBC_CC
 from . import Utils
+from . import Quadrature
+from . import SensitivityDC
 from .IODC import IO
 from .Run import run_inversion
@@ -10,9 +10,9 @@ import numpy as np
 from SimPEG.Utils import Zero
 from SimPEG.EM.Static.DC import Problem3D_CC as BaseProblem3D_CC
 from SimPEG.EM.Static.DC import Problem3D_N as BaseProblem3D_N
+from SimPEG.EM.Static.DC import SensitivityDC
 from .SurveyIP import Survey
 from SimPEG import Props
-import sys
 
 
 class BaseIPProblem(BaseEMProblem):
@@ -37,6 +37,8 @@ class BaseIPProblem(BaseEMProblem):
     _f = None
     storeJ = False
     _Jmatrix = None
+    maxBlockMemory = 0.5  #: Memory (GB) of the blocks of adjoint solves of J
+    sensitivityPath = None  #: Directory of a memory mapped J (None in memory)
     sign = None
 
     def fields(self, m):
@@ -139,62 +141,46 @@ class BaseIPProblem(BaseEMProblem):
             Full J matrix can be computed by inputing v=None
         """
 
-        if v is not None:
-            # Ensure v is a data object.
-            if not isinstance(v, self.dataPair):
-                v = self.dataPair(self.survey, v)
-            Jtv = np.zeros(m.size)
-        else:
-            # This is for forming full sensitivity matrix
-            Jtv = np.zeros((self.model.size, self.survey.nD), order='F')
-            istrt = int(0)
-            iend = int(0)
+        if v is None:
+            # This is for forming full sensitivity matrix, by blocks of
+            # receivers
+            def JtFun(src, ATinvdf_duT):
+                u_src = f[src, self._solutionType]
+                return self.getADeriv(u_src, ATinvdf_duT, adjoint=True)
+
+            return SensitivityDC.assembleJ(
+                self, f, self.Ainv, JtFun, self.model.size,
+                maxBlockMemory=self.maxBlockMemory, path=self.sensitivityPath
+            ).T
+
+        # Ensure v is a data object.
+        if not isinstance(v, self.dataPair):
+            v = self.dataPair(self.survey, v)
+        Jtv = np.zeros(m.size)
 
         for isrc, src in enumerate(self.survey.srcList):
             u_src = f[src, self._solutionType]
-            if self.storeJ:
-                # TODO: use logging package
-                sys.stdout.write(("\r %d / %d") % (isrc+1, self.survey.nSrc))
-                sys.stdout.flush()
 
             for rx in src.rxList:
-                if v is not None:
-                    PTv = rx.evalDeriv(
-                        src, self.mesh, f, v[src, rx], adjoint=True
-                    )  # wrt f, need possibility wrt m
-                    df_duTFun = getattr(
-                        f, '_{0!s}Deriv'.format(rx.projField), None
-                    )
-                    df_duT, df_dmT = df_duTFun(src, None, PTv, adjoint=True)
-                    ATinvdf_duT = self.Ainv * df_duT
-                    dA_dmT = self.getADeriv(
-                        u_src.flatten(), ATinvdf_duT, adjoint=True
-                    )
-                    dRHS_dmT = self.getRHSDeriv(src, ATinvdf_duT, adjoint=True)
-                    du_dmT = -dA_dmT + dRHS_dmT
-                    Jtv += (df_dmT + du_dmT).astype(float)
-                else:
-                    P = rx.getP(self.mesh, rx.projGLoc(f)).toarray()
-                    ATinvdf_duT = self.Ainv * (P.T)
-                    dA_dmT = self.getADeriv(
-                        u_src, ATinvdf_duT, adjoint=True
-                    )
-
-                    iend = istrt + rx.nD
-                    if rx.nD == 1:
-                        Jtv[:, istrt] = dA_dmT
-                    else:
-                        Jtv[:, istrt:iend] = dA_dmT
-                    istrt += rx.nD
+                PTv = rx.evalDeriv(
+                    src, self.mesh, f, v[src, rx], adjoint=True
+                )  # wrt f, need possibility wrt m
+                df_duTFun = getattr(
+                    f, '_{0!s}Deriv'.format(rx.projField), None
+                )
+                df_duT, df_dmT = df_duTFun(src, None, PTv, adjoint=True)
+                ATinvdf_duT = self.Ainv * df_duT
+                dA_dmT = self.getADeriv(
+                    u_src.flatten(), ATinvdf_duT, adjoint=True
+                )
+                dRHS_dmT = self.getRHSDeriv(src, ATinvdf_duT, adjoint=True)
+                du_dmT = -dA_dmT + dRHS_dmT
+                Jtv += (df_dmT + du_dmT).astype(float)
 
         # Conductivity ((d u / d log sigma).T) - EB form
         # Resistivity ((d u / d log rho).T) - HJ form
 
-        if v is not None:
-            return self.sign*Utils.mkvc(Jtv)
-        else:
-            return Jtv
-        return
+        return self.sign*Utils.mkvc(Jtv)
 
     def getSourceTerm(self):
         """
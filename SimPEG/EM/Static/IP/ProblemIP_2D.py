@@ -44,12 +44,7 @@ class BaseIPProblem_2D(BaseDCProblem_2D):
         if self._f is None:
             self._f = self.fieldsPair(self.mesh, self.survey)
             Srcs = self.survey.srcList
-            for iky in range(self.nky):
-                ky = self.kys[iky]
-                A = self.getA(ky)
-                self.Ainv[iky] = self.Solver(A, **self.solverOpts)
-                RHS = self.getRHS(ky)
-                u = self.Ainv[iky] * RHS
+            for iky, u in enumerate(self._solveKys()):
                 self._f[Srcs, self._solutionType, iky] = u
         return self._f
 
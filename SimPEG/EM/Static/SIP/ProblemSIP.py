@@ -4,7 +4,6 @@ from __future__ import print_function
 from __future__ import unicode_literals
 
 import numpy as np
-import sys
 
 from SimPEG import Utils
 from SimPEG import Props
@@ -14,8 +13,8 @@ from SimPEG.EM.Base import BaseEMProblem
 from SimPEG.EM.Static.DC.FieldsDC import FieldsDC, Fields_CC, Fields_N
 from SimPEG.EM.Static.IP import Problem3D_CC as BaseProblem3D_CC
 from SimPEG.EM.Static.IP import Problem3D_N as BaseProblem3D_N
+from SimPEG.EM.Static.DC import SensitivityDC
 from .SurveySIP import Survey, Data
-import gc
 
 
 class BaseSIPProblem(BaseEMProblem):
@@ -58,6 +57,8 @@ class BaseSIPProblem(BaseEMProblem):
     actinds = None
     storeJ = False
     _Jmatrix = None
+    maxBlockMemory = 0.5  #: Memory (GB) of the blocks of adjoint solves of J
+    sensitivityPath = None  #: Directory of a memory mapped J (None in memory)
     actMap = None
 
     def getPeta(self, t):
@@ -124,37 +125,16 @@ class BaseSIPProblem(BaseEMProblem):
             if f is None:
                 f = self.fields(m)
 
-            Jt = np.zeros(
-                (self.actMap.nP, int(self.survey.nD/self.survey.times.size)),
-                order='F'
-            )
-            istrt = int(0)
-            iend = int(0)
-
-            for isrc, src in enumerate(self.survey.srcList):
-                if self.verbose:
-                    sys.stdout.write(
-                        ("\r %d / %d") % (isrc+1, self.survey.nSrc)
-                    )
-                    sys.stdout.flush()
+            def JtFun(src, ATinvdf_duT):
                 u_src = f[src, self._solutionType]
-                for rx in src.rxList:
-                    P = rx.getP(self.mesh, rx.projGLoc(f)).toarray()
-                    ATinvdf_duT = self.Ainv * (P.T)
-                    dA_dmT = self.getADeriv(u_src, ATinvdf_duT, adjoint=True)
-                    iend = istrt + rx.nD
-                    if rx.nD == 1:
-                        Jt[:, istrt] = dA_dmT
-                    else:
-                        Jt[:, istrt:iend] = dA_dmT
-                    istrt += rx.nD
-
-            self._Jmatrix = Jt.T
-            if self.verbose:
-                collected = gc.collect()
-                print (
-                    "Garbage collector: collected %d objects." % (collected)
-                )
+                return self.getADeriv(u_src, ATinvdf_duT, adjoint=True)
+
+            # Blocks of receivers are solved at once, J is written in place
+            self._Jmatrix = SensitivityDC.assembleJ(
+                self, f, self.Ainv, JtFun, self.actMap.nP,
+                nD=int(self.survey.nD/self.survey.times.size),
+                maxBlockMemory=self.maxBlockMemory, path=self.sensitivityPath
+            )
 
             # Not sure why below has raise memory issue
             # only for problem_cc, test_dataObj
@@ -4,6 +4,7 @@ from __future__ import print_function
 from __future__ import unicode_literals
 
 import numpy as np
+import threading
 
 from SimPEG import Utils
 from SimPEG import Props
@@ -102,26 +103,19 @@ class BaseSIPProblem_2D(BaseIPProblem_2D):
                 (self.actMap.nP, int(self.survey.nD/self.survey.times.size)),
                 order='F'
             )
-            istrt = int(0)
-            iend = int(0)
+            lock = threading.Lock()
 
             # Assume y=0.
-            dky = np.diff(self.kys)
-            dky = np.r_[dky[0], dky]
-            y = 0.
-            for src in self.survey.srcList:
-                for rx in src.rxList:
-                    iend = istrt + rx.nD
-                    Jtv_temp1 = np.zeros(
-                        (self.actinds.sum(), rx.nD), dtype=float
-                    )
-                    Jtv_temp0 = np.zeros(
-                        (self.actinds.sum(), rx.nD), dtype=float
-                    )
-                    # TODO: this loop is pretty slow .. (Parellize)
-                    for iky in range(self.nky):
-                        u_src = f[src, self._solutionType, iky]
-                        ky = self.kys[iky]
+            weights = self.kyWeights
+
+            def Jt_ky(iky):
+                ky = self.kys[iky]
+                istrt = int(0)
+                iend = int(0)
+                for src in self.survey.srcList:
+                    u_src = f[src, self._solutionType, iky]
+                    for rx in src.rxList:
+                        iend = istrt + rx.nD
 
                         # wrt f, need possibility wrt m
                         P = rx.getP(self.mesh, rx.projGLoc(f)).toarray()
@@ -131,32 +125,16 @@ class BaseSIPProblem_2D(BaseIPProblem_2D):
                         dA_dmT = self.getADeriv(ky, u_src, ATinvdf_duT,
                                                 adjoint=True)
                         Jtv_temp1 = 1./np.pi*(-dA_dmT)
-                        # Trapezoidal intergration
-                        if iky == 0:
-                            # First assigment
+                        # Wavenumber quadrature, one worker adds at a time
+                        with lock:
                             if rx.nD == 1:
-                                Jt[:, istrt] += Jtv_temp1*dky[iky]*np.cos(ky*y)
+                                Jt[:, istrt] += Jtv_temp1*weights[iky]
                             else:
-                                Jt[:, istrt:iend] += (
-                                    Jtv_temp1*dky[iky]*np.cos(ky*y)
-                                )
-                        else:
-                            if rx.nD == 1:
-                                Jt[:, istrt] += (
-                                    Jtv_temp1*dky[iky]/2.*np.cos(ky*y)
-                                )
-                                Jt[:, istrt] += (
-                                    Jtv_temp0*dky[iky]/2.*np.cos(ky*y)
-                                )
-                            else:
-                                Jt[:, istrt:iend] += (
-                                    Jtv_temp1*dky[iky]/2.*np.cos(ky*y)
-                                )
-                                Jt[:, istrt:iend] += (
-                                    Jtv_temp0*dky[iky]/2.*np.cos(ky*y)
-                                )
-                        Jtv_temp0 = Jtv_temp1.copy()
-                    istrt += rx.nD
+                                Jt[:, istrt:iend] += Jtv_temp1*weights[iky]
+                        istrt += rx.nD
+
+            # Wavenumbers are solved in parallel if n_cpu > 1
+            self._kyMap(Jt_ky)
 
             self._Jmatrix = Jt.T
             # delete fields after computing sensitivity
@@ -164,9 +142,9 @@ class BaseSIPProblem_2D(BaseIPProblem_2D):
             if self._f is not None:
                 del self._f
             # clean all factorization
-            if self.Ainv[0] is not None:
-                for i in range(self.nky):
-                    self.Ainv[i].clean()
+            for Ainv in self.Ainv:
+                if Ainv is not None:
+                    Ainv.clean()
             return self._Jmatrix
 
     def forward(self, m, f=None):
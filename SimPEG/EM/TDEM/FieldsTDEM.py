@@ -1,4 +1,5 @@
 from __future__ import division
+import threading
 import numpy as np
 import scipy.sparse as sp
 from scipy.constants import epsilon_0
@@ -108,6 +109,228 @@ class FieldsTDEM(SimPEG.Problem.TimeFields):
         )
 
 
+class CheckpointedSolution(object):
+    """
+    Solution of a TDEM problem stored at checkpoints only. It stands in for
+    the (nP, nSrc, nT+1) array of a fields object, the time steps between
+    the checkpoints are recomputed from the nearest earlier checkpoint when
+    they are accessed.
+
+    The solution is stored every :code:`interval` time steps. The steps of
+    the last accessed segment (between two checkpoints) are kept, so that
+    sweeping through time, forward (Jvec) or backward (Jtvec), recomputes
+    each time step once. With an interval of :math:`\\sqrt{n_T}`, about
+    :math:`2\\sqrt{n_T}` solutions are held in memory at the cost of one
+    extra forward sweep. Each thread (partition of the sources) keeps its
+    own segment. With BDF2, the solution of the time step before each
+    checkpoint is stored as well, and served without recomputing the
+    previous segment.
+
+    The data of the receivers are projected during the forward sweep
+    (:code:`data`), so that predicting the data does not recompute the
+    time steps.
+
+    :param SimPEG.EM.TDEM.BaseTDEMProblem prob: problem
+    :param tuple shape: (nP, nSrc, nT+1)
+    :param int interval: number of time steps between checkpoints
+    :param StreamedData streamed: projection of the solutions of the
+        forward sweep to the receivers, optional
+    """
+
+    def __init__(self, prob, shape, interval, streamed=None):
+        self.prob = prob
+        self.shape = tuple(shape)
+        self.interval = max(int(interval), 1)
+        self.dtype = np.dtype(float)
+        self.ndim = 3
+        self.nRecomputed = 0  #: number of time steps recomputed
+        self._checkpoints = {}
+        self._previous = {}  # solutions before the checkpoints (BDF2)
+        self._streamed = streamed
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @property
+    def nCheckpoints(self):
+        """Number of stored checkpoints"""
+        return len(self._checkpoints)
+
+    @property
+    def data(self):
+        """
+        Data projected during the forward sweep, a SimPEG.Survey.Data
+        object (None if the receivers were not projected)
+        """
+        if self._streamed is None:
+            return None
+        return self._streamed.data
+
+    def _stored(self, store, tInd):
+        # solutions of all the sources at tInd in store, allocated once
+        with self._lock:
+            if tInd not in store:
+                store[tInd] = np.zeros(self.shape[:2])
+            return store[tInd]
+
+    def setState(self, tInd, u, srcInd=slice(None)):
+        """
+        Store the solution u (nP, nSrc) of the sources srcInd at time index
+        tInd if it is a checkpoint, and project it to the receivers
+        """
+        if self._streamed is not None:
+            self._streamed.setState(tInd, u, srcInd=srcInd)
+        if tInd % self.interval == 0:
+            self._stored(self._checkpoints, tInd)[:, srcInd] = np.reshape(
+                u, (self.shape[0], -1), order='F'
+            )
+        if (
+            self.prob.timeIntegrator == 'BDF2' and
+            (tInd + 1) % self.interval == 0
+        ):
+            self._stored(self._previous, tInd + 1)[:, srcInd] = np.reshape(
+                u, (self.shape[0], -1), order='F'
+            )
+
+    def _recompute(self, tStart, tEnd, srcInd):
+        # solutions of the sources srcInd at the time indices tStart to tEnd,
+        # marched from the checkpoint at tStart
+        counter = self.prob.counter
+        name = '{}.recompute'.format(self.prob.__class__.__name__)
+        u = self._checkpoints[tStart][:, srcInd]
+        uPrev = self._previous.get(tStart)
+        if uPrev is not None:
+            uPrev = uPrev[:, srcInd]
+        states = [u]
+        for tInd in range(tStart, tEnd):
+            u, uPrev = self.prob._timeStep(
+                tInd, u, srcInd=srcInd, uPrev=uPrev
+            ), u
+            states.append(u)
+            with self._lock:
+                self.nRecomputed += 1
+            if counter is not None:
+                counter.count(name)
+        return np.dstack(states)
+
+    def _getSegment(self, seg, srcs):
+        # states of the segment seg for the sources srcs. The segment is
+        # kept per thread and re-used for any subset of its sources.
+        local = self._local
+        if (
+            getattr(local, 'segment', None) != seg or
+            not np.all(np.in1d(srcs, local.srcs))
+        ):
+            tStart = seg * self.interval
+            tEnd = min(tStart + self.interval - 1, self.shape[2] - 1)
+            local.srcs = np.unique(srcs)
+            local.states = self._recompute(tStart, tEnd, local.srcs)
+            local.segment = seg
+        return local.states[:, np.searchsorted(local.srcs, srcs), :]
+
+    def __getitem__(self, key):
+        _, srcInd, timeInd = key
+        srcs = np.arange(self.shape[1])[srcInd]
+        tInds = np.arange(self.shape[2])[timeInd]
+        srcs1, tInds1 = np.atleast_1d(srcs), np.atleast_1d(tInds)
+        out = np.empty((self.shape[0], srcs1.size, tInds1.size))
+
+        # checkpoints, and the steps before them (BDF2), are stored
+        recompute = np.ones(tInds1.size, dtype=bool)
+        for i, tInd in enumerate(tInds1):
+            if tInd % self.interval == 0:
+                out[:, :, i] = self._checkpoints[tInd][:, srcs1]
+            elif tInd + 1 in self._previous:
+                out[:, :, i] = self._previous[tInd + 1][:, srcs1]
+            else:
+                continue
+            recompute[i] = False
+
+        segs = np.unique(tInds1[recompute] // self.interval)
+        if segs.size <= 2:
+            # sweeps through time: the segment is kept for the next access
+            for seg in segs:
+                states = self._getSegment(seg, srcs1)
+                inSeg = recompute & (tInds1 // self.interval == seg)
+                out[:, :, inSeg] = states[
+                    :, :, tInds1[inSeg] - seg * self.interval
+                ]
+        elif segs.size > 2:
+            # history of some sources (e.g. receivers): march only these
+            tStart = segs[0] * self.interval
+            states = self._recompute(tStart, tInds1.max(), srcs1)
+            out[:, :, recompute] = states[:, :, tInds1[recompute] - tStart]
+
+        if np.ndim(tInds) == 0:
+            out = out[:, :, 0]
+        if np.ndim(srcs) == 0:
+            out = out[:, 0]
+        return out
+
+
+class StreamedData(object):
+    """
+    Data of a forward-only TDEM problem, projected at each time step. The
+    solution of a step is passed to the receivers as soon as it is computed
+    and is not stored, so the memory does not grow with the number of time
+    steps.
+
+    The data of a receiver are
+
+    .. math::
+
+        \\mathbf{d} = \\left(\\mathbf{P}_t \\otimes \\mathbf{P}_s\\right)
+        \\mathbf{f} = \\text{vec}\\left(\\sum_i \\mathbf{P}_s \\mathbf{f}_i
+        \\mathbf{P}_t[:, i]^{\\top}\\right)
+
+    where :math:`\\mathbf{f}_i` is the field at the time index i. Only the
+    time steps seen by the time projection of a receiver are evaluated.
+
+    :param SimPEG.EM.TDEM.BaseTDEMProblem prob: problem
+    :param FieldsTDEM f: fields object of the problem (no storage is used)
+    """
+
+    def __init__(self, prob, f):
+        self.prob = prob
+        self.f = f
+        self._rxs = []
+        for isrc, src in enumerate(prob.survey.srcList):
+            for rx in src.rxList:
+                Ps = rx.getSpatialP(prob.mesh, f)
+                Pt = sp.csc_matrix(rx.getTimeP(prob.timeMesh, f))
+                D = np.zeros((Ps.shape[0], Pt.shape[0]))
+                self._rxs.append((isrc, src, rx, Ps, Pt, D))
+
+    def setState(self, tInd, u, srcInd=slice(None)):
+        """
+        Project the solution u (nP, nSrc) of the sources srcInd at time
+        index tInd to their receivers
+        """
+        u = np.reshape(u, (u.shape[0], -1), order='F')
+        srcs = np.arange(len(self.prob.survey.srcList))[srcInd]
+        fields = {}
+        for isrc, src, rx, Ps, Pt, D in self._rxs:
+            if isrc not in srcs:
+                continue
+            Pt_i = Pt[:, tInd]
+            if Pt_i.nnz == 0:
+                continue
+            key = (isrc, rx.projField)
+            if key not in fields:
+                i = np.searchsorted(srcs, isrc)
+                fields[key] = Utils.mkvc(self.f._fromSolution(
+                    rx.projField, u[:, [i]], [src], tInd
+                ))
+            D += np.outer(Ps * fields[key], Pt_i.toarray())
+
+    @property
+    def data(self):
+        """Projected data, a SimPEG.Survey.Data object"""
+        data = SimPEG.Survey.Data(self.prob.survey)
+        for _, src, rx, _, _, D in self._rxs:
+            data[src, rx] = Utils.mkvc(D)
+        return data
+
+
 class Fields_Derivs_eb(FieldsTDEM):
     """
     A fields object for satshing derivs in the EB formulatio
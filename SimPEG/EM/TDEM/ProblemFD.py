@@ -0,0 +1,266 @@
+from __future__ import division, print_function
+import numpy as np
+import SimPEG
+from SimPEG import Utils
+from SimPEG.EM.Base import BaseEMProblem
+from SimPEG.EM.TDEM.SurveyTDEM import Survey as SurveyTDEM
+from SimPEG.EM import FDEM
+from . import SrcTDEM as Src
+from . import Transform
+
+
+class TransformedData(SimPEG.Survey.Data):
+    """
+    Time domain data transformed from frequency domain fields. The fields
+    are kept for the sensitivities.
+
+    :param SimPEG.EM.TDEM.Survey survey: time domain survey
+    :param numpy.ndarray dobs: time domain data
+    :param SimPEG.EM.FDEM.FieldsFDEM fieldsFD: frequency domain fields
+    """
+
+    def __init__(self, survey, dobs, fieldsFD):
+        SimPEG.Survey.Data.__init__(self, survey, dobs=dobs)
+        self.fieldsFD = fieldsFD
+
+
+class Problem3D_FD(BaseEMProblem):
+    """
+    Time domain problem solved in the frequency domain.
+
+    The FDEM problem (:code:`Problem3D_e` or :code:`Problem3D_b`) is solved
+    at a set of frequencies chosen from the receiver times and the source
+    waveforms. The imaginary part of the responses is transformed to the
+    step-off responses with a digital sine or cosine filter, which are
+    convolved with the waveforms (see :code:`SimPEG.EM.TDEM.Transform`).
+    The transform is linear, so the sensitivities are the transformed
+    sensitivities of the FDEM problem.
+
+    The frequencies cover the band of the receiver times and frequencyMargin
+    decades on each side, with nFreqPerDecade per decade: about
+    nFreqPerDecade * (D + 2 frequencyMargin) + 3 frequencies for times over D
+    decades, e.g. 31 for three decades with the defaults. Each frequency needs
+    one factorization and one solve per source, and the cost does not depend
+    on the length of the late-times.
+    Only receiver times after the off-time of the waveforms are supported.
+    """
+
+    surveyPair = SurveyTDEM
+
+    #: FDEM formulation solved at each frequency, 'e' or 'b'
+    formulation = 'b'
+    #: number of frequencies per decade
+    nFreqPerDecade = 4
+    #: decades of frequencies beyond the band of the receiver times
+    frequencyMargin = 2.
+    #: number of abscissae of the digital filter
+    nFilter = 121
+    #: spacing of the abscissae of the digital filter (natural log)
+    filterSpacing = 0.1
+    #: number of linear segments of the waveforms
+    nSegment = 40
+    #: start of the waveforms
+    t0 = 0.
+    #: number of frequencies solved at the same time (see BaseFDEMProblem)
+    n_cpu = 1
+    #: memory budget (GB) for the stored factors, see BaseFDEMProblem. The
+    #: default (None) keeps all of them, 0 only keeps the factors in use
+    maxFactorMemory = None
+
+    # receivers of the frequency domain field and transform of each time
+    # domain receiver
+    _rxFD = {
+        'e': ('Point_e', 'cos'),
+        'b': ('Point_b', 'cos'),
+        'dbdt': ('Point_b', 'sin'),
+        'h': ('Point_h', 'cos'),
+        'dhdt': ('Point_h', 'sin'),
+        'j': ('Point_j', 'cos'),
+    }
+
+    def __init__(self, mesh, **kwargs):
+        BaseEMProblem.__init__(self, mesh, **kwargs)
+        assert self.formulation in ['e', 'b'], (
+            "formulation must be 'e' or 'b', not {}".format(self.formulation)
+        )
+
+    @property
+    def freqs(self):
+        """Frequencies (Hz) of the frequency domain problem"""
+        return self.problemFD.survey.freqs
+
+    @property
+    def problemFD(self):
+        """
+        Frequency domain problem, paired with a survey of the sources and
+        receivers of the time domain survey at each frequency.
+        """
+        if getattr(self, '_surveyFD', None) is not self.survey:
+            self._setupFD()
+        return self._problemFD
+
+    def _srcFD(self, src, freq, rxList):
+        # frequency domain source with the same geometry as src
+        kwargs = dict(
+            orientation=src.orientation, mu=src.mu
+        )
+        if isinstance(src, Src.CircularLoop):
+            kwargs.update(radius=src.radius, current=src.current)
+            return FDEM.Src.CircularLoop(rxList, freq, src.loc, **kwargs)
+        elif isinstance(src, Src.MagDipole):
+            kwargs.update(moment=src.moment)
+            return FDEM.Src.MagDipole(rxList, freq, src.loc, **kwargs)
+        raise NotImplementedError(
+            'The frequency domain transform is not implemented for {} '
+            'sources'.format(src.__class__.__name__)
+        )
+
+    def _setupFD(self):
+        """
+        Builds the frequency domain survey and problem, and the transforms
+        from the frequency domain data to the time domain data.
+        """
+        rxFD, convolutions = {}, []
+        for src in self.survey.srcList:
+            for rx in src.rxList:
+                if rx.projField not in self._rxFD:
+                    raise NotImplementedError(
+                        'The frequency domain transform is not implemented '
+                        'for {} receivers'.format(rx.__class__.__name__)
+                    )
+                rxType, kind = self._rxFD[rx.projField]
+                if rx not in rxFD:
+                    rxFD[rx] = getattr(FDEM.Rx, rxType)(
+                        rx.locs, orientation=rx.projComp, component='imag'
+                    )
+                convolutions.append(Transform.convolutionWeights(
+                    rx.times, src.waveform, t0=self.t0,
+                    nSegment=self.nSegment
+                ))
+
+        freqs = Transform.transformFrequencies(
+            np.hstack([evalTimes for evalTimes, _ in convolutions]),
+            nFreqPerDecade=self.nFreqPerDecade, margin=self.frequencyMargin,
+            nFilter=self.nFilter, spacing=self.filterSpacing
+        )
+
+        srcsFD, self._transforms = [], []
+        convolutions = iter(convolutions)
+        for src in self.survey.srcList:
+            rxList = [rxFD[rx] for rx in src.rxList]
+            srcsFD.append([self._srcFD(src, freq, rxList) for freq in freqs])
+            for rx in src.rxList:
+                evalTimes, Q = next(convolutions)
+                T = Transform.stepOffMatrix(
+                    evalTimes, freqs, kind=self._rxFD[rx.projField][1],
+                    nFilter=self.nFilter, spacing=self.filterSpacing
+                )
+                self._transforms.append(
+                    (src, rx, srcsFD[-1], rxFD[rx], Q.dot(T))
+                )
+
+        # sources sorted by frequency, the order of the FDEM data
+        srcList = [srcs[i] for i in range(len(freqs)) for srcs in srcsFD]
+
+        if self.sigmaMap is not None:
+            kwargs = {'sigmaMap': self.sigmaMap}
+        elif self.rhoMap is not None:
+            kwargs = {'rhoMap': self.rhoMap}
+        else:
+            kwargs = {'sigma': self.sigma}
+
+        problemFD = getattr(FDEM, 'Problem3D_{}'.format(self.formulation))(
+            self.mesh, mu=self.mu, Solver=self.Solver,
+            solverOpts=self.solverOpts, n_cpu=self.n_cpu,
+            maxFactorMemory=self.maxFactorMemory, **kwargs
+        )
+        problemFD.pair(FDEM.Survey(srcList))
+
+        self._problemFD = problemFD
+        self._surveyFD = self.survey
+
+    def _transform(self, dFD):
+        """
+        Time domain data from the (imaginary) frequency domain data
+
+        :param numpy.ndarray dFD: frequency domain data
+        :rtype: numpy.ndarray
+        :return: time domain data
+        """
+        if not isinstance(dFD, SimPEG.Survey.Data):
+            dFD = SimPEG.Survey.Data(self.problemFD.survey, dFD)
+        d = SimPEG.Survey.Data(self.survey)
+        for src, rx, srcsFD, rxFD, M in self._transforms:
+            D = np.vstack([dFD[srcFD, rxFD] for srcFD in srcsFD]).T
+            d[src, rx] = Utils.mkvc(D.dot(M.T))
+        return d.tovec()
+
+    def _transformAdjoint(self, v):
+        """
+        Adjoint of the transform
+
+        :param numpy.ndarray v: time domain data vector
+        :rtype: SimPEG.Survey.Data
+        :return: frequency domain data
+        """
+        if not isinstance(v, SimPEG.Survey.Data):
+            v = SimPEG.Survey.Data(self.survey, v)
+        vFD = SimPEG.Survey.Data(self.problemFD.survey)
+        for src, rx, srcsFD, rxFD, M in self._transforms:
+            V = np.reshape(v[src, rx], (-1, M.shape[0]), order='F')
+            W = V.dot(M)
+            for i, srcFD in enumerate(srcsFD):
+                vFD[srcFD, rxFD] = W[:, i]
+        return vFD
+
+    def fields(self, m=None):
+        """
+        Solve the frequency domain problem and transform the data.
+
+        :param numpy.array m: inversion model (nP,)
+        :rtype: TransformedData
+        :return: time domain data, with the frequency domain fields
+        """
+        if m is not None:
+            self.model = m
+
+        problemFD = self.problemFD
+        if self.verbose:
+            print('Solving {:d} frequencies'.format(len(self.freqs)))
+
+        fFD = problemFD.fields(self.model)
+        d = self._transform(problemFD.survey.eval(fFD))
+        return TransformedData(self.survey, d, fFD)
+
+    def Jvec(self, m, v, f=None):
+        """
+        Sensitivity times a vector.
+
+        :param numpy.array m: inversion model (nP,)
+        :param numpy.array v: vector which we take sensitivity product with
+            (nP,)
+        :param TransformedData f: fields
+        :rtype: numpy.array
+        :return: Jv (nD,)
+        """
+        if not isinstance(f, TransformedData):
+            f = self.fields(m)
+        self.model = m
+        return self._transform(self.problemFD.Jvec(m, v, f=f.fieldsFD))
+
+    def Jtvec(self, m, v, f=None):
+        """
+        Sensitivity transpose times a vector.
+
+        :param numpy.array m: inversion model (nP,)
+        :param numpy.array v: vector which we take adjoint product with (nD,)
+        :param TransformedData f: fields
+        :rtype: numpy.array
+        :return: Jtv (nP,)
+        """
+        if not isinstance(f, TransformedData):
+            f = self.fields(m)
+        self.model = m
+        return self.problemFD.Jtvec(
+            m, self._transformAdjoint(v), f=f.fieldsFD
+        )
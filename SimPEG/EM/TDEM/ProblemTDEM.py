@@ -6,9 +6,11 @@ from SimPEG.EM.Base import BaseEMProblem
 from SimPEG.EM.TDEM.SurveyTDEM import Survey as SurveyTDEM
 from SimPEG.EM.TDEM.FieldsTDEM import (
     FieldsTDEM, Fields3D_b, Fields3D_e, Fields3D_h, Fields3D_j,
-    Fields_Derivs_eb, Fields_Derivs_hj
+    Fields_Derivs_eb, Fields_Derivs_hj, CheckpointedSolution, StreamedData
 )
 from scipy.constants import mu_0
+from multiprocessing.pool import ThreadPool
+import threading
 import time
 
 
@@ -16,15 +18,47 @@ class BaseTDEMProblem(Problem.BaseTimeProblem, BaseEMProblem):
     """
     We start with the first order form of Maxwell's equations, eliminate and
     solve the second order form. For the time discretization, we use backward
-    Euler.
+    Euler or the second order backward differentiation formula (BDF2).
+
+    With a semi-discrete system :math:`\\mathbf{M} \\partial_t \\mathbf{u} +
+    \\mathbf{K} \\mathbf{u} = \\mathbf{s}`, the time derivative at
+    :math:`t_{n+1}` is approximated by
+
+    .. math::
+        \\frac{\\partial \\mathbf{u}}{\\partial t} \\approx
+        \\frac{1}{\\Delta t_n} \\left(c_0 \\mathbf{u}^{n+1} +
+        c_1 \\mathbf{u}^n + c_2 \\mathbf{u}^{n-1}\\right)
+
+    so that each time step solves :code:`getAdiag` with an effective time
+    step :math:`\\Delta t_n / c_0` (see :code:`_stepCoefficients`).
     """
     surveyPair = SurveyTDEM  #: A SimPEG.EM.TDEM.SurveyTDEM Class
     fieldsPair = FieldsTDEM  #: A SimPEG.EM.TDEM.FieldsTDEM Class
-    clean_on_model_update = ['_Adcinv']  #: clear DC matrix factors on any model updates
+    #: clear DC and time-stepping matrix factors on any model updates
+    clean_on_model_update = ['_Adcinv', '_Adiaginv']
     dt_threshold = 1e-8
+    #: memory budget (GB) for the stored factors of Adiag, None for no limit
+    maxFactorMemory = None
+    #: store the solution every checkpointInterval time steps and recompute
+    #: the steps in between when they are needed (Jvec, Jtvec). None stores
+    #: all time steps, 'auto' uses sqrt(nT)
+    checkpointInterval = None
+    #: if True, fields returns the data projected at each time step and the
+    #: fields are not stored (no Jvec or Jtvec)
+    forwardOnly = False
+    #: time integrator, 'BE' (backward Euler) or 'BDF2' (second order, with
+    #: variable steps, backward Euler on the first step)
+    timeIntegrator = 'BE'
+    #: number of partitions of the sources marched at the same time, each
+    #: with its own factors of Adiag (1 is serial)
+    n_cpu = 1
+    #: memory budget (GB) for the factors of all the partitions, limits the
+    #: number of workers (None for no limit)
+    parallelMemory = None
 
     def __init__(self, mesh, **kwargs):
         BaseEMProblem.__init__(self, mesh, **kwargs)
+        self._partition = threading.local()  # partition of a worker thread
 
     # def fields_nostore(self, m):
     #     """
@@ -42,65 +76,319 @@ class BaseTDEMProblem(Problem.BaseTimeProblem, BaseEMProblem):
 
         :param numpy.array m: inversion model (nP,)
         :rtype: SimPEG.EM.TDEM.FieldsTDEM
-        :return f: fields object
+        :return f: fields object (the data if forwardOnly)
         """
 
         tic = time.time()
         self.model = m
 
         f = self.fieldsPair(self.mesh, self.survey)
+        name = self._fieldType + 'Solution'
 
         # set initial fields
-        f[:, self._fieldType+'Solution', 0] = self.getInitialFields()
+        u0 = self.getInitialFields()
+        store = self._solutionStore(f)
+        if store is None:
+            f[:, name, 0] = u0
+        else:
+            store.setState(0, u0)
 
         if self.verbose:
             print('{}\nCalculating fields(m)\n{}'.format('*'*50, '*'*50))
 
-        # timestep to solve forward
-        Ainv = None
-        for tInd, dt in enumerate(self.timeSteps):
-            # keep factors if dt is the same as previous step b/c A will be the
-            # same
-            if Ainv is not None and (
-                tInd > 0 and abs(dt-self.timeSteps[tInd - 1]) >
-                self.dt_threshold
-            ):
-                Ainv.clean()
-                Ainv = None
-
-            if Ainv is None:
-                A = self.getAdiag(tInd)
-                if self.verbose:
+        def march(srcInd):
+            # timestep to solve forward the sources srcInd
+            u, uPrev = u0[:, srcInd], None
+            for tInd, dt in enumerate(self.timeSteps):
+                # factors are shared by all time steps of the same length
+                # (and re-used in Jvec and Jtvec)
+                if self.verbose and self._dtKey(tInd) not in self.Adiaginv:
                     print('Factoring...   (dt = {:e})'.format(dt))
-                Ainv = self.Solver(A, **self.solverOpts)
-                if self.verbose:
-                    print('Done')
 
-            rhs = self.getRHS(tInd+1)  # this is on the nodes of the time mesh
-            Asubdiag = self.getAsubdiag(tInd)
+                if self.verbose:
+                    print('    Solving...   (tInd = {:d})'.format(tInd+1))
 
-            if self.verbose:
-                print('    Solving...   (tInd = {:d})'.format(tInd+1))
+                # taking a step
+                u, uPrev = self._timeStep(
+                    tInd, u, srcInd=srcInd, uPrev=uPrev
+                ), u
 
-            # taking a step
-            sol = Ainv * (
-                rhs - Asubdiag * f[:, (self._fieldType + 'Solution'), tInd]
-            )
+                if self.verbose:
+                    print('    Done...')
 
-            if self.verbose:
-                print('    Done...')
+                if store is None:
+                    f[srcInd, name, tInd+1] = u
+                else:
+                    store.setState(tInd+1, u, srcInd=srcInd)
 
-            if sol.ndim == 1:
-                sol.shape = (sol.size, 1)
-            f[:, self._fieldType+'Solution', tInd+1] = sol
+        self._srcMap(march)
 
         if self.verbose:
+            if isinstance(store, CheckpointedSolution):
+                print(
+                    'Stored {:d} checkpoints of {:d} time steps'.format(
+                        store.nCheckpoints, self.nT + 1
+                    )
+                )
             print('{}\nDone calculating fields(m)\n{}'.format('*'*50, '*'*50))
 
-        # clean factors and return
-        Ainv.clean()
+        if self.forwardOnly:
+            return store.data
+        if isinstance(store, CheckpointedSolution):
+            # data projected during the sweep, used by survey.eval(f)
+            f._projectedData = store.data
         return f
 
+    def adaptTimeSteps(self, m, tol=1e-3, dtMin=None, timeSteps=None):
+        """
+        Choose the time steps with an estimate of the local truncation
+        error at the receiver locations.
+
+        The solution is marched from t0 (or after the initial timeSteps,
+        e.g. the on-time of a waveform) to the last receiver time. At each
+        step, the solution is compared with its extrapolation (order 1 for
+        backward Euler, 2 for BDF2) from the previous steps, and the error
+
+        .. math::
+            \\epsilon = C \\max_{src} \\frac{\\|\\mathbf{P}(\\mathbf{u}^{n+1}
+            - \\mathbf{u}^{n+1}_p)\\|}{\\|\\mathbf{P}\\mathbf{u}^{n+1}\\|}
+
+        (:math:`C = 1/3` for backward Euler, :math:`2/11` for BDF2, and
+        :math:`\\mathbf{P}` interpolates the solution at the receivers) is
+        kept below tol. A step is halved when it is rejected and doubled
+        when the error is well below tol. The step lengths are dtMin
+        times powers of two, so that only a few factorizations are needed.
+        They are kept (see :code:`Adiaginv`) for the forward and the
+        sensitivities.
+
+        The time steps are chosen once for the model m. The sensitivities
+        are those of this (fixed) discretization.
+
+        :param numpy.array m: model used to choose the time steps (nP,)
+        :param float tol: relative tolerance on the local error
+        :param float dtMin: shortest time step, a tenth of the first receiver
+            time after t0 by default
+        :param timeSteps: initial time steps, kept as they are (optional)
+        :rtype: numpy.ndarray
+        :return: time steps, also set as :code:`timeSteps`
+        """
+        self.model = m
+
+        rxTimes = np.hstack([
+            rx.times for src in self.survey.srcList for rx in src.rxList
+        ])
+        tEnd = rxTimes.max()
+        if dtMin is None:
+            dtMin = (rxTimes.min() - self.t0) / 10.
+        assert dtMin > 0, 'dtMin must be positive'
+
+        if self.timeIntegrator == 'BDF2':
+            order, errConst = 2, 2. / 11.
+        else:
+            order, errConst = 1, 1. / 3.
+
+        P = self._rxInterpolation()
+
+        # the initial time steps are taken as they are
+        steps = []
+        if timeSteps is not None:
+            self.timeSteps = timeSteps
+            steps = list(self.timeSteps)
+        u = np.reshape(
+            self.getInitialFields(), (P.shape[1], -1), order='F'
+        )
+        history = [(self.t0, u)]  # the last order+1 (time, solution)
+        for tInd in range(len(steps)):
+            u = self._timeStep(
+                tInd, u, uPrev=history[-2][1] if len(history) > 1 else None
+            )
+            history = (history + [(history[-1][0] + steps[tInd], u)])[
+                -(order+1):
+            ]
+
+        dt = dtMin
+        if len(steps) > 0:
+            dt = dtMin * 2.**max(np.floor(np.log2(steps[-1] / dtMin)), 0)
+
+        nRejected = 0
+        while history[-1][0] < tEnd * (1. - 1e-10):
+            tInd = len(steps)
+            t = history[-1][0] + dt
+            self.timeSteps = np.r_[steps, dt]
+            uNew = self._timeStep(
+                tInd, history[-1][1],
+                uPrev=history[-2][1] if len(history) > 1 else None
+            )
+
+            err = 0.
+            if len(history) == order + 1:
+                # extrapolation (Lagrange) of the previous solutions
+                ts = [tk for tk, _ in history]
+                uPred = 0.
+                for j, (tj, uj) in enumerate(history):
+                    lj = np.prod([
+                        (t - tk) / (tj - tk)
+                        for k, tk in enumerate(ts) if k != j
+                    ])
+                    uPred = uPred + lj * uj
+                Pu = P * uNew
+                Pdu = P * (uNew - uPred)
+                norm = np.linalg.norm(Pu, axis=0)
+                err = errConst * np.max(
+                    np.linalg.norm(Pdu, axis=0) /
+                    np.maximum(norm, np.finfo(float).tiny)
+                )
+
+            if err > tol and dt > dtMin:
+                dt = dt / 2.
+                nRejected += 1
+                continue
+
+            steps.append(dt)
+            history = (history + [(t, uNew)])[-(order+1):]
+            if err < tol / 2.**(order+1):
+                dt = 2. * dt
+
+        self.timeSteps = np.array(steps)
+
+        if self.verbose:
+            print(
+                'Chose {:d} time steps ({:d} rejected), {:d} distinct '
+                'lengths'.format(
+                    self.nT, nRejected,
+                    len(set(self._dtKey(tInd) for tInd in range(self.nT)))
+                )
+            )
+        return self.timeSteps
+
+    def _rxInterpolation(self):
+        # interpolation of the components of the solution at the receiver
+        # locations
+        gridLoc = self.fieldsPair.knownFields[
+            self._fieldType + 'Solution'
+        ]
+        locs = Utils.uniqueRows(np.vstack([
+            np.atleast_2d(rx.locs)
+            for src in self.survey.srcList for rx in src.rxList
+        ]))[0]
+        nGrid = getattr(self.mesh, 'vn{}'.format(gridLoc))
+        return sp.vstack([
+            self.mesh.getInterpolationMat(locs, gridLoc + comp)
+            for comp, n in zip('xyz', nGrid) if n > 0
+        ]).tocsr()
+
+    def _stepCoefficients(self, tInd):
+        """
+        Coefficients (c0, c1, c2) of the time derivative at the end of the
+        time step tInd. Backward Euler is (1, -1, 0). BDF2 depends on the
+        ratio :math:`\\omega = \\Delta t_n / \\Delta t_{n-1}` of the last two
+        steps
+
+        .. math::
+            c_0 = \\frac{1 + 2\\omega}{1 + \\omega} \\quad
+            c_1 = -(1 + \\omega) \\quad
+            c_2 = \\frac{\\omega^2}{1 + \\omega}
+
+        and is stable for :math:`\\omega < 1 + \\sqrt{2}`.
+
+        :param int tInd: time index
+        :rtype: tuple
+        :return: (c0, c1, c2)
+        """
+        if self.timeIntegrator == 'BE' or tInd == 0:
+            return 1., -1., 0.
+        elif self.timeIntegrator == 'BDF2':
+            w = self.timeSteps[tInd] / self.timeSteps[tInd-1]
+            return (1. + 2.*w) / (1. + w), -(1. + w), w**2 / (1. + w)
+        raise ValueError(
+            "timeIntegrator must be 'BE' or 'BDF2', not {}".format(
+                self.timeIntegrator
+            )
+        )
+
+    def _dt(self, tInd):
+        """
+        Effective length of the time step tInd in Adiag, dt / c0
+        """
+        return self.timeSteps[tInd] / self._stepCoefficients(tInd)[0]
+
+    def _subdiagonals(self, tInd):
+        """
+        Blocks below the diagonal of the time step tInd, as a list of
+        (offset, scale): the solution at tInd+1-offset is multiplied by
+        scale * getAsubdiag(tInd)
+        """
+        _, c1, c2 = self._stepCoefficients(tInd)
+        if c2 == 0.:
+            return [(1, -c1)]
+        return [(1, -c1), (2, -c2)]
+
+    def _sourceTimeDerivative(self, tInd, s_e, stepInd=None):
+        """
+        Time derivative of the electric source term at the time index tInd,
+        with the coefficients of the time step ending at tInd
+
+        :param int tInd: time index (node of the time mesh)
+        :param numpy.ndarray s_e: electric source term at tInd
+        :param int stepInd: index of the time step length used (tInd-1 by
+            default)
+        :rtype: numpy.ndarray
+        :return: time derivative of s_e
+        """
+        if stepInd is None:
+            stepInd = tInd - 1
+        c0, c1, c2 = self._stepCoefficients(tInd-1)
+        ds_e = c0 * s_e + c1 * self.getSourceTerm(tInd-1)[1]
+        if c2 != 0.:
+            ds_e = ds_e + c2 * self.getSourceTerm(tInd-2)[1]
+        return ds_e / self.timeSteps[stepInd]
+
+    def _timeStep(self, tInd, u, srcInd=slice(None), uPrev=None):
+        """
+        Solution at time index tInd+1 from the solution u (nP, nSrc) at tInd
+
+        :param int tInd: time index
+        :param numpy.ndarray u: solution at tInd of the sources srcInd
+        :param srcInd: indices of the sources, all by default
+        :param numpy.ndarray uPrev: solution at tInd-1 (BDF2 only)
+        :rtype: numpy.ndarray
+        :return: solution at tInd+1 (nP, nSrc)
+        """
+        Ainv = self.getAdiaginv(tInd)
+        rhs = self.getRHS(tInd+1)  # this is on the nodes of the time mesh
+        u = np.reshape(u, (u.shape[0], -1), order='F')
+        if not isinstance(rhs, Utils.Zero):
+            rhs = np.reshape(rhs, (rhs.shape[0], -1), order='F')[:, srcInd]
+        Asubdiag = self.getAsubdiag(tInd)
+        for offset, scale in self._subdiagonals(tInd):
+            if offset == 1:
+                rhs = rhs - scale * (Asubdiag * u)
+            else:
+                assert uPrev is not None, (
+                    'BDF2 needs the solution of the previous time step'
+                )
+                uPrev = np.reshape(uPrev, u.shape, order='F')
+                rhs = rhs - scale * (Asubdiag * uPrev)
+        return np.reshape(Ainv * rhs, u.shape, order='F')
+
+    def _solutionStore(self, f):
+        # streamed data or checkpointed storage of the solution, None to
+        # store all time steps in f
+        if self.forwardOnly:
+            return StreamedData(self, f)
+        if self.checkpointInterval is None:
+            return None
+        interval = self.checkpointInterval
+        if interval == 'auto':
+            interval = np.ceil(np.sqrt(self.nT))
+        name = self._fieldType + 'Solution'
+        store = CheckpointedSolution(
+            self, f._storageShape(f.knownFields[name]), interval,
+            streamed=StreamedData(self, f)
+        )
+        f._fields[name] = store
+        return store
+
     def Jvec(self, m, v, f=None):
         """
         Jvec computes the sensitivity times a vector
@@ -122,92 +410,85 @@ class BaseTDEMProblem(Problem.BaseTimeProblem, BaseEMProblem):
         if f is None:
             f = self.fields(m)
 
-        ftype = self._fieldType + 'Solution'  # the thing we solved for
         self.model = m
 
+        # each partition of the sources returns the data of its receivers,
+        # in the order of the survey
+        Jv = self._srcMap(lambda srcInd: self._JvecSrcs(f, v, srcInd))
+        return np.hstack([Jv_rx for Jv_srcs in Jv for Jv_rx in Jv_srcs])
+
+    def _JvecSrcs(self, f, v, srcInd):
+        """
+        Forward time stepping of the derivatives of the sources srcInd. The
+        derivatives of the fields are projected to the receivers at each
+        time step, the data of the receivers are returned as a list.
+        """
+        ftype = self._fieldType + 'Solution'  # the thing we solved for
+
         # mat to store previous time-step's solution deriv times a vector for
         # each source
         # size: nu x nSrc
-
-        # this is a bit silly
-
-        # if self._fieldType is 'b' or self._fieldType is 'j':
-        #     ifields = np.zeros((self.mesh.nF, len(Srcs)))
-        # elif self._fieldType is 'e' or self._fieldType is 'h':
-        #     ifields = np.zeros((self.mesh.nE, len(Srcs)))
-
-        # for i, src in enumerate(self.survey.srcList):
+        Srcs = self.survey.srcList[srcInd]
+        nSrc = len(Srcs)
         dun_dm_v = np.hstack([
             Utils.mkvc(
                 self.getInitialFieldsDeriv(src, v, f=f), 2
             )
-            for src in self.survey.srcList
+            for src in Srcs
         ])
-        # can over-write this at each timestep
-        # store the field derivs we need to project to calc full deriv
-        df_dm_v = self.Fields_Derivs(self.mesh, self.survey)
-
-        Adiaginv = None
+        dunPrev_dm_v = None  # previous time step (BDF2)
+        Jv = [np.zeros(rx.nD) for src in Srcs for rx in src.rxList]
 
         for tInd, dt in zip(range(self.nT), self.timeSteps):
-            # keep factors if dt is the same as previous step b/c A will be the
-            # same
-            if Adiaginv is not None and (tInd > 0 and dt !=
-                                         self.timeSteps[tInd - 1]):
-                Adiaginv.clean()
-                Adiaginv = None
-
-            if Adiaginv is None:
-                A = self.getAdiag(tInd)
-                Adiaginv = self.Solver(A, **self.solverOpts)
-
+            Adiaginv = self.getAdiaginv(tInd)
             Asubdiag = self.getAsubdiag(tInd)
 
-            for i, src in enumerate(self.survey.srcList):
-
-                # here, we are lagging by a timestep, so filling in as we go
-                for projField in set([rx.projField for rx in src.rxList]):
-                    df_dmFun = getattr(f, '_%sDeriv' % projField, None)
-                    # df_dm_v is dense, but we only need the times at
-                    # (rx.P.T * ones > 0)
-                    # This should be called rx.footprint
+            rxInd = 0
+            for i, src in enumerate(Srcs):
 
-                    df_dm_v[src, '{}Deriv'.format(projField), tInd] = df_dmFun(
-                        tInd, src, dun_dm_v[:, i], v
+                # here, we are lagging by a timestep, so projecting as we go
+                df_dm_v = {}
+                for rx in src.rxList:
+                    if rx.projField not in df_dm_v:
+                        df_dmFun = getattr(
+                            f, '_%sDeriv' % rx.projField, None
                         )
+                        df_dm_v[rx.projField] = Utils.mkvc(df_dmFun(
+                            tInd, src, dun_dm_v[:, i], v
+                        ))
+                    Jv[rxInd] += rx.evalDeriv(
+                        src, self.mesh, self.timeMesh, f,
+                        df_dm_v[rx.projField], tInd=tInd
+                    )
+                    rxInd += 1
 
-                un_src = f[src, ftype, tInd+1]
-
-                # cell centered on time mesh
-                dA_dm_v = self.getAdiagDeriv(tInd, un_src, v)
-                # on nodes of time mesh
-                dRHS_dm_v = self.getRHSDeriv(tInd+1, src, v)
-
-                dAsubdiag_dm_v = self.getAsubdiagDeriv(
-                    tInd, f[src, ftype, tInd], v
+            # derivatives for all the sources at once, one column per source
+            un = self._srcColumns(f[srcInd, ftype, tInd+1], nSrc)
+            # cell centered on time mesh
+            dA_dm_v = self._srcColumns(
+                self.getAdiagDeriv(tInd, un, v), nSrc
+            )
+            # on nodes of time mesh
+            dRHS_dm_v = self._getRHSDerivs(tInd+1, v, srcInd=srcInd)
+
+            JRHS = dRHS_dm_v - dA_dm_v
+            for offset, scale in self._subdiagonals(tInd):
+                dAsubdiag_dm_v = self._srcColumns(
+                    self.getAsubdiagDeriv(
+                        tInd, self._srcColumns(
+                            f[srcInd, ftype, tInd+1-offset], nSrc
+                        ), v
+                    ), nSrc
                 )
+                dup_dm_v = dun_dm_v if offset == 1 else dunPrev_dm_v
+                JRHS = JRHS - scale * (dAsubdiag_dm_v + Asubdiag * dup_dm_v)
 
-                JRHS = dRHS_dm_v - dAsubdiag_dm_v - dA_dm_v
+            # step in time and overwrite, one solve for all the sources
+            dun_dm_v, dunPrev_dm_v = self._srcColumns(
+                Adiaginv * JRHS, nSrc
+            ), dun_dm_v
 
-                # step in time and overwrite
-                if tInd != len(self.timeSteps+1):
-                    dun_dm_v[:, i] = Adiaginv * (
-                        JRHS - Asubdiag * dun_dm_v[:, i]
-                    )
-
-        Jv = []
-        for src in self.survey.srcList:
-            for rx in src.rxList:
-                Jv.append(
-                    rx.evalDeriv(src, self.mesh, self.timeMesh, f, Utils.mkvc(
-                            df_dm_v[src, '%sDeriv' % rx.projField, :]
-                        )
-                    )
-                )
-        Adiaginv.clean()
-        # del df_dm_v, dun_dm_v, Asubdiag
-        # return Utils.mkvc(Jv)
-        return np.hstack(Jv)
+        return Jv
 
     def Jtvec(self, m, v, f=None):
 
@@ -233,124 +514,193 @@ class BaseTDEMProblem(Problem.BaseTimeProblem, BaseEMProblem):
             f = self.fields(m)
 
         self.model = m
-        ftype = self._fieldType + 'Solution'  # the thing we solved for
 
         # Ensure v is a data object.
         if not isinstance(v, self.dataPair):
             v = self.dataPair(self.survey, v)
 
-        df_duT_v = self.Fields_Derivs(self.mesh, self.survey)
+        JTv = sum(self._srcMap(
+            lambda srcInd: self._JtvecSrcs(f, v, m.size, srcInd)
+        ))
 
-        # same size as fields at a single timestep
-        ATinv_df_duT_v = np.zeros(
-            (
-                len(self.survey.srcList),
-                len(f[self.survey.srcList[0], ftype, 0])
-            ),
-            dtype=float
+        return Utils.mkvc(JTv).astype(float)
+
+    def _JtvecSrcs(self, f, v, nP, srcInd):
+        """
+        Contribution of the sources srcInd to J.T*v: back-solve through
+        time, with the receivers projected at each time step, and initial
+        condition
+        """
+        JTv = np.zeros(nP, dtype=float)
+
+        # Do the back-solve through time
+        JTv, AsubdiagT_v = self._adjointTimeStepping(f, v, JTv, srcInd=srcInd)
+
+        # Treat the initial condition
+        df_duT_v, df_dmT_v = self._adjointSource(f, v, 0, srcInd)
+        return self._adjointInitialCondition(
+            f, df_duT_v, JTv + df_dmT_v, AsubdiagT_v, srcInd
         )
-        JTv = np.zeros(m.shape, dtype=float)
-
-        # Loop over sources and receivers to create a fields object:
-        # PT_v, df_duT_v, df_dmT_v
-        # initialize storage for PT_v (don't need to preserve over sources)
-        PT_v = self.Fields_Derivs(self.mesh, self.survey)
-        for src in self.survey.srcList:
-            # Looping over initializing field class is appending memory!
-            # PT_v = Fields_Derivs(self.mesh, self.survey) # initialize storage
-            # #for PT_v (don't need to preserve over sources)
-            # initialize size
-            df_duT_v[src, '{}Deriv'.format(self._fieldType), :] = (
-                np.zeros_like(f[src, self._fieldType, :])
-            )
 
+    def _adjointSource(self, f, v, tInd, srcInd=slice(None)):
+        """
+        Receivers of the sources srcInd projected to the fields at the time
+        index tInd in the adjoint.
+
+        :param SimPEG.EM.TDEM.FieldsTDEM f: fields
+        :param SimPEG.Survey.Data v: data
+        :param int tInd: time index
+        :param slice srcInd: sources, all by default
+        :rtype: tuple
+        :return: (derivative of the fields wrt the solution times P.T*v
+            (n, nSrc), derivative of the fields wrt the model times P.T*v)
+        """
+        Srcs = self.survey.srcList[srcInd]
+        if self._fieldType in ['b', 'j']:
+            df_duT_v = np.zeros((self.mesh.nF, len(Srcs)))
+        elif self._fieldType in ['e', 'h']:
+            df_duT_v = np.zeros((self.mesh.nE, len(Srcs)))
+        df_dmT_v = Utils.Zero()
+
+        for i, src in enumerate(Srcs):
             for rx in src.rxList:
-                PT_v[src, '{}Deriv'.format(rx.projField), :] = rx.evalDeriv(
+                # column tInd of P.T*v of the receiver
+                PT_v = rx.evalDeriv(
                     src, self.mesh, self.timeMesh, f, Utils.mkvc(v[src, rx]),
-                    adjoint=True
-                ) # this is +=
+                    adjoint=True, tInd=tInd
+                )
 
-                # PT_v = np.reshape(curPT_v,(len(curPT_v)/self.timeMesh.nN,
-                # self.timeMesh.nN), order='F')
                 df_duTFun = getattr(f, '_{}Deriv'.format(rx.projField), None)
+                cur = df_duTFun(tInd, src, None, PT_v, adjoint=True)
 
-                for tInd in range(self.nT+1):
-                    cur = df_duTFun(
-                        tInd, src, None, Utils.mkvc(
-                            PT_v[src, '{}Deriv'.format(rx.projField), tInd]
-                        ),
-                        adjoint=True
-                    )
-
-                    df_duT_v[src, '{}Deriv'.format(self._fieldType), tInd] = (
-                        df_duT_v[src, '{}Deriv'.format(self._fieldType), tInd] +
-                        Utils.mkvc(cur[0], 2))
-                    JTv = cur[1] + JTv
+                df_duT_v[:, i] += Utils.mkvc(cur[0])
+                df_dmT_v = cur[1] + df_dmT_v
 
-        del PT_v # no longer need this
+        return df_duT_v, df_dmT_v
 
-        AdiagTinv = None
+    def _adjointInitialCondition(self, f, df_duT_v, JTv, AsubdiagT_v,
+                                 srcInd):
+        """
+        Contribution of the initial fields of the sources srcInd to J.T*v,
+        the initial fields of inductive sources do not depend on the model.
+        df_duT_v (nP, nSrc) are the receivers projected at the initial time
+        and AsubdiagT_v (nP, nSrc) is the adjoint of the time steps that
+        depend on the initial fields, see _adjointTimeStepping.
+        """
+        return JTv
 
-        # Do the back-solve through time
-        # if the previous timestep is the same: no need to refactor the matrix
-        # for tInd, dt in zip(range(self.nT), self.timeSteps):
+    def _srcColumns(self, x, nSrc):
+        """
+        Fields (or their derivatives) of all the sources as an array with
+        one column per source. Utils.Zero is returned as is.
+        """
+        if isinstance(x, Utils.Zero):
+            return x
+        return np.reshape(x, (-1, nSrc), order='F')
 
-        for tInd in reversed(range(self.nT)):
-            # tInd = tIndP - 1
-            if AdiagTinv is not None and (
-                tInd <= self.nT and
-                self.timeSteps[tInd] != self.timeSteps[tInd+1]
-            ):
-                AdiagTinv.clean()
-                AdiagTinv = None
-
-            # refactor if we need to
-            if AdiagTinv is None:  # and tInd > -1:
-                Adiag = self.getAdiag(tInd)
-                AdiagTinv = self.Solver(Adiag.T, **self.solverOpts)
-
-            if tInd < self.nT - 1:
-                Asubdiag = self.getAsubdiag(tInd+1)
-
-            for isrc, src in enumerate(self.survey.srcList):
-
-                # solve against df_duT_v
-                if tInd >= self.nT-1:
-                    # last timestep (first to be solved)
-                    ATinv_df_duT_v[isrc, :] = AdiagTinv * df_duT_v[
-                        src, '{}Deriv'.format(self._fieldType), tInd+1
-                    ]
-                elif tInd > -1:
-                    ATinv_df_duT_v[isrc, :] = AdiagTinv * (
-                        Utils.mkvc(df_duT_v[
-                            src, '{}Deriv'.format(self._fieldType), tInd+1
-                        ]) - Asubdiag.T * Utils.mkvc(ATinv_df_duT_v[isrc, :]))
-
-                dAsubdiagT_dm_v = self.getAsubdiagDeriv(
-                    tInd, f[src, ftype, tInd], ATinv_df_duT_v[isrc, :],
-                    adjoint=True)
+    def _getRHSDerivs(self, tInd, v, adjoint=False, srcInd=slice(None)):
+        """
+        Derivative of the RHS for the sources srcInd (all by default). The
+        forward derivatives are returned with one column per source. In the
+        adjoint, v has one column per source and the derivatives are summed
+        over the sources.
+        """
+        Srcs = self.survey.srcList[srcInd]
+        if adjoint:
+            RHSDeriv = Utils.Zero()
+            for i, src in enumerate(Srcs):
+                d = self.getRHSDeriv(tInd, src, v[:, i], adjoint=True)
+                if not isinstance(d, Utils.Zero):
+                    RHSDeriv = RHSDeriv + Utils.mkvc(d)
+            return RHSDeriv
 
-                dRHST_dm_v = self.getRHSDeriv(
-                    tInd+1, src, ATinv_df_duT_v[isrc, :], adjoint=True
-                )  # on nodes of time mesh
+        derivs = [self.getRHSDeriv(tInd, src, v) for src in Srcs]
+        nonZero = [d for d in derivs if not isinstance(d, Utils.Zero)]
+        if len(nonZero) == 0:
+            return Utils.Zero()
+        n = Utils.mkvc(nonZero[0]).size
+        return np.vstack([
+            np.zeros(n) if isinstance(d, Utils.Zero) else Utils.mkvc(d)
+            for d in derivs
+        ]).T
+
+    def _adjointTimeStepping(self, f, v, JTv, srcInd=slice(None)):
+        """
+        Back-solve through time of Jtvec. Each time step is one solve with a
+        column per source, the factors from the forward are re-used if Adiag
+        is symmetric. The receivers are projected as the time steps are
+        solved (see _adjointSource).
+
+        :param SimPEG.EM.TDEM.FieldsTDEM f: fields
+        :param SimPEG.Survey.Data v: data
+        :param numpy.ndarray JTv: J.T*v accumulated so far
+        :param slice srcInd: sources solved for, all by default
+        :rtype: tuple
+        :return: (J.T*v, sum of the blocks below the diagonal transposed
+            times the adjoint solutions, for the initial fields (n, nSrc))
+        """
+        ftype = self._fieldType + 'Solution'  # the thing we solved for
+        nSrc = len(self.survey.srcList[srcInd])
+
+        # adjoint solutions of the time steps that depend on the solution
+        # being solved for (the next two with BDF2)
+        ATinv = {}
+
+        def AsubdiagT(tInd):
+            # Asubdiag.T * adjoint of the later steps acting on tInd
+            out = 0.
+            for row in [tInd, tInd+1]:
+                if row not in ATinv:
+                    continue
+                Asubdiag = self.getAsubdiag(row)
+                for offset, scale in self._subdiagonals(row):
+                    if row + 1 - offset == tInd:
+                        out = out + scale * (Asubdiag.T * ATinv[row])
+            return out
 
-                un_src = f[src, ftype, tInd+1]
-                # cell centered on time mesh
-                dAT_dm_v = self.getAdiagDeriv(
-                    tInd, un_src, ATinv_df_duT_v[isrc, :], adjoint=True
+        for tInd in reversed(range(self.nT)):
+            AdiagTinv = self.getAdiaginv(tInd, adjoint=True)
+            df_duT, df_dmT_v = self._adjointSource(f, v, tInd+1, srcInd)
+            JTv = JTv + df_dmT_v
+
+            # solve against df_duT, the last timestep is the first to be
+            # solved
+            rhs = df_duT - AsubdiagT(tInd+1)
+            ATinv_df_duT_v = self._srcColumns(AdiagTinv * rhs, nSrc)
+            ATinv[tInd] = ATinv_df_duT_v
+            ATinv.pop(tInd+2, None)
+
+            # derivatives for all the sources at once
+            dAsubdiagT_dm_v = Utils.Zero()
+            for offset, scale in self._subdiagonals(tInd):
+                dAsubdiagT_dm_v = dAsubdiagT_dm_v + scale * (
+                    self.getAsubdiagDeriv(
+                        tInd, self._srcColumns(
+                            f[srcInd, ftype, tInd+1-offset], nSrc
+                        ), ATinv_df_duT_v, adjoint=True
+                    )
                 )
 
-                JTv = JTv + Utils.mkvc(
-                    -dAT_dm_v - dAsubdiagT_dm_v + dRHST_dm_v
-                )
+            dRHST_dm_v = self._getRHSDerivs(
+                tInd+1, ATinv_df_duT_v, adjoint=True, srcInd=srcInd
+            )  # on nodes of time mesh
 
-        # Treat the initial condition
+            un = self._srcColumns(f[srcInd, ftype, tInd+1], nSrc)
+            # cell centered on time mesh
+            dAT_dm_v = self.getAdiagDeriv(
+                tInd, un, ATinv_df_duT_v, adjoint=True
+            )
 
-        # del df_duT_v, ATinv_df_duT_v, A, Asubdiag
-        if AdiagTinv is not None:
-            AdiagTinv.clean()
+            JTv = JTv + self._sumSrcs(-dAT_dm_v - dAsubdiagT_dm_v, nSrc)
+            JTv = JTv + dRHST_dm_v
 
-        return Utils.mkvc(JTv).astype(float)
+        return JTv, AsubdiagT(0)
+
+    def _sumSrcs(self, x, nSrc):
+        # sum over the sources of derivatives with a column per source
+        if isinstance(x, Utils.Zero):
+            return x
+        return np.reshape(x, (-1, nSrc), order='F').sum(axis=1)
 
     def getSourceTerm(self, tInd):
         """
@@ -422,6 +772,112 @@ class BaseTDEMProblem(Problem.BaseTimeProblem, BaseEMProblem):
 
         return ifieldsDeriv
 
+    # Store the factors of the time-stepping matrix for each unique time
+    # step length
+    @property
+    def Adiaginv(self):
+        """
+        Factors of :code:`getAdiag`, indexed by the time-step length. These
+        are shared by fields, Jvec and Jtvec and cleared on a model update.
+        """
+        if getattr(self, '_Adiaginv', None) is None:
+            self._Adiaginv = Utils.SolverUtils.SolverCache(
+                self.Solver, self.solverOpts, maxMemory=self.maxFactorMemory,
+                counter=self.counter,
+                name='{}.Adiaginv'.format(self.__class__.__name__)
+            )
+        return self._Adiaginv
+
+    def _dtKey(self, tInd):
+        # time steps within dt_threshold share a factorization, the workers
+        # of the partitions of the sources (other than the first) have
+        # their own factors
+        key = int(round(self._dt(tInd) / self.dt_threshold))
+        partition = getattr(self._partition, 'index', 0)
+        if partition == 0:
+            return key
+        return (partition, key)
+
+    def getAdiaginv(self, tInd, adjoint=False):
+        """
+        Factors of the system matrix at a given time index
+
+        :param int tInd: time index
+        :param bool adjoint: factors of the transpose of the system matrix
+        :rtype: SimPEG.Solver
+        :return: solver for Adiag (or its transpose)
+        """
+        key = self._dtKey(tInd)
+        # factors in use by a worker are protected from eviction
+        held = getattr(self._partition, 'held', None)
+        hold = held is not None and (key, adjoint) not in held
+        if hold:
+            held.add((key, adjoint))
+        return self.Adiaginv.get(
+            key, lambda: self.getAdiag(tInd), transpose=adjoint, hold=hold
+        )
+
+    def _nWorkers(self, nSrc):
+        """
+        Number of partitions of the sources marched at the same time. This
+        is limited by n_cpu and by the number of sets of factors (one per
+        distinct time step length) that fit in parallelMemory.
+        """
+        nWorkers = min(int(self.n_cpu), nSrc)
+        if nWorkers > 1:
+            # also builds the mass matrices before the workers share them
+            Adiag = self.getAdiag(0)
+        if nWorkers > 1 and self.parallelMemory is not None:
+            nDt = len(set(
+                np.round(self._dt(tInd) / self.dt_threshold)
+                for tInd in range(self.nT)
+            ))
+            factorMemory = Utils.SolverUtils._factorMemory(
+                None, Adiag, self.Adiaginv.fillFactor
+            ) * 1e-9 * nDt
+            nWorkers = min(
+                nWorkers, int(self.parallelMemory // max(factorMemory, 1e-12))
+            )
+        return max(nWorkers, 1)
+
+    def _srcMap(self, func):
+        """
+        Evaluate func(srcInd) on contiguous partitions (slices) of the
+        sources of the survey, on a pool of n_cpu threads if n_cpu > 1. Each
+        worker factors Adiag on its own, the results are returned in the
+        order of the partitions.
+
+        :param callable func: function of a slice of the sources
+        :rtype: list
+        :return: [func(srcInd) for srcInd in partitions]
+        """
+        nSrc = len(self.survey.srcList)
+        nWorkers = self._nWorkers(nSrc)
+        bounds = np.linspace(0, nSrc, nWorkers+1).astype(int)
+        partitions = [
+            slice(bounds[i], bounds[i+1]) for i in range(nWorkers)
+        ]
+        if nWorkers == 1:
+            return [func(partitions[0])]
+
+        def work(i):
+            self._partition.index = i
+            self._partition.held = set()
+            try:
+                return func(partitions[i])
+            finally:
+                for key, _ in self._partition.held:
+                    self.Adiaginv.release(key)
+                self._partition.index = 0
+                self._partition.held = None
+
+        pool = ThreadPool(nWorkers)
+        try:
+            return pool.map(work, range(nWorkers), chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+
     # Store matrix factors if we need to solve the DC problem to get the
     # initial condition
     @property
@@ -531,7 +987,7 @@ class Problem3D_b(BaseTDEMProblem):
         """
         assert tInd >= 0 and tInd < self.nT
 
-        dt = self.timeSteps[tInd]
+        dt = self._dt(tInd)
         C = self.mesh.edgeCurl
         MeSigmaI = self.MeSigmaI
         MfMui = self.MfMui
@@ -687,154 +1143,32 @@ class Problem3D_e(BaseTDEMProblem):
     def __init__(self, mesh, **kwargs):
         BaseTDEMProblem.__init__(self, mesh, **kwargs)
 
-    # @profile
-    def Jtvec(self, m, v, f=None):
-
+    def _adjointInitialCondition(self, f, df_duT_v, JTv, AsubdiagT_v,
+                                 srcInd):
         """
-            Jvec computes the adjoint of the sensitivity times a vector
+        Treating initial condition when a galvanic source is included
         """
-
-        if f is None:
-            f = self.fields(m)
-
-        self.model = m
         ftype = self._fieldType + 'Solution'  # the thing we solved for
-
-        # Ensure v is a data object.
-        if not isinstance(v, self.dataPair):
-            v = self.dataPair(self.survey, v)
-
-        df_duT_v = self.Fields_Derivs(self.mesh, self.survey)
-
-        # same size as fields at a single timestep
-        ATinv_df_duT_v = np.zeros(
-            (
-                len(self.survey.srcList),
-                len(f[self.survey.srcList[0], ftype, 0])
-            ),
-            dtype=float
-        )
-        JTv = np.zeros(m.shape, dtype=float)
-
-        # Loop over sources and receivers to create a fields object:
-        # PT_v, df_duT_v, df_dmT_v
-        # initialize storage for PT_v (don't need to preserve over sources)
-        PT_v = self.Fields_Derivs(self.mesh, self.survey)
-        for src in self.survey.srcList:
-            # Looping over initializing field class is appending memory!
-            # PT_v = Fields_Derivs(self.mesh, self.survey) # initialize storage
-            # #for PT_v (don't need to preserve over sources)
-            # initialize size
-            df_duT_v[src, '{}Deriv'.format(self._fieldType), :] = (
-                np.zeros_like(f[src, self._fieldType, :])
-            )
-
-            for rx in src.rxList:
-                PT_v[src, '{}Deriv'.format(rx.projField), :] = rx.evalDeriv(
-                    src, self.mesh, self.timeMesh, f, Utils.mkvc(v[src, rx]),
-                    adjoint=True
-                )
-                # this is +=
-
-                # PT_v = np.reshape(curPT_v,(len(curPT_v)/self.timeMesh.nN,
-                # self.timeMesh.nN), order='F')
-                df_duTFun = getattr(f, '_{}Deriv'.format(rx.projField), None)
-
-                for tInd in range(self.nT+1):
-                    cur = df_duTFun(
-                        tInd, src, None, Utils.mkvc(
-                            PT_v[src, '{}Deriv'.format(rx.projField), tInd]
-                        ),
-                        adjoint=True
-                    )
-
-                    df_duT_v[src, '{}Deriv'.format(self._fieldType), tInd] = (
-                        df_duT_v[src, '{}Deriv'.format(self._fieldType), tInd]
-                        + Utils.mkvc(cur[0], 2)
-                        )
-                    JTv = cur[1] + JTv
-
-        # no longer need this
-        del PT_v
-
-        AdiagTinv = None
-
-        # Do the back-solve through time
-        # if the previous timestep is the same: no need to refactor the matrix
-        # for tInd, dt in zip(range(self.nT), self.timeSteps):
-
-        for tInd in reversed(range(self.nT)):
-            # tInd = tIndP - 1
-            if AdiagTinv is not None and (
-                tInd <= self.nT and
-                self.timeSteps[tInd] != self.timeSteps[tInd+1]
-            ):
-                AdiagTinv.clean()
-                AdiagTinv = None
-
-            # refactor if we need to
-            if AdiagTinv is None:  # and tInd > -1:
-                Adiag = self.getAdiag(tInd)
-                AdiagTinv = self.Solver(Adiag.T, **self.solverOpts)
-
-            if tInd < self.nT - 1:
-                Asubdiag = self.getAsubdiag(tInd+1)
-
-            for isrc, src in enumerate(self.survey.srcList):
-
-                # solve against df_duT_v
-                if tInd >= self.nT-1:
-                    # last timestep (first to be solved)
-                    ATinv_df_duT_v[isrc, :] = AdiagTinv * df_duT_v[
-                        src, '{}Deriv'.format(self._fieldType), tInd+1]
-                elif tInd > -1:
-                    ATinv_df_duT_v[isrc, :] = AdiagTinv * (
-                        Utils.mkvc(df_duT_v[
-                            src, '{}Deriv'.format(self._fieldType), tInd+1
-                        ]
-                        ) - Asubdiag.T * Utils.mkvc(ATinv_df_duT_v[isrc, :]))
-
-                dAsubdiagT_dm_v = self.getAsubdiagDeriv(
-                    tInd, f[src, ftype, tInd], ATinv_df_duT_v[isrc, :],
-                    adjoint=True)
-
-                dRHST_dm_v = self.getRHSDeriv(
-                        tInd+1, src, ATinv_df_duT_v[isrc, :], adjoint=True
-                        )  # on nodes of time mesh
-
-                un_src = f[src, ftype, tInd+1]
-                # cell centered on time mesh
-                dAT_dm_v = self.getAdiagDeriv(
-                    tInd, un_src, ATinv_df_duT_v[isrc, :], adjoint=True
-                )
-
-                JTv = JTv + Utils.mkvc(
-                    -dAT_dm_v - dAsubdiagT_dm_v + dRHST_dm_v
-                )
-
-        # Treating initial condition when a galvanic source is included
         tInd = -1
         Grad = self.mesh.nodalGrad
+        # the initial fields enter the first time steps through Asubdiag
 
-        for isrc, src in enumerate(self.survey.srcList):
+        for isrc, src in enumerate(self.survey.srcList[srcInd]):
             if src.srcType == "galvanic":
 
-                ATinv_df_duT_v[isrc, :] = Grad*(self.Adcinv*(Grad.T*(
-                    Utils.mkvc(df_duT_v[
-                        src, '{}Deriv'.format(self._fieldType), tInd+1
-                    ]
-                    ) - Asubdiag.T * Utils.mkvc(ATinv_df_duT_v[isrc, :]))
-                ))
+                ATinv_df_duT_v = Grad*(self.Adcinv*(Grad.T*(
+                    df_duT_v[:, isrc] - AsubdiagT_v[:, isrc]
+                )))
 
                 dRHST_dm_v = self.getRHSDeriv(
-                        tInd+1, src, ATinv_df_duT_v[isrc, :], adjoint=True
+                        tInd+1, src, ATinv_df_duT_v, adjoint=True
                         )  # on nodes of time mesh
 
                 un_src = f[src, ftype, tInd+1]
                 # cell centered on time mesh
                 dAT_dm_v = (
                     self.MeSigmaDeriv(
-                        un_src, ATinv_df_duT_v[isrc, :], adjoint=True
+                        un_src, ATinv_df_duT_v, adjoint=True
                     )
                 )
 
@@ -842,11 +1176,7 @@ class Problem3D_e(BaseTDEMProblem):
                     -dAT_dm_v + dRHST_dm_v
                 )
 
-        # del df_duT_v, ATinv_df_duT_v, A, Asubdiag
-        if AdiagTinv is not None:
-            AdiagTinv.clean()
-
-        return Utils.mkvc(JTv).astype(float)
+        return JTv
 
     def getAdiag(self, tInd):
         """
@@ -854,7 +1184,7 @@ class Problem3D_e(BaseTDEMProblem):
         """
         assert tInd >= 0 and tInd < self.nT
 
-        dt = self.timeSteps[tInd]
+        dt = self._dt(tInd)
         C = self.mesh.edgeCurl
         MfMui = self.MfMui
         MeSigma = self.MeSigma
@@ -867,7 +1197,7 @@ class Problem3D_e(BaseTDEMProblem):
         """
         assert tInd >= 0 and tInd < self.nT
 
-        dt = self.timeSteps[tInd]
+        dt = self._dt(tInd)
         # MeSigmaDeriv = self.MeSigmaDeriv(u)
 
         if adjoint:
@@ -905,12 +1235,10 @@ class Problem3D_e(BaseTDEMProblem):
         # if tInd == len(self.timeSteps):
         #     tInd = tInd - 1
 
-        dt = self.timeSteps[tInd-1]
         s_m, s_e = self.getSourceTerm(tInd)
-        _, s_en1 = self.getSourceTerm(tInd-1)
 
         # For spped up, ignore the second term in rhs when s_m is zero
-        rhs = -1./dt * (s_e - s_en1)
+        rhs = -self._sourceTimeDerivative(tInd, s_e)
         if s_m.all() != 0:
             rhs += self.mesh.edgeCurl.T * self.MfMui * s_m
         return rhs
@@ -999,7 +1327,7 @@ class Problem3D_h(BaseTDEMProblem):
         """
         assert tInd >= 0 and tInd < self.nT
 
-        dt = self.timeSteps[tInd]
+        dt = self._dt(tInd)
         C = self.mesh.edgeCurl
         MfRho = self.MfRho
         MeMu = self.MeMu
@@ -1009,7 +1337,7 @@ class Problem3D_h(BaseTDEMProblem):
     def getAdiagDeriv(self, tInd, u, v, adjoint=False):
         assert tInd >= 0 and tInd < self.nT
 
-        dt = self.timeSteps[tInd]
+        dt = self._dt(tInd)
         C = self.mesh.edgeCurl
 
         if adjoint:
@@ -1073,7 +1401,7 @@ class Problem3D_j(BaseTDEMProblem):
         """
         assert tInd >= 0 and tInd < self.nT
 
-        dt = self.timeSteps[tInd]
+        dt = self._dt(tInd)
         C = self.mesh.edgeCurl
         MfRho = self.MfRho
         MeMuI = self.MeMuI
@@ -1089,7 +1417,7 @@ class Problem3D_j(BaseTDEMProblem):
     def getAdiagDeriv(self, tInd, u, v, adjoint=False):
         assert tInd >= 0 and tInd < self.nT
 
-        dt = self.timeSteps[tInd]
+        dt = self._dt(tInd)
         C = self.mesh.edgeCurl
         MfRho = self.MfRho
         MeMuI = self.MeMuI
@@ -1124,11 +1452,12 @@ class Problem3D_j(BaseTDEMProblem):
 
         C = self.mesh.edgeCurl
         MeMuI = self.MeMuI
-        dt = self.timeSteps[tInd]
         s_m, s_e = self.getSourceTerm(tInd)
-        _, s_en1 = self.getSourceTerm(tInd-1)
 
-        rhs = -1./dt * (s_e - s_en1) + C * MeMuI * s_m
+        rhs = (
+            -self._sourceTimeDerivative(tInd, s_e, stepInd=tInd) +
+            C * MeMuI * s_m
+        )
         if self._makeASymmetric:
             return self.MfRho.T * rhs
         return rhs
@@ -64,7 +64,7 @@ class BaseRx(SimPEG.Survey.BaseTimeRx):
 
         Ps = self.getSpatialP(mesh, f)
         Pt = self.getTimeP(timeMesh, f)
-        P = sp.kron(Pt, Ps)
+        P = sp.kron(Pt, Ps, format='csc')
 
         if self.storeProjections:
             self._Ps[(mesh, timeMesh)] = P
@@ -101,20 +101,30 @@ class BaseRx(SimPEG.Survey.BaseTimeRx):
         f_part = Utils.mkvc(f[src, self.projField, :])
         return P*f_part
 
-    def evalDeriv(self, src, mesh, timeMesh, f, v, adjoint=False):
+    def evalDeriv(self, src, mesh, timeMesh, f, v, adjoint=False, tInd=None):
         """
         Derivative of projected fields with respect to the inversion model times a vector.
 
+        If tInd is given, only the fields at the time index tInd are
+        projected: v are the fields at tInd (nP) and the data are returned,
+        or, in the adjoint, v are the data and the fields at tInd are
+        returned. The sum over the time indices is the full derivative.
+
         :param SimPEG.EM.TDEM.SrcTDEM.BaseSrc src: TDEM source
         :param BaseMesh mesh: mesh used
         :param BaseMesh timeMesh: time mesh
         :param Fields f: fields object
         :param numpy.ndarray v: vector to multiply
+        :param int tInd: time index (all times by default)
         :rtype: numpy.ndarray
         :return: fields projected to recievers
         """
 
         P = self.getP(mesh, timeMesh, f)
+        if tInd is not None:
+            # columns of P acting on the fields at the time index tInd
+            nP = P.shape[1] // timeMesh.nN
+            P = P[:, tInd*nP:(tInd+1)*nP]
         if not adjoint:
             return P * v # Utils.mkvc(v[src, self.projField+'Deriv', :])
         elif adjoint:
@@ -26,6 +26,11 @@ class Survey(SimPEG.Survey.BaseSurvey):
         SimPEG.Survey.BaseSurvey.__init__(self, **kwargs)
 
     def eval(self, u):
+        if isinstance(u, SimPEG.Survey.Data):
+            return u  # forward-only problems stream the data
+        data = getattr(u, '_projectedData', None)
+        if data is not None and data.survey is self:
+            return data  # projected while checkpointing the solution
         data = SimPEG.Survey.Data(self)
         for src in self.srcList:
             for rx in src.rxList:
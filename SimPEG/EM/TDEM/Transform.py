@@ -0,0 +1,268 @@
+"""
+Frequency to time transform of the TDEM responses.
+
+With the :math:`e^{i\\omega t}` convention of the FDEM problems, the response
+to a step-off of the source current, and its time derivative, are given by
+the imaginary part of the frequency domain response :math:`G(\\omega)`
+
+.. math::
+
+    s(t) = -\\frac{2}{\\pi} \\int_0^\\infty
+        \\frac{\\Im G(\\omega)}{\\omega} \\cos(\\omega t) d\\omega
+    \\qquad
+    \\frac{\\partial s}{\\partial t} = \\frac{2}{\\pi} \\int_0^\\infty
+        \\Im G(\\omega) \\sin(\\omega t) d\\omega
+
+Both integrals are evaluated with a digital filter
+
+.. math::
+
+    \\int_0^\\infty K(\\omega) \\cos(\\omega t) d\\omega \\approx
+        \\frac{1}{t} \\sum_j w_j K(a_j / t)
+
+on log-spaced abscissae :math:`a_j`, with :math:`K` interpolated from the
+responses at a small set of frequencies, over the band of the receiver
+times only. The response to a waveform is then
+the convolution of the step-off response with the derivative of the waveform.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import numpy as np
+from scipy.interpolate import splrep, splev
+
+from . import SrcTDEM as Src
+
+_filters = {}
+
+
+def digitalFilter(kind='cos', nFilter=121, spacing=0.1, beta=1e-12):
+    """
+    Abscissae and weights of a cosine or sine transform filter.
+
+    The weights are a regularized least-squares fit of the transforms of
+    Gaussians over five decades of times,
+
+    .. math::
+
+        \\int_0^\\infty e^{-x^2} \\cos(bx) dx =
+            \\frac{\\sqrt{\\pi}}{2} e^{-b^2/4}
+        \\qquad
+        \\int_0^\\infty x e^{-x^2} \\sin(bx) dx =
+            \\frac{\\sqrt{\\pi}}{4} b e^{-b^2/4}
+
+    The fit alone is ill-conditioned: its weights alternate in sign with
+    magnitudes up to several hundreds, which amplify the noise of the
+    responses.
+    A ridge penalty :math:`\\beta \\sigma_{max} \\|\\mathbf{w}\\|`,
+    relative to the largest singular value of the (weighted) fit, bounds the
+    weights to a few units for a misfit below :math:`10^{-6}`.
+
+    :param str kind: 'cos' or 'sin'
+    :param int nFilter: number of abscissae
+    :param float spacing: spacing of the abscissae (natural log)
+    :param float beta: relative ridge parameter
+    :rtype: tuple
+    :return: (abscissae, weights)
+    """
+    key = (kind, int(nFilter), float(spacing), float(beta))
+    if key in _filters:
+        return _filters[key]
+
+    a = np.exp(spacing * (np.arange(nFilter) - (nFilter - 1) / 2.))
+    b = np.logspace(-2.5, 2.5, 400)
+    x = a[None, :] / b[:, None]
+    if kind == 'cos':
+        A = np.exp(-x**2) / b[:, None]
+        y = np.sqrt(np.pi) / 2. * np.exp(-b**2 / 4.)
+    elif kind == 'sin':
+        A = x * np.exp(-x**2) / b[:, None]
+        y = np.sqrt(np.pi) / 4. * b * np.exp(-b**2 / 4.)
+    else:
+        raise ValueError("kind must be 'cos' or 'sin', not {}".format(kind))
+
+    # relative misfit, down to the smallest values of the transform
+    W = 1. / (np.abs(y) + 1e-8)
+    A = A * W[:, None]
+    ridge = beta * np.linalg.norm(A, 2) * np.eye(nFilter)
+    weights = np.linalg.lstsq(
+        np.vstack([A, ridge]), np.r_[y * W, np.zeros(nFilter)], rcond=-1
+    )[0]
+
+    _filters[key] = (a, weights)
+    return a, weights
+
+
+def transformFrequencies(times, nFreqPerDecade=4, margin=2., nFilter=121,
+                         spacing=0.1):
+    """
+    Frequencies needed to transform the responses at the given times.
+
+    The frequencies cover the band :math:`1/(2\\pi t)` of the times, and
+    margin decades on each side. Beyond them, :math:`K` is extrapolated (see
+    stepOffMatrix), rather than sampled over the whole span of the filter.
+    For times over D decades, this gives about nFreqPerDecade * (D + 2
+    margin) + 3 frequencies, e.g. 31 for three decades with the defaults.
+
+    :param numpy.ndarray times: times (s), all > 0
+    :param int nFreqPerDecade: number of frequencies per decade
+    :param float margin: decades of frequencies beyond the band of the times
+    :param int nFilter: number of abscissae of the filter
+    :param float spacing: spacing of the abscissae of the filter
+    :rtype: numpy.ndarray
+    :return: frequencies (Hz)
+    """
+    times = np.asarray(times, dtype=float)
+    assert np.all(times > 0), 'the times must be positive'
+    a, _ = digitalFilter('cos', nFilter, spacing)
+    # never beyond the abscissae of the filter, plus one frequency on each
+    # side for the interpolation
+    lo = max(
+        np.log10(a[0] / times.max() / (2. * np.pi)),
+        np.log10(1. / times.max() / (2. * np.pi)) - margin
+    )
+    hi = min(
+        np.log10(a[-1] / times.min() / (2. * np.pi)),
+        np.log10(1. / times.min() / (2. * np.pi)) + margin
+    )
+    lo = np.floor(lo * nFreqPerDecade) - 1
+    hi = np.ceil(hi * nFreqPerDecade) + 1
+    return 10.**(np.arange(lo, hi + 1) / nFreqPerDecade)
+
+
+def stepOffMatrix(times, freqs, kind='cos', nFilter=121, spacing=0.1):
+    """
+    Matrix of the transform of the imaginary part of a frequency domain
+    response to the step-off response ('cos') or its time derivative
+    ('sin') at the given times.
+
+    :math:`K = \\Im G / \\omega` is interpolated with a cubic spline in
+    :math:`\\log \\omega`, which is smooth for both transforms. Below the
+    lowest frequency K is constant (:math:`\\Im G` is proportional to
+    :math:`\\omega` at low frequencies), above the highest it is zero.
+
+    :param numpy.ndarray times: times (s), all > 0
+    :param numpy.ndarray freqs: frequencies (Hz), see transformFrequencies
+    :param str kind: 'cos' or 'sin'
+    :param int nFilter: number of abscissae of the filter
+    :param float spacing: spacing of the abscissae of the filter
+    :rtype: numpy.ndarray
+    :return: T (nTimes, nFreq), such that s(times) = T * Im G(freqs)
+    """
+    times = np.asarray(times, dtype=float)
+    omega = 2. * np.pi * np.asarray(freqs, dtype=float)
+    a, weights = digitalFilter(kind, nFilter, spacing)
+    if kind == 'cos':
+        coef = -2. / np.pi
+    else:
+        coef = 2. / np.pi
+
+    # cubic splines (not-a-knot) of the unit responses at each frequency
+    basis = [
+        splrep(np.log(omega), e, k=3, s=0) for e in np.eye(omega.size)
+    ]
+
+    T = np.empty((times.size, omega.size))
+    nChunk = max(int(1e6 // (a.size * omega.size)), 1)
+    for i0 in range(0, times.size, nChunk):
+        t = times[i0:i0+nChunk]
+        x = a[None, :] / t[:, None]
+        w = weights[None, :] / t[:, None]
+        if kind == 'sin':
+            w = w * x
+        logx = np.log(x)
+        inside = logx <= np.log(omega[-1])
+        logx = np.clip(logx, np.log(omega[0]), np.log(omega[-1]))
+        T[i0:i0+nChunk] = coef * np.column_stack([
+            np.sum(w * inside * splev(logx, tck), axis=1) for tck in basis
+        ])
+    return T / omega[None, :]
+
+
+def waveformSupport(waveform, t0=0.):
+    """
+    Time interval over which the waveform varies, from t0 to the time the
+    source is off.
+
+    :param SimPEG.EM.TDEM.SrcTDEM.BaseWaveform waveform: waveform
+    :param float t0: start of the simulation
+    :rtype: tuple
+    :return: (start, off-time)
+    """
+    # the step-off waveform is always off at t=0
+    if isinstance(waveform, Src.StepOffWaveform):
+        return t0, t0
+    offTime = waveform.offTime
+    rampOff = getattr(waveform, 'ramp_off', None)
+    if rampOff is not None:
+        offTime = max(offTime, rampOff[1])
+    return t0, max(offTime, t0)
+
+
+def convolutionWeights(times, waveform, t0=0., nSegment=40, nGauss=4):
+    """
+    Quadrature of the convolution of a step-off response with the waveform
+
+    .. math::
+
+        d(t) = -\\int w'(\\tau) s(t - \\tau) d\\tau
+
+    The waveform is sampled at nodes between t0 and its off-time, refined
+    towards the off-time, and is linear between the nodes. The jumps of the
+    waveform at t0 (if it has no initial fields) and at the off-time are
+    included. Only receiver times after the off-time are supported.
+
+    :param numpy.ndarray times: receiver times (s)
+    :param SimPEG.EM.TDEM.SrcTDEM.BaseWaveform waveform: waveform
+    :param float t0: start of the simulation
+    :param int nSegment: number of uniform segments of the waveform
+    :param int nGauss: number of Gauss points on each segment
+    :rtype: tuple
+    :return: (evalTimes, Q), such that d(times) = Q * s(evalTimes)
+    """
+    times = np.asarray(times, dtype=float)
+    start, offTime = waveformSupport(waveform, t0)
+    assert np.all(times > offTime), (
+        'The frequency domain transform only supports times after the '
+        'off-time of the waveform ({}).'.format(offTime)
+    )
+
+    if offTime > start:
+        # refine towards the off-time, where s(t - tau) varies the fastest
+        dtMin = min(0.1 * (times.min() - offTime), offTime - start)
+        nRefine = int(np.ceil(5 * np.log10((offTime - start) / dtMin))) + 1
+        tau = np.unique(np.r_[
+            np.linspace(start, offTime, nSegment + 1),
+            offTime - np.logspace(
+                np.log10(dtMin), np.log10(offTime - start), nRefine
+            )
+        ])
+        tau = tau[(tau >= start) & (tau <= offTime)]
+    else:
+        tau = np.r_[start]
+
+    w = np.array([waveform.eval(t) for t in tau], dtype=float)
+    wBefore = w[0] if waveform.hasInitialFields else 0.
+
+    # jumps at the start and at the off-time
+    evalTimes = [times - start, times - offTime]
+    Q = [-(w[0] - wBefore) * np.eye(times.size), w[-1] * np.eye(times.size)]
+
+    # linear segments: -slope * int s(t - tau) dtau
+    if tau.size > 1:
+        x, gw = np.polynomial.legendre.leggauss(nGauss)
+        half = np.diff(tau) / 2.
+        mid = tau[:-1] + half
+        slope = np.diff(w) / np.diff(tau)
+        nodes = (mid[:, None] + half[:, None] * x[None, :]).ravel()
+        qw = (-(slope * half)[:, None] * gw[None, :]).ravel()
+        evalTimes.append((times[:, None] - nodes[None, :]).ravel())
+        Qs = np.zeros((times.size, times.size * nodes.size))
+        for i in range(times.size):
+            Qs[i, i*nodes.size:(i+1)*nodes.size] = qw
+        Q.append(Qs)
+
+    return np.hstack(evalTimes), np.hstack(Q)
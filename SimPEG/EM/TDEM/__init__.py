@@ -2,10 +2,13 @@ from .ProblemTDEM import (
     BaseTDEMProblem, Problem3D_b, Problem3D_e, Problem3D_h, Problem3D_j
 )
 from .FieldsTDEM import (
-    FieldsTDEM, Fields3D_b, Fields3D_e, Fields3D_h, Fields3D_j
+    FieldsTDEM, Fields3D_b, Fields3D_e, Fields3D_h, Fields3D_j,
+    CheckpointedSolution
 )
+from .ProblemFD import Problem3D_FD, TransformedData
 from .SurveyTDEM import Survey
 from . import SrcTDEM as Src
 from . import RxTDEM as Rx
+from . import Transform
 
 
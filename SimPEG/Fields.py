@@ -183,6 +183,25 @@ class Fields(object):
             other = self.aliasFields[other][0]
         return self._fields.__contains__(other)
 
+    def _fromSolution(self, name, solution, srcList, *args):
+        """
+        Field of the sources in srcList computed from their solution,
+        without storing it (e.g. when streaming data).
+
+        :param str name: field name
+        :param numpy.ndarray solution: solution of the sources (nP, nSrc)
+        :param list srcList: sources
+        :param args: extra arguments of the alias function (e.g. tInd)
+        :rtype: numpy.ndarray
+        :return: field (nP, nSrc)
+        """
+        if name in self.knownFields:
+            return solution
+        alias, loc, func = self.aliasFields[name]
+        if isinstance(func, string_types):
+            func = getattr(self, func)
+        return func(solution, srcList, *args)
+
 
 class TimeFields(Fields):
     """Fancy Field Storage for time domain problems
@@ -140,6 +140,9 @@ class BaseInvProblem(Props.BaseSimPEG):
         if f is None:
             if isinstance(self.dmisfit, DataMisfit.BaseDataMisfit):
                 f = self.dmisfit.prob.fields(m)
+            elif hasattr(self.dmisfit, 'fields'):
+                # e.g. the tiles of a survey, solved in parallel
+                f = self.dmisfit.fields(m)
             elif isinstance(self.dmisfit, ObjectiveFunction.BaseObjectiveFunction):
                 f = []
                 for objfct in self.dmisfit.objfcts:
@@ -1320,6 +1320,71 @@ class InjectActiveCells(IdentityMap):
             return self.P * v
         return self.P
 
+class TileMap(IdentityMap):
+    """
+        Model on the active cells of a global mesh, projected on the cells
+        of a local mesh (e.g. a coarse octree around a tile of data).
+
+        Each active cell of the global mesh is assigned to the local cell
+        containing its center. The value of a local cell is the sum of the
+        values of its global cells, weighted by their volume relative to the
+        volume of the local cell. The mass of the model is preserved, and the
+        local cells without global cells are inactive (activeLocal).
+
+        This is an approximation where a global cell is larger than the local
+        cell containing its center, e.g. the padding cells of a tensor mesh
+        under the finest cells of a tile: the whole mass of the global cell
+        is lumped into that local cell, instead of being shared by the local
+        cells it overlaps. The local cell then has a value larger than the
+        model, and the local cells around it are inactive or too small. The
+        octrees of :code:`PF.Tiles.localMesh` coarsen away from the
+        receivers, so that this is limited to the cells far from the tile,
+        where the data are the least sensitive to the model.
+
+        :param discretize.BaseMesh mesh: global mesh
+        :param numpy.ndarray indActive: active cells of the global mesh
+        :param discretize.BaseMesh meshLocal: local mesh, covering the active
+            cells of the global mesh
+    """
+
+    def __init__(self, mesh, indActive, meshLocal, **kwargs):
+        indActive = np.asarray(indActive)
+        if indActive.dtype == bool:
+            indActive = np.where(indActive)[0]
+        super(TileMap, self).__init__(
+            mesh=mesh, nP=int(indActive.size), **kwargs
+        )
+        self.indActive = indActive
+        self.meshLocal = meshLocal
+
+        cells = Utils.containingCells(meshLocal, mesh.gridCC[indActive, :])
+        assert np.all(cells >= 0), (
+            'The local mesh must contain the active cells of the global mesh'
+        )
+
+        P = sp.csr_matrix(
+            (Utils.mkvc(mesh.vol)[indActive], (cells, range(self.nP))),
+            shape=(meshLocal.nC, self.nP)
+        )
+        #: Active cells of the local mesh
+        self.activeLocal = Utils.mkvc(np.asarray(P.sum(axis=1))) > 0
+        self.P = (
+            Utils.sdiag(1./Utils.mkvc(meshLocal.vol)[self.activeLocal]) *
+            P[self.activeLocal, :]
+        )
+
+    @property
+    def shape(self):
+        return (self.P.shape[0], self.nP)
+
+    def _transform(self, m):
+        return self.P * m
+
+    def deriv(self, m, v=None):
+        if v is not None:
+            return self.P * v
+        return self.P
+
 ###############################################################################
 #                                                                             #
 #                             Parametric Maps                                 #
@@ -0,0 +1,296 @@
+"""
+Matrix-free potential field sensitivities of gridded surveys.
+
+When the receivers lie on a regular grid at a constant height above a
+tensor mesh with uniform horizontal cells, the kernel between a receiver and
+a cell only depends on their horizontal offset within each layer of cells.
+G is then block-Toeplitz, and is applied as a sum over the layers of 2D
+convolutions
+
+.. math ::
+
+    d_r(i, j) = \\sum_{k} \\sum_b \\sum_{p, q} K_{rb}^k(p - i k_x, q - j k_y)
+        m_b(p, q, k)
+
+where :math:`k_x, k_y` are the receiver spacings in number of cells. The
+kernels of each layer are evaluated once, for a single receiver, and the
+convolutions are done with FFTs, in :math:`O(n \\log n)` operations and
+:math:`O(n)` memory.
+"""
+
+from __future__ import print_function
+from __future__ import division
+
+from functools import reduce
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.linalg import LinearOperator
+
+try:
+    from math import gcd
+except ImportError:
+    from fractions import gcd  # Python 2
+
+
+def gridLayout(mesh, rxLoc, tol=1e-6, minFill=0.5):
+    """
+    Layout of the receivers on a regular grid over the cells of a mesh.
+
+    :param discretize.TensorMesh mesh: mesh
+    :param numpy.ndarray rxLoc: receiver locations (nD, 3)
+    :param float tol: tolerance on the locations, relative to the cell size
+    :param float minFill: smallest fraction of the grid nodes that are
+        receivers
+    :rtype: dict
+    :return: origin, number of nodes, spacing (in cells) and grid index of
+        each receiver, None if the survey is not gridded
+    """
+    if getattr(mesh, '_meshType', None) != 'TENSOR' or mesh.dim != 3:
+        return None
+
+    rxLoc = np.atleast_2d(rxLoc)
+    h = [mesh.hx, mesh.hy]
+    if not all(np.allclose(hi, hi[0], rtol=tol) for hi in h):
+        return None
+    if np.ptp(rxLoc[:, 2]) > tol * min(h[0][0], h[1][0]):
+        return None
+
+    shape, stride, index = [], [], []
+    for dim in range(2):
+        s = (rxLoc[:, dim] - rxLoc[:, dim].min()) / h[dim][0]
+        si = np.round(s)
+        if np.any(np.abs(s - si) > tol * np.maximum(1., si)):
+            return None
+        si = si.astype(int)
+        steps = np.diff(np.unique(si))
+        k = reduce(gcd, steps.tolist(), 0) or 1
+        index.append(si // k)
+        stride.append(k)
+        shape.append(int(si.max() // k) + 1)
+
+    flat = index[0] + shape[0] * index[1]
+    if (
+        np.unique(flat).size != rxLoc.shape[0] or
+        rxLoc.shape[0] < minFill * shape[0] * shape[1]
+    ):
+        return None
+
+    return {
+        'origin': np.r_[rxLoc[:, 0].min(), rxLoc[:, 1].min(),
+                        rxLoc[:, 2].mean()],
+        'shape': tuple(shape), 'stride': tuple(stride),
+        'index': (index[0], index[1])
+    }
+
+
+def _fastLen(n):
+    # smallest 5-smooth integer >= n, fast lengths of the FFT
+    best = 2 * n
+    p5 = 1
+    while p5 < best:
+        p35 = p5
+        while p35 < best:
+            p235 = p35
+            while p235 < n:
+                p235 *= 2
+            best = min(best, p235)
+            p35 *= 3
+        p5 *= 5
+    return best
+
+
+class ConvolutionOperator(object):
+    """
+    Sensitivity matrix of a gridded survey, applied by FFT convolutions.
+
+    The columns are the active cells, repeated for each input component if
+    weights is None (e.g. the three components of a magnetization vector).
+    If weights are given, the input components are summed with the weights
+    of each cell (e.g. the direction of an induced magnetization). The rows
+    are the receivers, in the order of the survey, for each output
+    component.
+
+    :param discretize.TensorMesh mesh: mesh
+    :param numpy.ndarray inds: indices of the active cells
+    :param dict layout: layout of the receivers, see gridLayout
+    :param callable kernel: kernel(Xn, Yn, Zn, rxLoc) returns the kernel
+        (nOut, nIn, nV) of a receiver rxLoc (3,) and nV cells with corners
+        Xn, Yn, Zn (nV, 2)
+    :param numpy.ndarray weights: weights of the input components of each
+        active cell (nIn, nC), optional
+    """
+
+    def __init__(self, mesh, inds, layout, kernel, weights=None):
+        self.mesh = mesh
+        self.inds = np.asarray(inds)
+        self.layout = layout
+        self.weights = weights
+        self.dtype = np.dtype(float)
+
+        nCx, nCy, nCz = mesh.vnC
+        (nx, ny), (kx, ky) = layout['shape'], layout['stride']
+        self._nCell = (nCx, nCy, nCz)
+        # offsets of the cells from the first receiver, reversed so that
+        # the correlation is a convolution
+        Lx, Ly = nCx + (nx - 1) * kx, nCy + (ny - 1) * ky
+        self._N = (_fastLen(Lx), _fastLen(Ly))
+
+        sx = (nCx - 1 - np.arange(Lx)) * mesh.hx[0] + mesh.x0[0]
+        sy = (nCy - 1 - np.arange(Ly)) * mesh.hy[0] + mesh.x0[1]
+        SX, SY = np.meshgrid(sx, sy, indexing='ij')
+        Xn = np.c_[SX.ravel(), SX.ravel() + mesh.hx[0]]
+        Yn = np.c_[SY.ravel(), SY.ravel() + mesh.hy[0]]
+
+        zn = mesh.vectorNz
+        Khat = None
+        for iz in range(nCz):
+            Zn = np.c_[np.ones(Xn.shape[0]) * zn[iz],
+                       np.ones(Xn.shape[0]) * zn[iz+1]]
+            K = np.asarray(kernel(Xn, Yn, Zn, layout['origin']))
+            K = K.reshape(K.shape[:2] + (Lx, Ly))
+            if Khat is None:
+                Khat = np.zeros(
+                    K.shape[:2] + (self._N[0], self._N[1]//2 + 1, nCz),
+                    dtype=complex
+                )
+            Khat[..., iz] = np.fft.rfft2(K, s=self._N)
+        self._Khat = Khat
+        self.nOut, self.nIn = Khat.shape[:2]
+
+        # entries of the convolution seen by the receivers
+        self._rx = (
+            nCx - 1 + layout['index'][0] * kx,
+            nCy - 1 + layout['index'][1] * ky
+        )
+        nD = layout['index'][0].size
+        nCol = self.inds.size if weights is not None else (
+            self.nIn * self.inds.size
+        )
+        self.shape = (self.nOut * nD, nCol)
+
+    def _cells(self, v):
+        # model of each input component on the full grid of cells
+        nC = self.inds.size
+        if self.weights is None:
+            v = np.reshape(v, (self.nIn, nC))
+        else:
+            v = self.weights * v[None, :]
+        m = np.zeros((self.nIn, np.prod(self._nCell)))
+        m[:, self.inds] = v
+        return m.reshape((self.nIn,) + self._nCell, order='F')
+
+    def dot(self, v):
+        """G*v"""
+        mhat = np.fft.rfft2(
+            self._cells(np.asarray(v, dtype=float)), s=self._N, axes=(1, 2)
+        )
+        dhat = np.einsum('rbxyz,bxyz->rxy', self._Khat, mhat)
+        d = np.fft.irfft2(dhat, s=self._N, axes=(1, 2))
+        return d[:, self._rx[0], self._rx[1]].ravel()
+
+    def _adjointGrid(self, v, Khat):
+        # correlation of the data v (nOut*nD,) with the kernels Khat, on
+        # the full grid of cells (nIn, nCx, nCy, nCz)
+        z = np.zeros((Khat.shape[0],) + self._N)
+        z[:, self._rx[0], self._rx[1]] = np.reshape(v, (Khat.shape[0], -1))
+        zhat = np.fft.rfft2(z, axes=(1, 2))
+        mhat = np.einsum('rbxyz,rxy->bxyz', np.conj(Khat), zhat)
+        m = np.fft.irfft2(mhat, s=self._N, axes=(1, 2))
+        nCx, nCy, _ = self._nCell
+        return m[:, :nCx, :nCy, :]
+
+    def rdot(self, v):
+        """G.T*v"""
+        m = self._adjointGrid(np.asarray(v, dtype=float), self._Khat)
+        m = m.reshape((self.nIn, -1), order='F')[:, self.inds]
+        if self.weights is None:
+            return m.ravel()
+        return np.sum(self.weights * m, axis=0)
+
+    @property
+    def T(self):
+        """Transpose of G, as a linear operator"""
+        return LinearOperator(
+            self.shape[::-1], matvec=self.rdot, rmatvec=self.dot,
+            dtype=self.dtype
+        )
+
+    def __mul__(self, other):
+        if isinstance(other, np.ndarray) and other.ndim == 1:
+            return self.dot(other)
+        # product with a matrix (e.g. the derivative of a map)
+        return LinearOperator(
+            (self.shape[0], other.shape[1]),
+            matvec=lambda v: self.dot(other * v),
+            rmatvec=lambda v: other.T * self.rdot(v), dtype=self.dtype
+        )
+
+    def JtJdiag(self, W=None, D=None):
+        """
+        Diagonal of (G*D).T*W.T*W*(G*D), from the squares of the kernels.
+
+        The sum over the receivers of the squared rows of G is a
+        correlation of the squared data weights with the products of the
+        kernels. It is exact if W is diagonal and each column of D (the
+        derivative of the map) has at most one non-zero. Otherwise the
+        columns of G*D are formed one at a time.
+
+        :param W: data weights (diagonal sparse matrix), optional
+        :param D: derivative of the map (sparse matrix), optional
+        :rtype: numpy.ndarray
+        :return: diagonal
+        """
+        w = np.ones(self.shape[0])
+        if W is not None:
+            W = sp.csr_matrix(W)
+            if (W - sp.diags(W.diagonal(), 0)).nnz > 0:
+                return self._JtJdiagColumns(W, D)
+            w = W.diagonal()
+
+        if D is not None:
+            D = sp.csc_matrix(D)
+            if np.any(np.diff(D.indptr) > 1):
+                return self._JtJdiagColumns(W, D)
+
+        # real kernels of each layer
+        K = np.fft.irfft2(self._Khat, s=self._N, axes=(2, 3))
+        w2 = w**2
+        nIn = self.nIn
+        if self.weights is None:
+            # one column per input component and cell
+            diag = np.vstack([
+                self._adjointGrid(w2, np.fft.rfft2(
+                    K[:, b:b+1]**2, axes=(2, 3)
+                )).reshape(-1, order='F')[self.inds]
+                for b in range(nIn)
+            ]).ravel()
+        else:
+            diag = np.zeros(self.inds.size)
+            for b in range(nIn):
+                for c in range(nIn):
+                    KK = np.fft.rfft2(K[:, b:b+1] * K[:, c:c+1], axes=(2, 3))
+                    diag += (
+                        self.weights[b] * self.weights[c] *
+                        self._adjointGrid(w2, KK).reshape(
+                            -1, order='F'
+                        )[self.inds]
+                    )
+
+        if D is not None:
+            diag = D.power(2).T * diag
+        return diag
+
+    def _JtJdiagColumns(self, W, D):
+        # exact diagonal from the columns of W*G*D formed one at a time
+        nP = self.shape[1] if D is None else D.shape[1]
+        diag = np.zeros(nP)
+        for j in range(nP):
+            e = np.zeros(nP)
+            e[j] = 1.
+            x = e if D is None else D * e
+            col = self.dot(x)
+            if W is not None:
+                col = W * col
+            diag[j] = np.sum(col**2)
+        return diag
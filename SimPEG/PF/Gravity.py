@@ -5,6 +5,8 @@ from SimPEG.Utils import mkvc
 from SimPEG import Props
 import scipy.sparse as sp
 from . import BaseGrav as GRAV
+from . import Sensitivity
+from . import Convolution
 import re
 import numpy as np
 
@@ -20,6 +22,20 @@ class GravityIntegral(Problem.LinearProblem):
     forwardOnly = False  # Is TRUE, forward matrix not stored to memory
     actInd = None  #: Active cell indices provided
     rtype = 'z'
+    #: memory (GB) used for a block of rows of the kernel or of the stored G
+    maxBlockMemory = 0.5
+    #: directory where G is stored on disk (memory mapped) and re-used by
+    #: later sessions, None to hold G in memory
+    sensitivityPath = None
+    #: relative error allowed on each row of a compressed (sparse) G, None
+    #: to store G dense
+    compressionTol = None
+    compressionRatio = None  #: Size of the dense G over its non-zeros
+    compressionError = None  #: Largest relative row error of the compressed G
+    #: apply G by FFT convolutions, without storing it, if the receivers
+    #: are on a regular grid over the mesh (see Convolution). G is stored
+    #: otherwise
+    matrixFree = False
 
     def __init__(self, mesh, **kwargs):
         Problem.BaseProblem.__init__(self, mesh, **kwargs)
@@ -46,24 +62,8 @@ class GravityIntegral(Problem.LinearProblem):
 
             nC = len(inds)
 
-            # Create active cell projector
-            P = sp.csr_matrix(
-                (np.ones(nC), (inds, range(nC))),
-                shape=(self.mesh.nC, nC)
-            )
-
-            # Create vectors of nodal location
-            # (lower and upper corners for each cell)
-            xn = self.mesh.vectorNx
-            yn = self.mesh.vectorNy
-            zn = self.mesh.vectorNz
-
-            yn2, xn2, zn2 = np.meshgrid(yn[1:], xn[1:], zn[1:])
-            yn1, xn1, zn1 = np.meshgrid(yn[0:-1], xn[0:-1], zn[0:-1])
-
-            Yn = P.T*np.c_[Utils.mkvc(yn1), Utils.mkvc(yn2)]
-            Xn = P.T*np.c_[Utils.mkvc(xn1), Utils.mkvc(xn2)]
-            Zn = P.T*np.c_[Utils.mkvc(zn1), Utils.mkvc(zn2)]
+            # Lower and upper corners of the active cells
+            Xn, Yn, Zn = Utils.cellBounds(self.mesh, inds)
 
             rxLoc = self.survey.srcField.rxList[0].locs
             ndata = rxLoc.shape[0]
@@ -85,27 +85,29 @@ class GravityIntegral(Problem.LinearProblem):
 
             # Add counter to dsiplay progress. Good for large problems
             count = -1
-            for ii in range(ndata):
-
-                tx, ty, tz = get_T_mat(Xn, Yn, Zn, rxLoc[ii, :])
+            nBlock = self._blockSize(nC, len(self.rtype))
+            for start in range(0, ndata, nBlock):
+                ind = slice(start, min(start+nBlock, ndata))
 
                 if self.rtype == 'z':
-                    fwr_d[ii] = tz.dot(rho)
+                    tz, = get_T_block(Xn, Yn, Zn, rxLoc[ind, :], 'z')
+                    fwr_d[ind] = tz.dot(rho)
 
                 elif self.rtype == 'xyz':
-                    fwr_d[ii] = tx.dot(rho)
-                    fwr_d[ii+ndata] = ty.dot(rho)
-                    fwr_d[ii+2*ndata] = tz.dot(rho)
+                    tx, ty, tz = get_T_block(Xn, Yn, Zn, rxLoc[ind, :], 'xyz')
+                    fwr_d[ind] = tx.dot(rho)
+                    fwr_d[ind.start+ndata:ind.stop+ndata] = ty.dot(rho)
+                    fwr_d[ind.start+2*ndata:ind.stop+2*ndata] = tz.dot(rho)
 
             # Display progress
-                count = progress(ii, count, ndata)
+                count = progress(ind.stop-1, count, ndata)
 
             print("Done 100% ...forward operator completed!!\n")
 
             return fwr_d
 
         else:
-            return self.G.dot(rho)
+            return self._Gdot(rho)
 
     def fields(self, m):
         self.model = m
@@ -129,13 +131,29 @@ class GravityIntegral(Problem.LinearProblem):
         dmudm = self.rhoMap.deriv(m)
         return self.G*dmudm
 
+    def getJtJdiag(self, m, W=None):
+        """
+            Diagonal of J.T*W.T*W*J
+        """
+        if isinstance(self.G, Convolution.ConvolutionOperator):
+            return self.G.JtJdiag(W, self.rhoMap.deriv(m))
+        return Sensitivity.JtJdiag(
+            self.G, W, self.rhoMap.deriv(m),
+            maxBlockMemory=self.maxBlockMemory
+        )
+
     def Jvec(self, m, v, f=None):
         dmudm = self.rhoMap.deriv(m)
-        return self.G.dot(dmudm*v)
+        return self._Gdot(dmudm*v)
 
     def Jtvec(self, m, v, f=None):
         dmudm = self.rhoMap.deriv(m)
-        return dmudm.T * (self.G.T.dot(v))
+        return dmudm.T * (self._Gdot(v, adjoint=True))
+
+    def _Gdot(self, v, adjoint=False):
+        # Rows of G are streamed from disk if stored in sensitivityPath
+        return Sensitivity.dot(self.G, v, adjoint=adjoint,
+                               maxBlockMemory=self.maxBlockMemory)
 
     @property
     def G(self):
@@ -143,10 +161,46 @@ class GravityIntegral(Problem.LinearProblem):
             raise Exception('Need to pair!')
 
         if getattr(self, '_G', None) is None:
-            self._G = self.Intrgl_Fwr_Op('z')
+            if self.matrixFree:
+                self._G = self._convolutionG()
+            if getattr(self, '_G', None) is None:
+                self._G = self.Intrgl_Fwr_Op('z')
 
         return self._G
 
+    def _convolutionG(self):
+        """
+            G of a gridded survey applied by FFT convolutions, None if the
+            receivers are not on a regular grid over the mesh
+        """
+        rxLoc = self.survey.srcField.rxList[0].locs
+        layout = Convolution.gridLayout(self.mesh, rxLoc)
+        if layout is None:
+            print("Receivers are not gridded, G is stored")
+            return None
+
+        if getattr(self, 'actInd', None) is None:
+            inds = np.arange(self.mesh.nC)
+        elif self.actInd.dtype == 'bool':
+            inds = np.where(self.actInd)[0]
+        else:
+            inds = self.actInd
+
+        def kernel(Xn, Yn, Zn, rxLoc):
+            return np.asarray(get_T_block(Xn, Yn, Zn, rxLoc, 'z'))[None]
+
+        return Convolution.ConvolutionOperator(self.mesh, inds, layout, kernel)
+
+    def _blockSize(self, nC, nComp):
+        """
+            Number of observations for which the kernel is evaluated at once,
+            such that the temporary arrays fit in maxBlockMemory
+        """
+        # 3 distances per corner pair, the radius and temporaries
+        nArrays = 12 + nComp
+        nBlock = int(self.maxBlockMemory*1e9 / (8. * nArrays * max(nC, 1)))
+        return max(nBlock, 1)
+
     def Intrgl_Fwr_Op(self, flag):
 
         """
@@ -180,24 +234,8 @@ class GravityIntegral(Problem.LinearProblem):
 
         nC = len(inds)
 
-        # Create active cell projector
-        P = sp.csr_matrix(
-            (np.ones(nC), (inds, range(nC))),
-            shape=(self.mesh.nC, nC)
-        )
-
-        # Create vectors of nodal location
-        # (lower and upper corners for each cell)
-        xn = self.mesh.vectorNx
-        yn = self.mesh.vectorNy
-        zn = self.mesh.vectorNz
-
-        yn2, xn2, zn2 = np.meshgrid(yn[1:], xn[1:], zn[1:])
-        yn1, xn1, zn1 = np.meshgrid(yn[0:-1], xn[0:-1], zn[0:-1])
-
-        Yn = P.T*np.c_[Utils.mkvc(yn1), Utils.mkvc(yn2)]
-        Xn = P.T*np.c_[Utils.mkvc(xn1), Utils.mkvc(xn2)]
-        Zn = P.T*np.c_[Utils.mkvc(zn1), Utils.mkvc(zn2)]
+        # Lower and upper corners of the active cells
+        Xn, Yn, Zn = Utils.cellBounds(self.mesh, inds)
 
         rxLoc = self.survey.srcField.rxList[0].locs
         ndata = rxLoc.shape[0]
@@ -206,40 +244,80 @@ class GravityIntegral(Problem.LinearProblem):
         # Pre-allocate space
         if flag == 'z':
 
-            G = np.zeros((ndata, nC))
+            shape = (ndata, nC)
 
         elif flag == 'xyz':
 
-            G = np.zeros((int(3*ndata), nC))
+            shape = (int(3*ndata), nC)
 
         else:
 
             print("""Flag must be either 'z' | 'xyz', please revised""")
             return
 
+        if self.compressionTol is not None:
+
+            # Sparse blocks of each component
+            G = [[] for comp in flag]
+            err = []
+
+        elif self.sensitivityPath is not None:
+
+            # Re-use G stored on disk for the same mesh and survey
+            key = Sensitivity.sensitivityKey(
+                self, flag, np.dtype(self.dtype).name
+            )
+            G = Sensitivity.loadSensitivity(self.sensitivityPath, key, shape)
+            if G is not None:
+                return G
+
+            G = Sensitivity.createSensitivity(
+                self.sensitivityPath, key, shape, dtype=self.dtype
+            )
+
+        else:
+
+            G = np.zeros(shape, dtype=self.dtype)
+
         # Loop through all observations
         print("Begin calculation of forward operator: " + flag)
 
         # Add counter to dsiplay progress. Good for large problems
         count = -1
-        for ii in range(ndata):
+        # Evaluate the kernel for blocks of observations at once
+        nBlock = self._blockSize(nC, len(flag))
+        for start in range(0, ndata, nBlock):
+            stop = min(start+nBlock, ndata)
 
-            tx, ty, tz = get_T_mat(Xn, Yn, Zn, rxLoc[ii, :])
+            T = get_T_block(Xn, Yn, Zn, rxLoc[start:stop, :], flag)
 
-            if flag == 'z':
+            # Components are stacked: [x, y, z]
+            for jj, t in enumerate(T):
 
-                G[ii, :] = tz
+                if self.compressionTol is not None:
+                    t, t_err = Sensitivity.compressRows(t, self.compressionTol)
+                    G[jj].append(t)
+                    err.append(t_err)
 
-            elif flag == 'xyz':
-                G[ii, :] = tx
-                G[ii+ndata, :] = ty
-                G[ii+2*ndata, :] = tz
+                else:
+                    G[start+jj*ndata:stop+jj*ndata, :] = t
 
             # Display progress
-            count = progress(ii, count, ndata)
+            count = progress(stop-1, count, ndata)
 
         print("Done 100% ...forward operator completed!!\n")
 
+        if self.compressionTol is not None:
+            G = sp.vstack([t for comp in G for t in comp]).tocsr()
+            G = G.astype(self.dtype)
+            err = np.hstack(err)
+            self.compressionRatio, self.compressionError = (
+                Sensitivity.compressionReport(G, err)
+            )
+
+        elif self.sensitivityPath is not None:
+            G = Sensitivity.saveSensitivity(G, self.sensitivityPath, key)
+
         return G
 
 
@@ -259,8 +337,24 @@ def get_T_mat(Xn, Yn, Zn, rxLoc):
 
     where each elements have dimension 1-by-nC.
     Only the upper half 5 elements have to be computed since symetric.
-    Currently done as for-loops but will eventually be changed to vector
-    indexing, once the topography has been figured out.
+
+    """
+    return get_T_block(Xn, Yn, Zn, rxLoc, 'xyz')
+
+
+def get_T_block(Xn, Yn, Zn, rxLoc, components='xyz'):
+    """
+    Computes the gravity kernel for a block of observation locations at once.
+
+    INPUT:
+    Xn, Yn, Zn: Node location matrix for the lower and upper most corners of
+                all cells in the mesh shape[nC,2]
+    rxLoc: Observation locations shape[nD,3] (or [obsx, obsy, obsz])
+    components: Components of the kernel to compute, any of 'x', 'y', 'z'
+
+    OUTPUT:
+    Tuple with one array of dimension nD-by-nC per component, in the order
+    of components. Only the requested components are computed.
 
     """
     from scipy.constants import G as NewtG
@@ -268,18 +362,19 @@ def get_T_mat(Xn, Yn, Zn, rxLoc):
     NewtG = NewtG*1e+8  # Convertion from mGal (1e-5) and g/cc (1e-3)
     eps = 1e-8  # add a small value to the locations to avoid
 
+    rxLoc = np.atleast_2d(rxLoc)
     nC = Xn.shape[0]
+    nD = rxLoc.shape[0]
 
-    # Pre-allocate space for 1D array
-    tx = np.zeros((1, nC))
-    ty = np.zeros((1, nC))
-    tz = np.zeros((1, nC))
+    # Pre-allocate space
+    t = dict((comp, np.zeros((nD, nC))) for comp in components)
 
-    dz = rxLoc[2] - Zn
+    # Distances from the observations to the corners, shape[nD,nC]
+    dz = [rxLoc[:, 2:3] - Zn[:, cc] for cc in range(2)]
 
-    dy = Yn - rxLoc[1]
+    dy = [Yn[:, bb] - rxLoc[:, 1:2] for bb in range(2)]
 
-    dx = Xn - rxLoc[0]
+    dx = [Xn[:, aa] - rxLoc[:, 0:1] for aa in range(2)]
 
     # Compute contribution from each corners
     for aa in range(2):
@@ -287,30 +382,33 @@ def get_T_mat(Xn, Yn, Zn, rxLoc):
             for cc in range(2):
 
                 r = (
-                        mkvc(dx[:, aa]) ** 2 +
-                        mkvc(dy[:, bb]) ** 2 +
-                        mkvc(dz[:, cc]) ** 2
+                        dx[aa] ** 2 +
+                        dy[bb] ** 2 +
+                        dz[cc] ** 2
                     ) ** (0.50)
 
-                tx = tx - NewtG * (-1) ** aa * (-1) ** bb * (-1) ** cc * (
-                    dy[:, bb] * np.log(dz[:, cc] + r + eps) +
-                    dz[:, cc] * np.log(dy[:, bb] + r + eps) -
-                    dx[:, aa] * np.arctan(dy[:, bb] * dz[:, cc] /
-                                          (dx[:, aa] * r + eps)))
+                if 'x' in t:
+                    t['x'] -= NewtG * (-1) ** aa * (-1) ** bb * (-1) ** cc * (
+                        dy[bb] * np.log(dz[cc] + r + eps) +
+                        dz[cc] * np.log(dy[bb] + r + eps) -
+                        dx[aa] * np.arctan(dy[bb] * dz[cc] /
+                                           (dx[aa] * r + eps)))
 
-                ty = ty - NewtG * (-1) ** aa * (-1) ** bb * (-1) ** cc * (
-                    dx[:, aa] * np.log(dz[:, cc] + r + eps) +
-                    dz[:, cc] * np.log(dx[:, aa] + r + eps) -
-                    dy[:, bb] * np.arctan(dx[:, aa] * dz[:, cc] /
-                                          (dy[:, bb] * r + eps)))
+                if 'y' in t:
+                    t['y'] -= NewtG * (-1) ** aa * (-1) ** bb * (-1) ** cc * (
+                        dx[aa] * np.log(dz[cc] + r + eps) +
+                        dz[cc] * np.log(dx[aa] + r + eps) -
+                        dy[bb] * np.arctan(dx[aa] * dz[cc] /
+                                           (dy[bb] * r + eps)))
 
-                tz = tz - NewtG * (-1) ** aa * (-1) ** bb * (-1) ** cc * (
-                    dx[:, aa] * np.log(dy[:, bb] + r + eps) +
-                    dy[:, bb] * np.log(dx[:, aa] + r + eps) -
-                    dz[:, cc] * np.arctan(dx[:, aa] * dy[:, bb] /
-                                          (dz[:, cc] * r + eps)))
+                if 'z' in t:
+                    t['z'] -= NewtG * (-1) ** aa * (-1) ** bb * (-1) ** cc * (
+                        dx[aa] * np.log(dy[bb] + r + eps) +
+                        dy[bb] * np.log(dx[aa] + r + eps) -
+                        dz[cc] * np.arctan(dx[aa] * dy[bb] /
+                                           (dz[cc] * r + eps)))
 
-    return tx, ty, tz
+    return tuple(t[comp] for comp in components)
 
 
 def progress(iter, prog, final):
@@ -478,6 +576,19 @@ def readUBCgravObs(obs_file):
 class Problem3D_Diff(Problem.BaseProblem):
     """
         Gravity in differential equations!
+
+        The Poisson system is solved with bicgstab and a Jacobi
+        preconditioner, or with the solver class given as :code:`solver`.
+        Geometric solvers such as :code:`Utils.SolverUtils.SolverMG`
+        (multigrid) are given the mesh and the :code:`solverOpts`, a
+        memory-lean alternative to a direct factorization on large
+        TensorMesh:
+
+        .. code:: python
+
+            prob = PF.Gravity.Problem3D_Diff(
+                mesh, rhoMap=Maps.IdentityMap(mesh), solver=SolverMG
+            )
     """
 
     _depreciate_main_map = 'rhoMap'
@@ -556,6 +667,10 @@ class Problem3D_Diff(Problem.BaseProblem):
             m1 = sp.linalg.interface.aslinearoperator(Utils.sdiag(1/A.diagonal()))
             u, info = sp.linalg.bicgstab(A, RHS, tol=1e-6, maxiter=1000, M=m1)
 
+        elif getattr(self.solver, '_geometric', False):
+            Ainv = self.solver(A, mesh=self.mesh, **self.solverOpts)
+            u = Ainv*RHS
+
         else:
             print("Solving with Paradiso")
             Ainv = self.solver(A)
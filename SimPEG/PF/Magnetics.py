@@ -1,5 +1,6 @@
 from __future__ import print_function
 
+import hashlib
 import numpy as np
 import scipy.sparse as sp
 from scipy.constants import mu_0
@@ -9,7 +10,13 @@ from SimPEG import Problem
 from SimPEG import Solver
 from SimPEG import Props
 
+from multiprocessing import Pool
+from multiprocessing.sharedctypes import RawArray
+
 from . import BaseMag as MAG
+from . import Sensitivity
+from . import Convolution
+from . import Weighting
 from .MagAnalytics import spheremodel, CongruousMagBC
 
 
@@ -24,26 +31,49 @@ class MagneticIntegral(Problem.LinearProblem):
     actInd = None  #: Active cell indices provided
     M = None  #: Magnetization matrix provided, otherwise all induced
     rtype = 'tmi'  #: Receiver type either "tmi" | "xyz"
+    n_cpu = 1  #: Number of processes computing the rows of G
+    progressCallback = None  #: Called with (nDone, ndata), replaces the prints
+    #: Directory where G is stored on disk (memory mapped) and re-used by
+    #: later sessions, None to hold G in memory
+    sensitivityPath = None
+    maxBlockMemory = 0.5  #: Memory (GB) of the blocks of rows of G
+    #: Relative error allowed on each row of a compressed (sparse) G, None
+    #: to store G dense
+    compressionTol = None
+    compressionRatio = None  #: Size of the dense G over its non-zeros
+    compressionError = None  #: Largest relative row error of the compressed G
+    #: Apply G by FFT convolutions, without storing it, if the receivers are
+    #: on a regular grid over the mesh (see Convolution). G is stored
+    #: otherwise
+    matrixFree = False
 
     def __init__(self, mesh, **kwargs):
         Problem.BaseProblem.__init__(self, mesh, **kwargs)
 
     def fwr_ind(self, m):
 
+        # Susceptibility of the active cells (e.g. projected on a tile)
+        chi = self.chiMap * m
+
         if self.forwardOnly:
 
             # Compute the linear operation without forming the full dense G
-            fwr_d = self.Intrgl_Fwr_Op(m=m)
+            fwr_d = self.Intrgl_Fwr_Op(m=chi)
 
             return fwr_d
 
         else:
 
-            return self.G.dot(m)
+            return self._Gdot(chi)
 
     def fwr_rem(self):
         # TODO check if we are inverting for M
-        return self.G.dot(self.chiMap(m))
+        return self._Gdot(self.chiMap(m))
+
+    def _Gdot(self, v, adjoint=False):
+        # Rows of G are streamed from disk if stored in sensitivityPath
+        return Sensitivity.dot(self.G, v, adjoint=adjoint,
+                               maxBlockMemory=self.maxBlockMemory)
 
     def fields(self, m, **kwargs):
         self.model = m
@@ -69,16 +99,81 @@ class MagneticIntegral(Problem.LinearProblem):
     #     dmudm = self.chiMap.deriv(m)
     #     return dmudm.T * (self.G.T.dot(v))
 
+    def Jvec(self, m, v, f=None):
+        dmudm = self.chiMap.deriv(m)
+        return self._Gdot(dmudm*v)
+
+    def Jtvec(self, m, v, f=None):
+        dmudm = self.chiMap.deriv(m)
+        return dmudm.T * (self._Gdot(v, adjoint=True))
+
     @property
     def G(self):
         if not self.ispaired:
             raise Exception('Need to pair!')
 
         if getattr(self, '_G', None) is None:
-            self._G = self.Intrgl_Fwr_Op()
+            if self.matrixFree:
+                self._G = self._convolutionG()
+            if getattr(self, '_G', None) is None:
+                self._G = self.Intrgl_Fwr_Op()
 
         return self._G
 
+    def _convolutionG(self, Magnetization="ind"):
+        """
+            G of a gridded survey applied by FFT convolutions, None if the
+            receivers are not on a regular grid over the mesh
+        """
+        survey = self.survey
+        rxLoc = survey.srcField.rxList[0].locs
+        layout = Convolution.gridLayout(self.mesh, rxLoc)
+        if layout is None:
+            print("Receivers are not gridded, G is stored")
+            return None
+
+        if getattr(self, 'actInd', None) is None:
+            inds = np.arange(self.mesh.nC)
+        elif self.actInd.dtype == 'bool':
+            inds = np.where(self.actInd)[0]
+        else:
+            inds = self.actInd
+
+        B0 = survey.srcField.param[0]
+        rtype = survey.srcField.rxList[0].rxType
+        Ptmi = None
+        if rtype == 'tmi':
+            # Convert Bdecination from north to cartesian
+            D = (450.-float(survey.srcField.param[2])) % 360.
+            I = survey.srcField.param[1]
+            Ptmi = np.r_[np.cos(np.deg2rad(I))*np.cos(np.deg2rad(D)),
+                         np.cos(np.deg2rad(I))*np.sin(np.deg2rad(D)),
+                         np.sin(np.deg2rad(I))]
+
+        def kernel(Xn, Yn, Zn, rxLoc):
+            # T[a, b]: component a of the field of a magnetization along b
+            T = np.stack([
+                t.reshape((3, -1)) for t in get_T_mat(Xn, Yn, Zn, rxLoc)
+            ])
+            if Ptmi is not None:
+                T = np.einsum('a,abv->bv', Ptmi, T)[None]
+            if Magnetization == 'xyz':
+                return T * B0
+            return T
+
+        weights = None
+        if Magnetization == 'ind':
+            if getattr(self, 'M', None) is None:
+                M = dipazm_2_xyz(np.ones(inds.size) * survey.srcField.param[1],
+                                 np.ones(inds.size) * survey.srcField.param[2])
+            else:
+                M = self.M
+            weights = (M * B0).T
+
+        return Convolution.ConvolutionOperator(
+            self.mesh, inds, layout, kernel, weights=weights
+        )
+
     # def _Jmatrix(self):
     #     """
     #         Sensitivity matrix
@@ -93,6 +188,17 @@ class MagneticIntegral(Problem.LinearProblem):
         dmudm = self.chiMap.deriv(self.chi)
         return self.G*dmudm
 
+    def getJtJdiag(self, m, W=None):
+        """
+            Diagonal of J.T*W.T*W*J
+        """
+        if isinstance(self.G, Convolution.ConvolutionOperator):
+            return self.G.JtJdiag(W, self.chiMap.deriv(self.chi))
+        return Sensitivity.JtJdiag(
+            self.G, W, self.chiMap.deriv(self.chi),
+            maxBlockMemory=self.maxBlockMemory
+        )
+
     def Intrgl_Fwr_Op(self, m=None, Magnetization="ind"):
 
         """
@@ -125,22 +231,8 @@ class MagneticIntegral(Problem.LinearProblem):
 
         nC = len(inds)
 
-        # Create active cell projector
-        P = sp.csr_matrix((np.ones(nC), (inds, range(nC))),
-                          shape=(self.mesh.nC, nC))
-
-        # Create vectors of nodal location
-        # (lower and upper coners for each cell)
-        xn = self.mesh.vectorNx
-        yn = self.mesh.vectorNy
-        zn = self.mesh.vectorNz
-
-        yn2, xn2, zn2 = np.meshgrid(yn[1:], xn[1:], zn[1:])
-        yn1, xn1, zn1 = np.meshgrid(yn[0:-1], xn[0:-1], zn[0:-1])
-
-        Yn = P.T*np.c_[Utils.mkvc(yn1), Utils.mkvc(yn2)]
-        Xn = P.T*np.c_[Utils.mkvc(xn1), Utils.mkvc(xn2)]
-        Zn = P.T*np.c_[Utils.mkvc(zn1), Utils.mkvc(zn2)]
+        # Lower and upper corners of the active cells
+        Xn, Yn, Zn = Utils.cellBounds(self.mesh, inds)
 
         survey = self.survey
         rxLoc = survey.srcField.rxList[0].locs
@@ -157,6 +249,8 @@ class MagneticIntegral(Problem.LinearProblem):
         if getattr(self, 'M', None) is None:
             M = dipazm_2_xyz(np.ones(nC) * survey.srcField.param[1],
                              np.ones(nC) * survey.srcField.param[2])
+        else:
+            M = self.M
 
         Mx = Utils.sdiag(M[:, 0]*survey.srcField.param[0])
         My = Utils.sdiag(M[:, 1]*survey.srcField.param[0])
@@ -164,7 +258,14 @@ class MagneticIntegral(Problem.LinearProblem):
 
         Mxyz = sp.vstack((Mx, My, Mz))
 
-        if survey.srcField.rxList[0].rxType == 'tmi':
+        # Receiver type of the forward only data or of the rows of G
+        if self.forwardOnly:
+            rtype = self.rtype
+        else:
+            rtype = survey.srcField.rxList[0].rxType
+
+        Ptmi = None
+        if rtype == 'tmi':
 
 
             # Convert Bdecination from north to cartesian
@@ -185,74 +286,151 @@ class MagneticIntegral(Problem.LinearProblem):
 
                 fwr_out = np.zeros(3*self.survey.nRx)
 
+            shape = fwr_out.shape
+
         else:
 
             if (Magnetization == 'ind'):
 
                 if survey.srcField.rxList[0].rxType == 'tmi':
-                    fwr_out = np.zeros((ndata, nC))
+                    shape = (ndata, nC)
 
                 elif survey.srcField.rxList[0].rxType == 'xyz':
 
-                    fwr_out = np.zeros((int(3*ndata), nC))
+                    shape = (int(3*ndata), nC)
 
             elif Magnetization == 'xyz':
                 if survey.srcField.rxList[0].rxType == 'tmi':
-                    fwr_out = np.zeros((int(ndata), int(3*nC)))
+                    shape = (int(ndata), int(3*nC))
 
                 elif survey.srcField.rxList[0].rxType == 'xyz':
-                    fwr_out = np.zeros((int(3*ndata), int(3*nC)))
+                    shape = (int(3*ndata), int(3*nC))
 
             else:
                 print("""Flag must be either 'ind' | 'xyz', please revised""")
                 return
 
-            # Loop through all observations and create forward operator (nD-by-nC)
-            print("Begin calculation of forward operator: " + Magnetization)
-
-        # Add counter to dsiplay progress. Good for large problems
-        count = -1
-        for ii in range(ndata):
+            if self.compressionTol is not None:
 
-            tx, ty, tz = get_T_mat(Xn, Yn, Zn, rxLoc[ii, :])
+                # Sparse blocks of rows, assembled at the end
+                fwr_out = None
 
-            if self.forwardOnly:
+            elif self.sensitivityPath is not None:
 
-                if self.rtype == 'tmi':
-                    fwr_out[ii] = (Ptmi.dot(np.vstack((tx, ty, tz)))*Mxyz).dot(m)
+                # Re-use G stored on disk for the same mesh and survey
+                key = Sensitivity.sensitivityKey(
+                    self, Magnetization, rtype, survey.srcField.param,
+                    np.dtype(self.dtype).name,
+                    None if getattr(self, 'M', None) is None else
+                    hashlib.sha1(np.ascontiguousarray(M)).hexdigest()
+                )
+                fwr_out = Sensitivity.loadSensitivity(
+                    self.sensitivityPath, key, shape,
+                    verbose=self.progressCallback is None
+                )
+                if fwr_out is not None:
+                    return fwr_out
 
-                elif self.rtype == 'xyz':
-                    fwr_out[ii] = (tx*Mxyz).dot(m)
-                    fwr_out[ii+ndata] = (ty*Mxyz).dot(m)
-                    fwr_out[ii+2*ndata] = (tz*Mxyz).dot(m)
+                fwr_out = Sensitivity.createSensitivity(
+                    self.sensitivityPath, key, shape, dtype=self.dtype
+                )
 
             else:
 
-                if Magnetization == 'ind':
-
-                    if survey.srcField.rxList[0].rxType == 'tmi':
-                        fwr_out[ii, :] = Ptmi.dot(np.vstack((tx, ty, tz)))*Mxyz
-
-                    elif survey.srcField.rxList[0].rxType == 'xyz':
-                        fwr_out[ii, :] = tx*Mxyz
-                        fwr_out[ii+ndata, :] = ty*Mxyz
-                        fwr_out[ii+2*ndata, :] = tz*Mxyz
+                fwr_out = np.zeros(shape, dtype=self.dtype)
 
-                elif Magnetization == 'xyz':
-
-                    if survey.srcField.rxList[0].rxType == 'tmi':
-                        fwr_out[ii, :] = Ptmi.dot(np.vstack((tx, ty, tz)) *
-                                                  survey.srcField.param[0])
-
-                    elif survey.srcField.rxList[0].rxType == 'xyz':
-                        fwr_out[ii, :] = tx * survey.srcField.param[0]
-                        fwr_out[ii+ndata, :] = ty * survey.srcField.param[0]
-                        fwr_out[ii+2*ndata, :] = tz * survey.srcField.param[0]
+            # Loop through all observations and create forward operator (nD-by-nC)
+            print("Begin calculation of forward operator: " + Magnetization)
 
-            # Display progress
-            count = progress(ii, count, ndata)
+        # Rows of each observation: 1 for tmi, 3 for xyz
+        nComp = 1 if rtype == 'tmi' else 3
+        kernel = {
+            'Xn': Xn, 'Yn': Yn, 'Zn': Zn, 'rxLoc': rxLoc, 'Mxyz': Mxyz,
+            'Ptmi': Ptmi, 'rtype': rtype, 'Magnetization': Magnetization,
+            'B0': survey.srcField.param[0], 'm': m, 'nComp': nComp,
+            'forwardOnly': self.forwardOnly, 'dtype': np.dtype(self.dtype),
+            'tol': None if self.forwardOnly else self.compressionTol
+        }
+
+        # Blocks of observations computed at once
+        nCol = 3*nC if Magnetization == 'xyz' else nC
+        nBlock = int(self.maxBlockMemory*1e9 / (8. * nComp * nCol))
+        if self.n_cpu > 1:
+            nBlock = min(nBlock, int(np.ceil(ndata / (4. * self.n_cpu))))
+        nBlock = max(nBlock, 1)
+        blocks = [
+            (start, min(start+nBlock, ndata))
+            for start in range(0, ndata, nBlock)
+        ]
+
+        # Output of the workers: G in memory, on disk, or None if the
+        # data or the compressed rows are returned
+        out = None
+        if fwr_out is not None and not self.forwardOnly:
+            if self.n_cpu == 1:
+                out = fwr_out
+            elif isinstance(fwr_out, np.memmap):
+                # Workers open the file of G
+                out = fwr_out.filename
+            else:
+                # The rows of G are written to shared memory by the workers
+                out = RawArray(kernel['dtype'].char, fwr_out.size)
+                fwr_out = np.frombuffer(
+                    out, dtype=kernel['dtype']
+                ).reshape(fwr_out.shape)
+
+        if self.n_cpu > 1:
+            # Split the observations in blocks over a pool of processes
+            pool = Pool(self.n_cpu, _initWorker, (kernel, out, shape))
+            results = pool.imap_unordered(_calcBlock, blocks)
+        else:
+            pool = None
+            results = (_calcBlock(block, kernel, out) for block in blocks)
 
-        print("Done 100% ...forward operator completed!!\n")
+        # Add counter to dsiplay progress. Good for large problems
+        count = -1
+        nDone = 0
+        compressed = {}
+        try:
+            for start, stop, d in results:
+
+                if self.forwardOnly:
+                    for jj in range(nComp):
+                        fwr_out[start+jj*ndata:stop+jj*ndata] = d[jj]
+
+                elif self.compressionTol is not None:
+                    compressed[start] = d
+
+                # Display progress
+                nDone += stop - start
+                if self.progressCallback is not None:
+                    self.progressCallback(nDone, ndata)
+                else:
+                    count = progress(nDone-1, count, ndata)
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+        if self.progressCallback is None:
+            print("Done 100% ...forward operator completed!!\n")
+
+        if isinstance(fwr_out, np.memmap):
+            fwr_out = Sensitivity.saveSensitivity(
+                fwr_out, self.sensitivityPath, key
+            )
+
+        elif not self.forwardOnly and self.compressionTol is not None:
+            # Stack the blocks of each component: [x, y, z]
+            starts = sorted(compressed.keys())
+            fwr_out = sp.vstack([
+                compressed[start][0][jj]
+                for jj in range(nComp) for start in starts
+            ]).tocsr().astype(self.dtype)
+            err = np.hstack([compressed[start][1] for start in starts])
+            self.compressionRatio, self.compressionError = (
+                Sensitivity.compressionReport(fwr_out, err)
+            )
 
         return fwr_out
 
@@ -269,10 +447,13 @@ class MagneticVector(MagneticIntegral):
 
     def fwr_ind(self, m):
 
+        # Magnetization of the active cells
+        mxyz = self.chiMap * m
+
         if self.forwardOnly:
 
             # Compute the linear operation without forming the full dense G
-            fwr_d = Intrgl_Fwr_Op(m=m, Magnetization='xyz')
+            fwr_d = self.Intrgl_Fwr_Op(m=mxyz, Magnetization='xyz')
 
             return fwr_d
 
@@ -280,7 +461,7 @@ class MagneticVector(MagneticIntegral):
 
             # m = np.hstack([m, mii])
 
-            return self.G.dot(m)
+            return self._Gdot(mxyz)
 
     @property
     def G(self):
@@ -288,7 +469,10 @@ class MagneticVector(MagneticIntegral):
             raise Exception('Need to pair!')
 
         if getattr(self, '_G', None) is None:
-            self._G = self.Intrgl_Fwr_Op(Magnetization='xyz')
+            if self.matrixFree:
+                self._G = self._convolutionG(Magnetization='xyz')
+            if getattr(self, '_G', None) is None:
+                self._G = self.Intrgl_Fwr_Op(Magnetization='xyz')
 
         return self._G
 
@@ -307,18 +491,22 @@ class MagneticAmplitude(MagneticIntegral):
 
         self.survey.srcField.rxList[0].rxType = 'xyz'
 
+        if m is None:
+            m = self.model
+
+        # Susceptibility of the active cells (e.g. projected on a tile)
+        chi = self.chiMap * m
+
         if self.forwardOnly:
 
             # Compute the linear operation without forming the full dense G
-            Bxyz = Intrgl_Fwr_Op(m=m)
+            Bxyz = self.Intrgl_Fwr_Op(m=chi)
 
             return self.calcAmpData(Bxyz)
 
         else:
-            if m is None:
-                m = self.chiMap*self.model
 
-            Bxyz = self.G.dot(m)
+            Bxyz = self._Gdot(chi)
 
             return self.calcAmpData(Bxyz)
 
@@ -342,11 +530,11 @@ class MagneticAmplitude(MagneticIntegral):
 
     def Jvec(self, m, v, f=None):
         dmudm = self.chiMap.deriv(m)
-        return self.dfdm*(self.G.dot(dmudm*v))
+        return self.dfdm*(self._Gdot(dmudm*v))
 
     def Jtvec(self, m, v, f=None):
         dmudm = self.chiMap.deriv(m)
-        return dmudm.T * (self.G.T.dot(self.dfdm.T*v))
+        return dmudm.T * (self._Gdot(self.dfdm.T*v, adjoint=True))
 
     @property
     def G(self):
@@ -354,7 +542,10 @@ class MagneticAmplitude(MagneticIntegral):
             raise Exception('Need to pair!')
 
         if getattr(self, '_G', None) is None:
-            self._G = self.Intrgl_Fwr_Op()
+            if self.matrixFree:
+                self._G = self._convolutionG()
+            if getattr(self, '_G', None) is None:
+                self._G = self.Intrgl_Fwr_Op()
 
         return self._G
 
@@ -368,7 +559,7 @@ class MagneticAmplitude(MagneticIntegral):
             # Get field data
             m = self.chiMap*self.model
 
-            Bxyz = self.G.dot(m)
+            Bxyz = self._Gdot(m)
 
             Bamp = self.calcAmpData(Bxyz)
 
@@ -748,6 +939,99 @@ def MagneticsDiffSecondaryInv(mesh, model, data, **kwargs):
     return inv, reg
 
 
+def calcRow(ii, Xn, Yn, Zn, rxLoc, Mxyz, Ptmi, rtype, Magnetization, B0,
+            **kwargs):
+    """
+    Computes the rows of the magnetic forward operator for observation ii
+
+    INPUT:
+    Xn, Yn, Zn: Node location matrix for the lower and upper most corners of
+                all cells in the mesh shape[nC,2]
+    rxLoc: Observation locations shape[nD,3]
+    Mxyz: Magnetization matrix, used if Magnetization == 'ind'
+    Ptmi: Projection on the inducing field, used if rtype == 'tmi'
+    B0: Amplitude of the inducing field
+
+    OUTPUT:
+    Rows of G for observation ii, with dimension 1-by-nC ('tmi') or 3-by-nC
+    ('xyz'). nC is tripled if Magnetization == 'xyz'
+
+    """
+    tx, ty, tz = get_T_mat(Xn, Yn, Zn, rxLoc[ii, :])
+
+    if Magnetization == 'ind':
+
+        if rtype == 'tmi':
+            return Ptmi.dot(np.vstack((tx, ty, tz)))*Mxyz
+
+        return np.vstack((tx*Mxyz, ty*Mxyz, tz*Mxyz))
+
+    elif Magnetization == 'xyz':
+
+        if rtype == 'tmi':
+            return Ptmi.dot(np.vstack((tx, ty, tz)) * B0)
+
+        return np.vstack((tx * B0, ty * B0, tz * B0))
+
+
+# Kernel and output shared by the processes computing G in parallel
+_worker = {}
+
+
+def _initWorker(kernel, out, shape):
+    _worker['kernel'] = kernel
+    if isinstance(out, str):
+        # G stored on disk
+        _worker['out'] = np.load(out, mmap_mode='r+')
+    elif out is not None:
+        _worker['out'] = np.frombuffer(
+            out, dtype=kernel['dtype']
+        ).reshape(shape)
+
+
+def _calcBlock(block, kernel=None, out=None):
+    """
+    Computes the rows of G for the observations in block = (start, stop) and
+    writes them to the output. In forward only mode, the data are returned
+    instead, and the sparse rows (with their relative errors) if G is
+    compressed. Uses the kernel and output shared with the worker if not
+    provided.
+    """
+    if kernel is None:
+        kernel = _worker['kernel']
+        out = _worker.get('out', None)
+
+    start, stop = block
+    ndata = kernel['rxLoc'].shape[0]
+    nComp = kernel['nComp']
+
+    # Rows of the block, shape (nComp, stop-start, nC)
+    rows = np.stack(
+        [calcRow(ii, **kernel) for ii in range(start, stop)], axis=1
+    )
+
+    if kernel['forwardOnly']:
+        return start, stop, rows.dot(kernel['m'])
+
+    if kernel['tol'] is not None:
+        G, err = [], []
+        for jj in range(nComp):
+            G_comp, err_comp = Sensitivity.compressRows(
+                rows[jj], kernel['tol']
+            )
+            G.append(G_comp)
+            err.append(err_comp)
+        return start, stop, (G, np.hstack(err))
+
+    for jj in range(nComp):
+        out[start+jj*ndata:stop+jj*ndata, :] = rows[jj]
+
+    if isinstance(out, np.memmap):
+        out.flush()
+
+    return start, stop, None
+
+
 def get_T_mat(Xn, Yn, Zn, rxLoc):
     """
     Load in the active nodes of a tensor mesh and computes the magnetic tensor
@@ -918,19 +1202,22 @@ def dipazm_2_xyz(dip, azm_N):
     return M
 
 
-def get_dist_wgt(mesh, rxLoc, actv, R, R0):
+def get_dist_wgt(mesh, rxLoc, actv, R, R0, maxBlockMemory=0.5, n_cpu=1):
     """
-    get_dist_wgt(xn,yn,zn,rxLoc,R,R0)
+    get_dist_wgt(mesh,rxLoc,actv,R,R0)
 
     Function creating a distance weighting function required for the magnetic
-    inverse problem.
+    inverse problem. See :code:`Weighting.distanceWeighting`, which computes
+    the weights by blocks of receivers, on tensor or tree meshes.
 
     INPUT
-    xn, yn, zn : Node location
+    mesh        : Mesh, tensor or tree
     rxLoc       : Observation locations [obsx, obsy, obsz]
     actv        : Active cell vector [0:air , 1: ground]
     R           : Decay factor (mag=3, grav =2)
     R0          : Small factor added (default=dx/4)
+    maxBlockMemory : Memory (GB) of the arrays of a block of receivers
+    n_cpu       : Number of threads computing the blocks
 
     OUTPUT
     wr       : [nC] Vector of distance weighting
@@ -939,78 +1226,10 @@ def get_dist_wgt(mesh, rxLoc, actv, R, R0):
 
     @author: dominiquef
     """
-
-    # Find non-zero cells
-    if actv.dtype == 'bool':
-        inds = np.asarray([inds for inds,
-                          elem in enumerate(actv, 1) if elem], dtype=int) - 1
-    else:
-        inds = actv
-
-    nC = len(inds)
-
-    # Create active cell projector
-    P = sp.csr_matrix((np.ones(nC), (inds, range(nC))),
-                      shape=(mesh.nC, nC))
-
-    # Geometrical constant
-    p = 1/np.sqrt(3)
-
-    # Create cell center location
-    Ym, Xm, Zm = np.meshgrid(mesh.vectorCCy, mesh.vectorCCx, mesh.vectorCCz)
-    hY, hX, hZ = np.meshgrid(mesh.hy, mesh.hx, mesh.hz)
-
-    # Remove air cells
-    Xm = P.T*Utils.mkvc(Xm)
-    Ym = P.T*Utils.mkvc(Ym)
-    Zm = P.T*Utils.mkvc(Zm)
-
-    hX = P.T*Utils.mkvc(hX)
-    hY = P.T*Utils.mkvc(hY)
-    hZ = P.T*Utils.mkvc(hZ)
-
-    V = P.T * Utils.mkvc(mesh.vol)
-    wr = np.zeros(nC)
-
-    ndata = rxLoc.shape[0]
-    count = -1
-    print("Begin calculation of distance weighting for R= " + str(R))
-
-    for dd in range(ndata):
-
-        nx1 = (Xm - hX * p - rxLoc[dd, 0])**2
-        nx2 = (Xm + hX * p - rxLoc[dd, 0])**2
-
-        ny1 = (Ym - hY * p - rxLoc[dd, 1])**2
-        ny2 = (Ym + hY * p - rxLoc[dd, 1])**2
-
-        nz1 = (Zm - hZ * p - rxLoc[dd, 2])**2
-        nz2 = (Zm + hZ * p - rxLoc[dd, 2])**2
-
-        R1 = np.sqrt(nx1 + ny1 + nz1)
-        R2 = np.sqrt(nx1 + ny1 + nz2)
-        R3 = np.sqrt(nx2 + ny1 + nz1)
-        R4 = np.sqrt(nx2 + ny1 + nz2)
-        R5 = np.sqrt(nx1 + ny2 + nz1)
-        R6 = np.sqrt(nx1 + ny2 + nz2)
-        R7 = np.sqrt(nx2 + ny2 + nz1)
-        R8 = np.sqrt(nx2 + ny2 + nz2)
-
-        temp = (R1 + R0)**-R + (R2 + R0)**-R + (R3 + R0)**-R + \
-            (R4 + R0)**-R + (R5 + R0)**-R + (R6 + R0)**-R + \
-            (R7 + R0)**-R + (R8 + R0)**-R
-
-        wr = wr + (V*temp/8.)**2.
-
-        count = progress(dd, count, ndata)
-
-    wr = np.sqrt(wr)/V
-    wr = Utils.mkvc(wr)
-    wr = np.sqrt(wr/(np.max(wr)))
-
-    print("Done 100% ...distance weighting completed!!\n")
-
-    return wr
+    return Weighting.distanceWeighting(
+        mesh, rxLoc, actInd=actv, exponent=R, R0=R0,
+        maxBlockMemory=maxBlockMemory, n_cpu=n_cpu
+    )
 
 
 def writeUBCobs(filename, survey, d):
@@ -1,6 +1,6 @@
 import re
 import os
-from SimPEG import Mesh, Utils
+from SimPEG import Utils
 import numpy as np
 from . import BaseMag
 from . import Magnetics
@@ -176,7 +176,7 @@ class MagneticsDriver_Inv(object):
     @property
     def mesh(self):
         if getattr(self, '_mesh', None) is None:
-            self._mesh = Mesh.TensorMesh.readUBC(self.basePath + self.mshfile)
+            self._mesh = Utils.readUBCmesh(self.basePath + self.mshfile)
         return self._mesh
 
     @property
@@ -191,8 +191,9 @@ class MagneticsDriver_Inv(object):
             if getattr(self, 'topofile', None) is not None:
                 topo = np.genfromtxt(self.basePath + self.topofile,
                                      skip_header=1)
-                # Find the active cells
-                active = Utils.surface2ind_topo(self.mesh, topo, 'N')
+                # Find the active cells, from the nodes of tensor meshes
+                gridLoc = 'N' if self.mesh._meshType == 'TENSOR' else 'CC'
+                active = Utils.surface2ind_topo(self.mesh, topo, gridLoc)
 
             elif isinstance(self._staticInput, float):
                 active = self.m0 != self._staticInput
@@ -255,9 +256,8 @@ class MagneticsDriver_Inv(object):
             if isinstance(self.mstart, float):
                 self._m0 = np.ones(self.nC) * self.mstart
             else:
-                self._m0 = Mesh.TensorMesh.readModelUBC(self.mesh,
-                                                        self.basePath +
-                                                        self.mstart)
+                self._m0 = self.mesh.readModelUBC(self.basePath +
+                                                  self.mstart)
 
         return self._m0
 
@@ -267,9 +267,8 @@ class MagneticsDriver_Inv(object):
             if isinstance(self._mrefInput, float):
                 self._mref = np.ones(self.nC) * self._mrefInput
             else:
-                self._mref = Mesh.TensorMesh.readModelUBC(self.mesh,
-                                                          self.basePath +
-                                                          self._mrefInput)
+                self._mref = self.mesh.readModelUBC(self.basePath +
+                                                    self._mrefInput)
 
                 # Reduce to active space
                 self._mref = self._mref[self.activeCells]
@@ -281,7 +280,7 @@ class MagneticsDriver_Inv(object):
         if getattr(self, '_activeModel', None) is None:
             if self._staticInput == 'FILE':
                 # Read from file active cells with 0:air, 1:dynamic, -1 static
-                self._activeModel = Mesh.TensorMesh.readModelUBC(self.mesh, self.basePath + self._staticInput)
+                self._activeModel = self.mesh.readModelUBC(self.basePath + self._staticInput)
 
             else:
                 self._activeModel = np.ones(self._mesh.nC)
@@ -0,0 +1,283 @@
+from __future__ import print_function
+import os
+import hashlib
+import tempfile
+import numpy as np
+import scipy.sparse as sp
+from SimPEG import Utils
+
+try:
+    _replace = os.replace
+except AttributeError:  # Python 2
+    def _replace(src, dst):
+        # os.rename does not overwrite an existing file on Windows
+        if os.name == 'nt' and os.path.exists(dst):
+            os.remove(dst)
+        os.rename(src, dst)
+
+
+def sensitivityKey(prob, *args):
+    """
+    Hash identifying the sensitivity matrix of a potential field problem.
+
+    The hash depends on the problem class, the mesh, the active cells, the
+    receiver locations and any extra arguments (e.g. the components or the
+    inducing field), so that a stored G is only re-used for the same problem.
+
+    :param SimPEG.Problem.LinearProblem prob: paired potential field problem
+    :param args: extra arguments defining G
+    :rtype: str
+    :return: hexadecimal hash
+    """
+    mesh = prob.mesh
+    actInd = getattr(prob, 'actInd', None)
+    if actInd is None:
+        actInd = np.arange(mesh.nC)
+    elif actInd.dtype == 'bool':
+        actInd = np.where(actInd)[0]
+
+    sha = hashlib.sha1()
+    sha.update(prob.__class__.__name__.encode('utf-8'))
+    for h in mesh.h:
+        sha.update(np.ascontiguousarray(h, dtype=float).tobytes())
+    sha.update(np.ascontiguousarray(mesh.x0, dtype=float).tobytes())
+    if mesh._meshType == 'TREE':
+        # cells of the octree, on top of its base tensor
+        sha.update(np.ascontiguousarray(mesh.gridCC, dtype=float).tobytes())
+        sha.update(np.ascontiguousarray(mesh.h_gridded, dtype=float).tobytes())
+    sha.update(np.ascontiguousarray(actInd, dtype=np.int64).tobytes())
+    sha.update(np.ascontiguousarray(
+        prob.survey.srcField.rxList[0].locs, dtype=float
+    ).tobytes())
+    sha.update(repr(args).encode('utf-8'))
+    return sha.hexdigest()
+
+
+def sensitivityFile(path, key):
+    """
+    File name of the sensitivity matrix stored under key in directory path
+    """
+    return os.path.join(os.path.abspath(os.path.expanduser(path)),
+                        'G_{}.npy'.format(key))
+
+
+def loadSensitivity(path, key, shape, verbose=False):
+    """
+    Memory map of a completed sensitivity matrix stored on disk.
+
+    :param str path: directory of the stored sensitivities
+    :param str key: hash of the problem, see sensitivityKey
+    :param tuple shape: expected shape of G
+    :param bool verbose: print the file loaded
+    :rtype: numpy.memmap
+    :return: G (read only), or None if it is not stored
+    """
+    fname = sensitivityFile(path, key)
+    if not os.path.exists(fname):
+        return None
+
+    G = np.load(fname, mmap_mode='r')
+    if G.shape != tuple(shape):
+        return None
+
+    if verbose:
+        print("Sensitivity loaded from " + fname)
+    return G
+
+
+def createSensitivity(path, key, shape, dtype=float):
+    """
+    Creates an empty memory mapped sensitivity matrix on disk. G is written
+    to a temporary file of a unique name, so that runs writing the same
+    sensitivities do not overwrite each other. The file is only re-used once
+    saveSensitivity has moved it to the name of the key.
+
+    :param str path: directory of the stored sensitivities
+    :param str key: hash of the problem, see sensitivityKey
+    :param tuple shape: shape of G
+    :rtype: numpy.memmap
+    :return: G (read and write)
+    """
+    fname = sensitivityFile(path, key)
+    dirname = os.path.dirname(fname)
+    try:
+        os.makedirs(dirname)
+    except OSError:
+        if not os.path.isdir(dirname):
+            raise
+
+    fd, tmp = tempfile.mkstemp(
+        dir=dirname, prefix=os.path.basename(fname)[:-4] + '.',
+        suffix='.tmp.npy'
+    )
+    os.close(fd)
+    return np.lib.format.open_memmap(
+        tmp, mode='w+', dtype=dtype, shape=tuple(shape)
+    )
+
+
+def saveSensitivity(G, path, key):
+    """
+    Flushes a sensitivity matrix created with createSensitivity to disk and
+    marks it as complete.
+
+    :param numpy.memmap G: sensitivity matrix
+    :param str path: directory of the stored sensitivities
+    :param str key: hash of the problem, see sensitivityKey
+    :rtype: numpy.memmap
+    :return: G (read only)
+    """
+    G.flush()
+    fname = sensitivityFile(path, key)
+    # atomic (except on Windows with Python 2), a run loading G sees either
+    # the previous or the new file
+    _replace(G.filename, fname)
+
+    return np.load(fname, mmap_mode='r')
+
+
+def dot(G, v, adjoint=False, maxBlockMemory=0.5):
+    """
+    Product of the sensitivity matrix with a vector. If G is stored on disk
+    or in single precision, blocks of rows are streamed through memory and
+    accumulated in double precision (see Utils.blockDot).
+
+    :param numpy.ndarray G: sensitivity matrix, in memory or memory mapped
+    :param numpy.ndarray v: vector
+    :param bool adjoint: multiply by G.T
+    :param float maxBlockMemory: memory (GB) of the blocks of rows of G
+    :rtype: numpy.ndarray
+    :return: G*v or G.T*v
+    """
+    return Utils.blockDot(G, v, adjoint=adjoint, maxBlockMemory=maxBlockMemory)
+
+
+def compressRows(rows, tol):
+    """
+    Sparse approximation of a block of rows of the sensitivity matrix.
+
+    The smallest entries of each row (typically the far-field cells) are
+    dropped as long as the norm of the dropped part stays below tol times
+    the norm of the row, such that
+
+    .. math ::
+
+        \\|\\mathbf{g} - \\tilde{\\mathbf{g}}\\| \\leq tol \\|\\mathbf{g}\\|
+
+    :param numpy.ndarray rows: dense block of G, shape (nRow, nC)
+    :param float tol: relative error allowed on each row
+    :rtype: tuple
+    :return: (scipy.sparse.csr_matrix, relative error of each row)
+    """
+    rows = np.atleast_2d(rows)
+    nRow, nC = rows.shape
+
+    # Cumulative energy of the entries, from the smallest
+    A = np.abs(rows)**2.
+    order = np.argsort(A, axis=1)
+    cum = np.cumsum(A[np.arange(nRow)[:, None], order], axis=1)
+    total = cum[:, -1]
+
+    nDrop = np.sum(cum <= tol**2. * total[:, None], axis=1)
+
+    drop = np.arange(nC)[None, :] < nDrop[:, None]
+    keep = np.ones((nRow, nC), dtype=bool)
+    keep[np.nonzero(drop)[0], order[drop]] = False
+
+    err = np.zeros(nRow)
+    ind = (nDrop > 0) & (total > 0)
+    err[ind] = np.sqrt(cum[ind, nDrop[ind]-1] / total[ind])
+
+    ii, jj = np.nonzero(keep)
+    G = sp.csr_matrix((rows[ii, jj], (ii, jj)), shape=(nRow, nC))
+
+    return G, err
+
+
+def compressionReport(G, err):
+    """
+    Prints the compression ratio and approximation error of a compressed G
+
+    :param scipy.sparse.csr_matrix G: compressed sensitivity matrix
+    :param numpy.ndarray err: relative error of each row
+    :rtype: tuple
+    :return: (compression ratio, maximum relative row error)
+    """
+    ratio = float(G.shape[0]*G.shape[1]) / max(G.nnz, 1)
+    maxErr = err.max() if err.size > 0 else 0.
+
+    print(
+        "G compressed by {:.1f}x ({:d} non-zeros), "
+        "max relative row error {:.2e}".format(ratio, G.nnz, maxErr)
+    )
+
+    return ratio, maxErr
+
+
+def JtJdiag(J, W=None, D=None, maxBlockMemory=0.5):
+    """
+    Diagonal of J.T*W.T*W*J for a dense or sparse sensitivity J, or of
+    (J*D).T*W.T*W*(J*D) if the derivative of a map D is given.
+
+    If each column of D has at most one non-zero (e.g. a projection on the
+    active cells or on a local mesh), the diagonal is computed on the
+    columns of J and projected with D, without forming J*D.
+
+    Dense sensitivities that are memory mapped, stored in a lower precision
+    than float64, or multiplied by any other D, are squared by blocks of
+    rows (see :code:`Utils.blockDot`) if W is diagonal, so that J (or J*D)
+    is never copied or cast as a whole.
+
+    :param J: sensitivity matrix, dense or scipy.sparse
+    :param W: data weights (sparse matrix), optional
+    :param D: derivative of the map (sparse matrix), optional
+    :param float maxBlockMemory: memory (GB) of a block of rows of J (and
+        of J*D)
+    :rtype: numpy.ndarray
+    :return: diagonal (nP,)
+    """
+    if D is not None:
+        if sp.issparse(D) and np.all(np.diff(sp.csc_matrix(D).indptr) <= 1):
+            return sp.csc_matrix(D).power(2).T * JtJdiag(
+                J, W, maxBlockMemory=maxBlockMemory
+            )
+        if not isinstance(J, np.ndarray):
+            return JtJdiag(J*D, W)
+
+    if (
+        isinstance(J, np.ndarray) and (
+            D is not None or isinstance(J, np.memmap) or
+            J.dtype != np.float64
+        )
+    ):
+        w = np.ones(J.shape[0])
+        if W is not None:
+            W = sp.csr_matrix(W)
+            if (W - sp.diags(W.diagonal(), 0)).nnz == 0:
+                w = W.diagonal()
+            elif D is not None:
+                J, w = W*J, np.ones(W.shape[0])
+            else:
+                w = None
+
+        if w is not None:
+            nCol = J.shape[1] + (0 if D is None else D.shape[1])
+            nRow = int(maxBlockMemory*1e9 / (8. * max(nCol, 1)))
+            nRow = max(nRow, 1)
+
+            diag = np.zeros(J.shape[1] if D is None else D.shape[1])
+            for start in range(0, J.shape[0], nRow):
+                ind = slice(start, min(start+nRow, J.shape[0]))
+                block = w[ind, None]*np.asarray(J[ind, :], dtype=np.float64)
+                if D is not None:
+                    block = D.T.dot(block.T).T
+                diag += np.sum(block**2., axis=0)
+            return diag
+
+    if W is not None:
+        J = W*J
+
+    if sp.issparse(J):
+        return np.asarray(J.power(2).sum(axis=0)).ravel()
+
+    return np.sum(np.power(J, 2), axis=0, dtype=np.float64)
@@ -0,0 +1,245 @@
+"""
+Inversion of large potential field surveys by tiles of receivers.
+
+The receivers are split into spatial tiles. Each tile has its own integral
+problem on a local octree, as fine as the global mesh under the tile and
+coarser away from it, linked to the model of the global mesh by a
+:code:`Maps.TileMap`. The sensitivities are many small matrices instead of
+one dense (nD, nC) matrix. The data misfits of the tiles are summed in a
+:code:`TiledMisfit`, a ComboObjectiveFunction evaluated by a pool of
+threads, so that the directives see one data misfit per tile.
+"""
+
+from __future__ import print_function
+from __future__ import division
+
+import numpy as np
+from scipy.spatial import cKDTree
+from multiprocessing.pool import ThreadPool
+
+from SimPEG import Mesh
+from SimPEG import Maps
+from SimPEG import Utils
+from SimPEG import DataMisfit
+from SimPEG import ObjectiveFunction
+
+
+def tileLocations(rxLoc, maxData):
+    """
+    Split the receivers into spatial tiles of at most maxData receivers, by
+    recursive bisection along the longest horizontal side of each tile.
+
+    :param numpy.ndarray rxLoc: receiver locations (nD, 3)
+    :param int maxData: largest number of receivers of a tile
+    :rtype: list
+    :return: indices of the receivers of each tile
+    """
+    tiles, stack = [], [np.arange(rxLoc.shape[0])]
+    while stack:
+        ind = stack.pop()
+        if ind.size <= maxData:
+            tiles.append(ind)
+            continue
+        dim = np.argmax(np.ptp(rxLoc[ind, :2], axis=0))
+        order = ind[np.argsort(rxLoc[ind, dim], kind='mergesort')]
+        stack += [order[order.size//2:], order[:order.size//2]]
+    return tiles
+
+
+def localMesh(mesh, rxLoc, nCellsPerLevel=4):
+    """
+    Octree covering a global mesh, with the smallest cells of the global
+    mesh around the receivers and cells twice larger every nCellsPerLevel
+    cells away from them.
+
+    The octree is aligned on the smallest cells of the global mesh, such
+    that its finest cells are the cells of the core of the global mesh.
+
+    :param discretize.BaseMesh mesh: global mesh, tensor or tree
+    :param numpy.ndarray rxLoc: receiver locations of the tile (nD, 3)
+    :param int nCellsPerLevel: number of cells of each size
+    :rtype: discretize.TreeMesh
+    :return: local mesh
+    """
+    bounds = Utils.cellBounds(mesh)
+    h, x0, extent = [], [], []
+    for b in bounds:
+        width = b[:, 1] - b[:, 0]
+        h.append(width.min())
+        # node of the smallest cells, moved back to the start of the mesh
+        ref = b[np.argmin(width), 0]
+        x0.append(ref - h[-1]*np.ceil((ref - b[:, 0].min())/h[-1] - 1e-8))
+        extent.append((b[:, 1].max() - x0[-1])/h[-1])
+
+    nC = 2**int(np.ceil(np.log2(max(extent) - 1e-8)))
+    tree = Mesh.TreeMesh([hi*np.ones(nC) for hi in h], x0=np.r_[x0])
+
+    rxTree = cKDTree(rxLoc)
+    scale = nCellsPerLevel*min(h)
+    maxLevel = tree.max_level
+
+    def level(cell):
+        # distance from the cell to the closest receiver
+        radius = np.linalg.norm(np.r_[cell.h])/2.
+        dist = max(rxTree.query(np.r_[cell.center])[0] - radius, 0.)
+        coarsen = int(np.floor(np.log2(1. + dist/scale)))
+        return max(maxLevel - coarsen, 0)
+
+    tree.refine(level)
+    return tree
+
+
+def _threadMap(n_cpu, func, items):
+    # func applied to the items by a pool of n_cpu threads
+    if n_cpu > 1 and len(items) > 1:
+        pool = ThreadPool(min(n_cpu, len(items)))
+        try:
+            return pool.map(func, items)
+        finally:
+            pool.close()
+            pool.join()
+    return [func(item) for item in items]
+
+
+class TiledMisfit(ObjectiveFunction.ComboObjectiveFunction):
+    """
+    Sum of the data misfits of the tiles of a survey, evaluated by n_cpu
+    threads. Each data misfit has the survey and problem of its tile, as in
+    any other ComboObjectiveFunction.
+    """
+
+    n_cpu = 1  #: Number of threads evaluating the tiles
+
+    def _tiles(self, f):
+        # multiplier, misfit and fields of the tiles that are evaluated
+        return [
+            (mult, objfct, None if f is None else f[i])
+            for i, (mult, objfct) in enumerate(self) if mult != 0.
+        ]
+
+    def fields(self, m):
+        """
+        Fields of the problem of each tile
+
+        :param numpy.ndarray m: model
+        :rtype: list
+        :return: fields of each tile
+        """
+        return _threadMap(
+            self.n_cpu, lambda objfct: objfct.prob.fields(m), self.objfcts
+        )
+
+    def __call__(self, m, f=None):
+        return sum(_threadMap(
+            self.n_cpu, lambda tile: tile[0] * tile[1](m, f=tile[2]),
+            self._tiles(f)
+        ))
+
+    def deriv(self, m, f=None):
+        return sum(_threadMap(
+            self.n_cpu, lambda tile: tile[0] * tile[1].deriv(m, f=tile[2]),
+            self._tiles(f)
+        ))
+
+    def deriv2(self, m, v=None, f=None):
+        return sum(_threadMap(
+            self.n_cpu,
+            lambda tile: tile[0] * tile[1].deriv2(m, v, f=tile[2]),
+            self._tiles(f)
+        ))
+
+
+def tiledMisfit(problemType, mesh, survey, actInd=None, maxData=500,
+                nCellsPerLevel=4, n_cpu=1, **kwargs):
+    """
+    Data misfit of a gravity or magnetic survey split into tiles, each
+    with an integral problem on a local octree.
+
+    The tiles are built by n_cpu threads, including their sensitivities.
+    The data are weighted by the standard deviations of the survey, if any.
+
+    .. code:: python
+
+        dmis = PF.Tiles.tiledMisfit(
+            PF.Gravity.GravityIntegral, mesh, survey, actInd=actv,
+            maxData=200, n_cpu=4
+        )
+        invProb = InvProblem.BaseInvProblem(dmis, reg, opt)
+
+    :param class problemType: GravityIntegral or MagneticIntegral
+    :param discretize.BaseMesh mesh: global mesh, tensor or tree
+    :param survey: LinearSurvey of the global survey, with dobs (stacked
+        by component for magnetic receivers of type 'xyz')
+    :param numpy.ndarray actInd: active cells of the global mesh, optional
+    :param int maxData: largest number of receivers of a tile
+    :param int nCellsPerLevel: number of cells of each size of the octrees
+    :param int n_cpu: number of threads building and evaluating the tiles
+    :param kwargs: other properties of the problems
+    :rtype: TiledMisfit
+    :return: data misfit, summed over the tiles
+    """
+    if actInd is None:
+        actInd = np.ones(mesh.nC, dtype=bool)
+    actInd = np.asarray(actInd)
+
+    # physical property of the problem, e.g. rho or chi
+    mapName = 'rhoMap' if hasattr(problemType, 'rhoMap') else 'chiMap'
+
+    srcField = survey.srcField
+    rx = srcField.rxList[0]
+    std = getattr(survey, 'std', None)
+    M = kwargs.pop('M', None)
+
+    # the data of the components are stacked, e.g. [x, y, z] for magnetic
+    # receivers of type 'xyz'
+    nRx = rx.locs.shape[0]
+    nComp = len(survey.dobs) // nRx
+    if nComp * nRx != len(survey.dobs):
+        raise ValueError(
+            'The data ({}) must be a multiple of the receivers ({})'.format(
+                len(survey.dobs), nRx
+            )
+        )
+
+    def buildTile(ind):
+        local = localMesh(mesh, rx.locs[ind, :],
+                          nCellsPerLevel=nCellsPerLevel)
+        tileMap = Maps.TileMap(mesh, actInd, local)
+
+        rxTile = rx.__class__(rx.locs[ind, :])
+        rxTile.rxType = rx.rxType
+        surveyTile = survey.__class__(
+            srcField.__class__([rxTile], param=srcField.param)
+        )
+
+        tileKwargs = dict(kwargs)
+        tileKwargs[mapName] = tileMap
+        if M is not None:
+            # directions of magnetization averaged on the local cells
+            Mtile = tileMap.P * M
+            tileKwargs['M'] = Utils.sdiag(
+                1./np.linalg.norm(Mtile, axis=1)
+            ) * Mtile
+        prob = problemType(
+            local, actInd=tileMap.activeLocal, **tileKwargs
+        )
+        surveyTile.pair(prob)
+        dataInd = np.hstack([ind + k*nRx for k in range(nComp)])
+        surveyTile.dobs = survey.dobs[dataInd]
+        if std is not None:
+            surveyTile.std = std[dataInd]
+
+        # sensitivities of the tile, built by the thread
+        prob.G
+
+        dmis = DataMisfit.l2_DataMisfit(surveyTile)
+        if std is not None:
+            dmis.W = 1./surveyTile.std
+        return dmis
+
+    tiles = tileLocations(rx.locs, maxData)
+    objfcts = _threadMap(n_cpu, buildTile, tiles)
+
+    misfit = TiledMisfit(objfcts=objfcts, n_cpu=n_cpu)
+    misfit.tiles = tiles
+    return misfit
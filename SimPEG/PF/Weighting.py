@@ -0,0 +1,199 @@
+"""
+Model weightings of potential field inversions.
+
+The sensitivities of gravity and magnetic data decay away from the
+receivers, so that an unweighted inversion puts the model close to them.
+The weightings below counteract the decay (Li & Oldenburg, 1996):
+
+- :code:`distanceWeighting`, from the distances between the cells and all
+  the receivers,
+- :code:`depthWeighting`, from the depth of the cells below a reference
+  elevation (e.g. the receivers or the topography),
+- :code:`sensitivityWeighting`, from the columns of a stored, memory mapped,
+  sparse or convolution sensitivity matrix.
+
+They work on tensor and tree meshes. The distance weighting is evaluated
+by blocks of receivers, so that the temporary arrays fit in
+maxBlockMemory, and the blocks are shared by a pool of n_cpu threads.
+"""
+
+from __future__ import print_function
+from __future__ import division
+
+import numpy as np
+from scipy.spatial import cKDTree
+from multiprocessing.pool import ThreadPool
+
+from SimPEG import Utils
+from . import Sensitivity
+from . import Convolution
+
+
+def _activeIndices(mesh, actInd):
+    # indices of the active cells
+    if actInd is None:
+        return np.arange(mesh.nC)
+    actInd = np.asarray(actInd)
+    if actInd.dtype == 'bool':
+        return np.where(actInd)[0]
+    return actInd
+
+
+def _normalize(wr):
+    # weights scaled by their largest value
+    return Utils.mkvc(wr) / np.max(wr)
+
+
+def distanceWeighting(mesh, rxLoc, actInd=None, exponent=2., R0=0.,
+                      maxBlockMemory=0.5, n_cpu=1):
+    """
+    Distance weighting of the cells from the receivers,
+
+    .. math ::
+
+        w_j = \\left[\\sum_i \\left(\\frac{1}{8} \\sum_{k=1}^8
+            (R_{ijk} + R_0)^{-\\beta} \\right)^2 \\right]^{1/4}
+
+    normalized by its largest value, where :math:`R_{ijk}` are the distances
+    from receiver i to eight points of cell j, at :math:`\\pm h/\\sqrt{3}`
+    of its center (the Gauss points of the cell) and :math:`\\beta` is the
+    exponent (3 for magnetic data, 2 for gravity data).
+
+    :param discretize.BaseMesh mesh: mesh, tensor or tree
+    :param numpy.ndarray rxLoc: receiver locations (nD, 3)
+    :param numpy.ndarray actInd: active cells, boolean or indices, optional
+    :param float exponent: decay of the weighting with the distance
+    :param float R0: small distance added to the distances
+    :param float maxBlockMemory: memory (GB) of the temporary arrays of a
+        block of receivers
+    :param int n_cpu: number of threads sharing the blocks
+    :rtype: numpy.ndarray
+    :return: weights of the active cells (nC,)
+    """
+    inds = _activeIndices(mesh, actInd)
+    rxLoc = np.atleast_2d(rxLoc)
+
+    # Gauss points of the active cells, in each direction
+    p = 1. / np.sqrt(3.)
+    points = []
+    for bounds in Utils.cellBounds(mesh, inds):
+        center = bounds.mean(axis=1)
+        h = bounds[:, 1] - bounds[:, 0]
+        points.append((center - h*p, center + h*p))
+
+    # about ten arrays (nRx, nC) per block: six squared offsets, the sums
+    # and their temporaries
+    nC = inds.size
+    nRx = int(maxBlockMemory*1e9 / (8. * 10. * max(nC, 1)))
+    nRx = max(nRx, 1)
+    blocks = [
+        slice(start, min(start+nRx, rxLoc.shape[0]))
+        for start in range(0, rxLoc.shape[0], nRx)
+    ]
+
+    def block(ind):
+        rx = rxLoc[ind, :]
+        dx, dy, dz = [
+            [(x[None, :] - rx[:, dim, None])**2. for x in points[dim]]
+            for dim in range(3)
+        ]
+        temp = np.zeros((rx.shape[0], nC))
+        for nx in dx:
+            for ny in dy:
+                nxy = nx + ny
+                for nz in dz:
+                    temp += (np.sqrt(nxy + nz) + R0)**(-exponent)
+        return np.sum((temp/8.)**2., axis=0)
+
+    if n_cpu > 1 and len(blocks) > 1:
+        pool = ThreadPool(min(n_cpu, len(blocks)))
+        try:
+            wr = sum(pool.map(block, blocks))
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        wr = sum(block(ind) for ind in blocks)
+
+    return np.sqrt(_normalize(np.sqrt(wr)))
+
+
+def depthWeighting(mesh, referenceLoc, actInd=None, exponent=2.,
+                   threshold=None):
+    """
+    Depth weighting of the cells below a reference elevation,
+
+    .. math ::
+
+        w_j = (|z_{ref} - z_j| + z_0)^{-\\beta/2}
+
+    normalized by its largest value, where :math:`z_j` is the elevation of
+    the center of cell j and :math:`\\beta` is the exponent (3 for magnetic
+    data, 2 for gravity data). The reference elevation is either a constant,
+    or the elevation of the closest (horizontal) location of referenceLoc,
+    e.g. the receivers or the topography.
+
+    :param discretize.BaseMesh mesh: mesh, tensor or tree
+    :param referenceLoc: reference elevation (float), or locations (n, 3)
+    :param numpy.ndarray actInd: active cells, boolean or indices, optional
+    :param float exponent: decay of the weighting with the depth
+    :param float threshold: small depth :math:`z_0` added to the depths,
+        half of the smallest cell height by default
+    :rtype: numpy.ndarray
+    :return: weights of the active cells (nC,)
+    """
+    inds = _activeIndices(mesh, actInd)
+    Xn, Yn, Zn = Utils.cellBounds(mesh, inds)
+    zc = Zn.mean(axis=1)
+
+    if threshold is None:
+        threshold = 0.5 * np.min(Zn[:, 1] - Zn[:, 0])
+
+    if np.ndim(referenceLoc) == 0:
+        zRef = float(referenceLoc)
+    else:
+        referenceLoc = np.atleast_2d(referenceLoc)
+        tree = cKDTree(referenceLoc[:, :2])
+        _, ind = tree.query(np.c_[Xn.mean(axis=1), Yn.mean(axis=1)])
+        zRef = referenceLoc[ind, 2]
+
+    wr = (np.abs(zRef - zc) + threshold)**(-0.5*exponent)
+    return _normalize(wr)
+
+
+def sensitivityWeighting(G, W=None, D=None, threshold=1e-12,
+                         maxBlockMemory=0.5):
+    """
+    Sensitivity weighting of the cells, from the diagonal of
+    (G*D).T*W.T*W*(G*D),
+
+    .. math ::
+
+        w_j = \\left(\\sum_i (WGD)_{ij}^2 + \\epsilon \\right)^{1/2}
+
+    normalized by its largest value. The diagonal is computed from a dense
+    G by blocks of rows if G is memory mapped or in a lower precision, from
+    the non-zeros of a compressed (sparse) G, or from the squared kernels of
+    a :code:`Convolution.ConvolutionOperator`, without forming G.T*G.
+
+    .. code:: python
+
+        wr = PF.Weighting.sensitivityWeighting(
+            prob.G, W=dmis.W, D=prob.rhoMap.deriv(m)
+        )
+
+    :param G: sensitivity matrix, dense, memory mapped, sparse or a
+        ConvolutionOperator
+    :param W: data weights (sparse matrix), optional
+    :param D: derivative of the map (sparse matrix), optional
+    :param float threshold: small value :math:`\\epsilon` added to the
+        diagonal
+    :param float maxBlockMemory: memory (GB) of a block of rows of G
+    :rtype: numpy.ndarray
+    :return: weights of the model parameters (nP,)
+    """
+    if isinstance(G, Convolution.ConvolutionOperator):
+        JtJ = G.JtJdiag(W, D)
+    else:
+        JtJ = Sensitivity.JtJdiag(G, W, D, maxBlockMemory=maxBlockMemory)
+    return _normalize((JtJ + threshold)**0.5)
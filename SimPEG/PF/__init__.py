@@ -6,3 +6,6 @@ from . import BaseGrav
 from . import Gravity
 from . import MagneticsDriver
 from . import GravityDriver
+from . import Convolution
+from . import Tiles
+from . import Weighting
@@ -282,12 +282,26 @@ class LinearProblem(BaseProblem):
 
     # surveyPair = Survey.LinearSurvey
 
-    G = None
+    dtype = np.float64  #: Precision of the stored sensitivity G
 
     def __init__(self, mesh, **kwargs):
         BaseProblem.__init__(self, mesh, **kwargs)
         # self.mapping = kwargs.pop('mapping', Maps.IdentityMap(mesh))
 
+    @property
+    def G(self):
+        """
+            Linear operator, stored in the precision given by dtype
+        """
+        G = getattr(self, '_G', None)
+        if G is not None and G.dtype != self.dtype:
+            self._G = G = G.astype(self.dtype)
+        return G
+
+    @G.setter
+    def G(self, val):
+        self._G = val
+
     @property
     def modelMap(self):
         "A SimPEG.Map instance."
@@ -299,7 +313,7 @@ class LinearProblem(BaseProblem):
         self._modelMap = val
 
     def fields(self, m):
-        return self.G.dot(m)
+        return Utils.blockDot(self.G, m)
 
     def getJ(self, m, f=None):
         """
@@ -313,7 +327,7 @@ class LinearProblem(BaseProblem):
             return self.G
 
     def Jvec(self, m, v, f=None):
-        return self.G.dot(v)
+        return Utils.blockDot(self.G, v)
 
     def Jtvec(self, m, v, f=None):
-        return self.G.T.dot(v)
+        return Utils.blockDot(self.G, v, adjoint=True)
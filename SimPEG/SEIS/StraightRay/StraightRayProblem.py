@@ -82,7 +82,9 @@ class StraightRayProblem(Problem.LinearProblem):
         if getattr(self, '_A', None) is not None:
             return self._A
 
-        self._A = sp.lil_matrix((self.survey.nD, self.mesh.nC))
+        self._A = sp.lil_matrix(
+            (self.survey.nD, self.mesh.nC), dtype=self.dtype
+        )
         row = 0
         for tx in self.survey.txList:
             for rx in tx.rxList:
@@ -1,12 +1,28 @@
 from __future__ import print_function
 import numpy as np
+import scipy.sparse as sp
 from scipy.sparse import linalg
+from collections import OrderedDict
+import threading
+from multiprocessing.pool import ThreadPool
 from .matutils import mkvc
 import warnings
 
-def _checkAccuracy(A, b, X, accuracyTol):
-    nrm = np.linalg.norm(mkvc(A*X - b), np.inf)
-    nrm_b = np.linalg.norm(mkvc(b), np.inf)
+def _checkAccuracy(A, b, X, accuracyTol, nCol=None):
+    # Residual of blocks of nCol right hand sides, so that only one block
+    # of the dense residual is in memory
+    b = b.reshape((b.shape[0], -1), order='F')
+    X = X.reshape((X.shape[0], -1), order='F')
+    if nCol is None:
+        nCol = b.shape[1]
+
+    nrm = 0.
+    for start in range(0, b.shape[1], nCol):
+        cols = slice(start, start+nCol)
+        r = A*X[:, cols] - b[:, cols]
+        nrm = max(nrm, np.abs(r).max())
+
+    nrm_b = np.abs(b).max() if b.size > 0 else 0.
     if nrm_b > 0:
         nrm /= nrm_b
     if nrm > accuracyTol:
@@ -15,7 +31,13 @@ def _checkAccuracy(A, b, X, accuracyTol):
         warnings.warn(msg, RuntimeWarning)
 
 
-def SolverWrapD(fun, factorize=True, checkAccuracy=True, accuracyTol=1e-6, name=None):
+def _blockSize(b, maxBlockMemory):
+    # Number of right hand sides solved at once
+    nCol = int(maxBlockMemory*1e9 / (b.itemsize * max(b.shape[0], 1)))
+    return max(nCol, 1)
+
+
+def SolverWrapD(fun, factorize=True, checkAccuracy=True, accuracyTol=1e-6, name=None, maxBlockMemory=0.5):
     """
     Wraps a direct Solver.
 
@@ -25,6 +47,9 @@ def SolverWrapD(fun, factorize=True, checkAccuracy=True, accuracyTol=1e-6, name=
         Solver   = SolverUtils.SolverWrapD(sp.linalg.spsolve, factorize=False)
         SolverLU = SolverUtils.SolverWrapD(sp.linalg.splu, factorize=True)
 
+    Multiple right hand sides are solved in blocks of columns, at most
+    maxBlockMemory (GB) at once.
+
     """
 
     def __init__(self, A, **kwargs):
@@ -34,6 +59,8 @@ def SolverWrapD(fun, factorize=True, checkAccuracy=True, accuracyTol=1e-6, name=
         if "checkAccuracy" in kwargs: del kwargs["checkAccuracy"]
         self.accuracyTol = kwargs.get("accuracyTol", accuracyTol)
         if "accuracyTol" in kwargs: del kwargs["accuracyTol"]
+        self.maxBlockMemory = kwargs.get("maxBlockMemory", maxBlockMemory)
+        if "maxBlockMemory" in kwargs: del kwargs["maxBlockMemory"]
 
         self.kwargs = kwargs
 
@@ -44,6 +71,7 @@ def SolverWrapD(fun, factorize=True, checkAccuracy=True, accuracyTol=1e-6, name=
         if type(b) is not np.ndarray:
             raise TypeError('Can only multiply by a numpy array.')
 
+        nCol = None
         if len(b.shape) == 1 or b.shape[1] == 1:
             b = b.flatten()
             # Just one RHS
@@ -61,14 +89,20 @@ def SolverWrapD(fun, factorize=True, checkAccuracy=True, accuracyTol=1e-6, name=
 
             X = np.empty_like(b)
 
-            for i in range(b.shape[1]):
+            # Blocks of RHSs solved at once
+            nCol = _blockSize(b, self.maxBlockMemory)
+            for start in range(0, b.shape[1], nCol):
+                cols = slice(start, start+nCol)
                 if factorize:
-                    X[:,i] = self.solver.solve(b[:,i])
+                    x = self.solver.solve(
+                        np.asfortranarray(b[:, cols]), **self.kwargs
+                    )
                 else:
-                    X[:,i] = fun(self.A, b[:,i], **self.kwargs)
+                    x = fun(self.A, b[:, cols], **self.kwargs)
+                X[:, cols] = x.reshape((b.shape[0], -1))
 
         if self.checkAccuracy:
-            _checkAccuracy(self.A, b, X, self.accuracyTol)
+            _checkAccuracy(self.A, b, X, self.accuracyTol, nCol)
         return X
 
     def clean(self):
@@ -79,7 +113,7 @@ def SolverWrapD(fun, factorize=True, checkAccuracy=True, accuracyTol=1e-6, name=
 
 
 
-def SolverWrapI(fun, checkAccuracy=True, accuracyTol=1e-5, name=None):
+def SolverWrapI(fun, checkAccuracy=True, accuracyTol=1e-5, name=None, n_cpu=1):
     """
     Wraps an iterative Solver.
 
@@ -88,6 +122,9 @@ def SolverWrapI(fun, checkAccuracy=True, accuracyTol=1e-5, name=None):
         import scipy.sparse as sp
         SolverCG = SolverUtils.SolverWrapI(sp.linalg.cg)
 
+    Multiple right hand sides are independent solves, run on a pool of
+    n_cpu threads.
+
     """
 
     def __init__(self, A, **kwargs):
@@ -97,6 +134,8 @@ def SolverWrapI(fun, checkAccuracy=True, accuracyTol=1e-5, name=None):
         if "checkAccuracy" in kwargs: del kwargs["checkAccuracy"]
         self.accuracyTol = kwargs.get("accuracyTol", accuracyTol)
         if "accuracyTol" in kwargs: del kwargs["accuracyTol"]
+        self.n_cpu = kwargs.get("n_cpu", n_cpu)
+        if "n_cpu" in kwargs: del kwargs["n_cpu"]
 
         self.kwargs = kwargs
 
@@ -116,8 +155,21 @@ def SolverWrapI(fun, checkAccuracy=True, accuracyTol=1e-5, name=None):
                 X = out
         else: # Multiple RHSs
             X = np.empty_like(b)
-            for i in range(b.shape[1]):
-                out = fun(self.A, b[:,i], **self.kwargs)
+
+            def solve(i):
+                return fun(self.A, b[:, i], **self.kwargs)
+
+            if self.n_cpu > 1:
+                pool = ThreadPool(min(self.n_cpu, b.shape[1]))
+                try:
+                    outs = pool.map(solve, range(b.shape[1]))
+                finally:
+                    pool.close()
+                    pool.join()
+            else:
+                outs = map(solve, range(b.shape[1]))
+
+            for i, out in enumerate(outs):
                 if type(out) is tuple and len(out) == 2:
                     # We are dealing with scipy output with an info!
                     X[:,i] = out[0]
@@ -171,3 +223,447 @@ class SolverDiag(object):
 
     def clean(self):
         pass
+
+
+def _isSymmetric(A, tol=1e-10):
+    """
+    Check if a sparse matrix is (complex) symmetric, i.e. A == A.T
+    """
+    if A.shape[0] != A.shape[1]:
+        return False
+    R = (A - A.T).tocsr()
+    if R.nnz == 0:
+        return True
+    Amax = np.abs(A.data).max() if A.nnz > 0 else 0.
+    return np.abs(R.data).max() <= tol * Amax
+
+
+def _factorMemory(Ainv, A, fillFactor=20.):
+    """
+    Estimate the memory (bytes) held by the factors of A. If the solver
+    exposes the number of non-zeros of its factors (e.g. SuperLU) this is
+    used, otherwise the fill-in is approximated with fillFactor.
+    """
+    itemsize = np.dtype(A.dtype).itemsize + 4  # value + integer index
+    nnz = getattr(getattr(Ainv, 'solver', None), 'nnz', None)
+    if isinstance(nnz, (int, np.integer)):
+        return int(nnz) * itemsize
+    return int(fillFactor * A.nnz * itemsize)
+
+
+class SolverCache(object):
+    """
+    Store of matrix factorizations indexed by a hashable key, e.g. a
+    time-step length or a frequency.
+
+    Factors are created on demand and kept until :code:`clean` is called, so
+    that the solves in fields, Jvec and Jtvec share one factorization of
+    each matrix. If the estimated memory held by the factors exceeds
+    :code:`maxMemory` (GB), the least recently used factors are cleaned.
+
+    ::
+
+        Ainv = SolverCache(SolverLU, maxMemory=4.)
+        for freq in freqs:
+            x = Ainv.get(freq, lambda: prob.getA(freq)) * rhs
+        Ainv.clean()
+
+    Transposed systems are requested with :code:`transpose=True`. If the
+    matrix is symmetric the forward factors are reused, otherwise the
+    transpose is factored and stored alongside.
+
+    The store can be shared by threads that solve for different keys at the
+    same time; factors requested with :code:`hold=True` are not evicted until
+    they are released.
+
+    :param Solver: SimPEG Solver class
+    :param dict solverOpts: options passed to the Solver
+    :param float maxMemory: memory budget in GB (None for no limit)
+    :param SimPEG.Utils.Counter counter: records hits and misses
+    :param str name: prefix used for the counter
+    """
+
+    fillFactor = 20.  #: fill-in ratio used when the solver does not report it
+
+    def __init__(
+        self, Solver, solverOpts=None, maxMemory=None, counter=None,
+        name='SolverCache'
+    ):
+        self.Solver = Solver
+        self.solverOpts = {} if solverOpts is None else solverOpts
+        self.maxMemory = maxMemory
+        self.counter = counter
+        self.name = name
+        self._factors = OrderedDict()
+        self._memory = {}
+        self._symmetric = {}
+        self._held = {}
+        self._lock = threading.RLock()
+
+    def __contains__(self, key):
+        return key in self._factors
+
+    def __len__(self):
+        return len(self._factors)
+
+    @property
+    def memory(self):
+        """Estimated memory (GB) held by the stored factors"""
+        return sum(self._memory.values()) * 1e-9
+
+    def _count(self, prop):
+        if self.counter is not None:
+            self.counter.count('{}.{}'.format(self.name, prop))
+
+    def _store(self, key, A):
+        # factor outside of the lock, so that workers factor in parallel
+        Ainv = self.Solver(A, **self.solverOpts)
+        memory = _factorMemory(Ainv, A, self.fillFactor)
+        with self._lock:
+            if key in self._factors:  # factored by another worker
+                if hasattr(Ainv, 'clean'):
+                    Ainv.clean()
+                return self._factors[key]
+            self._factors[key] = Ainv
+            self._memory[key] = memory
+            self._evict(keep=key)
+        return Ainv
+
+    def _evict(self, keep=None):
+        if self.maxMemory is None:
+            return
+        for key in list(self._factors.keys()):
+            if self.memory <= self.maxMemory:
+                break
+            if key == keep or self._held.get(key, 0) > 0:
+                continue
+            self._remove(key)
+            self._count('evict')
+
+    def _remove(self, key):
+        Ainv = self._factors.pop(key)
+        self._memory.pop(key)
+        if hasattr(Ainv, 'clean'):
+            Ainv.clean()
+
+    def _key(self, key, A, transpose):
+        """
+        Key under which the factors are stored, symmetric matrices share the
+        forward factors for transposed solves.
+        """
+        if not transpose:
+            return key, A, False
+        symmetric = self._symmetric.get(key)
+        if symmetric is None:
+            if callable(A):
+                A = A()
+            symmetric = _isSymmetric(A)
+            self._symmetric[key] = symmetric
+        if symmetric:
+            return key, A, False
+        return (key, 'T'), A, True
+
+    def get(self, key, A, transpose=False, hold=False):
+        """
+        Factors of the matrix stored under key.
+
+        :param key: hashable index of the matrix
+        :param A: sparse matrix, or a callable returning it, that is only
+            evaluated if the factors are not yet stored
+        :param bool transpose: return the factors of A.T
+        :param bool hold: protect the factors from eviction until
+            :code:`release` is called
+        :return: Solver instance
+        """
+        key, A, transpose = self._key(key, A, transpose)
+
+        with self._lock:
+            if hold:
+                self._held[key] = self._held.get(key, 0) + 1
+            if key in self._factors:
+                self._factors[key] = self._factors.pop(key)  # most recently used
+                self._count('hit')
+                return self._factors[key]
+            self._count('miss')
+
+        if callable(A):
+            A = A()
+        return self._store(key, A.T if transpose else A)
+
+    def release(self, key):
+        """
+        Release the factors (of A and A.T) requested with :code:`hold=True`,
+        so that they can be evicted again.
+
+        :param key: hashable index of the matrix
+        """
+        with self._lock:
+            for k in [key, (key, 'T')]:
+                held = self._held.get(k, 0) - 1
+                if held > 0:
+                    self._held[k] = held
+                else:
+                    self._held.pop(k, None)
+            self._evict()
+
+    def clean(self):
+        """Clean all stored factors"""
+        with self._lock:
+            for key in list(self._factors.keys()):
+                self._remove(key)
+            self._symmetric = {}
+            self._held = {}
+
+
+def _coarseNodes(x):
+    # every other node of a 1D grid, keeping its last node
+    xc = x[::2]
+    if xc[-1] != x[-1]:
+        xc = np.r_[xc, x[-1]]
+    return xc
+
+
+def _interpolation1D(x, xc):
+    """
+    Linear interpolation (len(x), len(xc)) from the points xc to the points
+    x, constant beyond the first and last points of xc.
+    """
+    n = len(x)
+    if len(xc) == 1:
+        return sp.csr_matrix(np.ones((n, 1)))
+    j = np.clip(np.searchsorted(xc, x, side='right') - 1, 0, len(xc) - 2)
+    w = np.clip((x - xc[j]) / (xc[j+1] - xc[j]), 0., 1.)
+    rows = np.r_[np.arange(n), np.arange(n)]
+    return sp.csr_matrix(
+        (np.r_[1. - w, w], (rows, np.r_[j, j+1])), shape=(n, len(xc))
+    )
+
+
+def _krylov(fun, A, b, tol, maxiter, M):
+    # scipy renamed the relative tolerance of its Krylov solvers to rtol
+    try:
+        return fun(A, b, rtol=tol, atol=0., maxiter=maxiter, M=M)
+    except TypeError:
+        return fun(A, b, tol=tol, maxiter=maxiter, M=M)
+
+
+class Multigrid(object):
+    """
+    Geometric multigrid V-cycle of a cell centered or nodal operator on a
+    tensor grid.
+
+    The grid is coarsened by merging pairs of cells in each direction, the
+    prolongation P interpolates linearly between the coarse cell centers
+    (or nodes) and the coarse operators are the Galerkin products P.T*A*P,
+    so that variable coefficients and boundary conditions are inherited
+    from A. The smoother is a damped Jacobi iteration, with a damping from
+    an estimate of the largest eigenvalue of the diagonally scaled operator
+    of each level. The coarsest operator, with at most coarseSize unknowns,
+    is inverted.
+
+    :param scipy.sparse.spmatrix A: operator on the grid
+    :param list nodes: nodes of the grid in each direction, e.g.
+        [mesh.vectorNx, mesh.vectorNy, mesh.vectorNz]
+    :param str location: unknowns on the cell centers 'CC' or nodes 'N'
+    :param int coarseSize: largest number of unknowns of the coarsest grid
+    :param int nSmooth: number of smoothing sweeps before and after the
+        coarse correction
+    """
+
+    def __init__(self, A, nodes, location='CC', coarseSize=500, nSmooth=2):
+        assert location in ['CC', 'N'], (
+            "location must be 'CC' or 'N', not {}".format(location)
+        )
+        self.location = location
+        self.nSmooth = nSmooth
+        self.levels = []
+
+        nodes = [np.asarray(x, dtype=float) for x in nodes]
+        A = sp.csr_matrix(A)
+        while A.shape[0] > coarseSize:
+            # directions with more than two cells are coarsened
+            coarse = [_coarseNodes(x) if x.size > 3 else x for x in nodes]
+            if all(xc.size == x.size for x, xc in zip(nodes, coarse)):
+                break
+
+            P = sp.csr_matrix(np.ones((1, 1)))
+            for x, xc in zip(nodes, coarse):
+                P = sp.kron(
+                    _interpolation1D(self._points(x), self._points(xc)), P
+                ).tocsr()
+
+            self.levels.append((A, self._jacobi(A), P))
+            A = (P.T * A * P).tocsr()
+            nodes = coarse
+
+        self.coarse = np.linalg.pinv(A.toarray())
+
+    def _points(self, x):
+        # unknowns of a 1D grid with nodes x
+        if self.location == 'CC':
+            return 0.5 * (x[1:] + x[:-1])
+        return x
+
+    def _jacobi(self, A, nIter=10):
+        """
+        Damped inverse of the diagonal of A, with the damping 4/(3*lambda)
+        of the largest eigenvalue lambda of D^-1*A (power iterations).
+        """
+        dinv = 1. / A.diagonal()
+        x = np.random.RandomState(0).rand(A.shape[0])
+        lam = 1.
+        for _ in range(nIter):
+            y = dinv * (A * x)
+            lam = np.linalg.norm(y) / np.linalg.norm(x)
+            x = y / np.linalg.norm(y)
+        return 4. / (3. * lam) * dinv
+
+    @property
+    def nLevels(self):
+        """Number of grids, including the coarsest"""
+        return len(self.levels) + 1
+
+    def cycle(self, b, level=0):
+        """
+        Approximate solution of A*x = b by one V-cycle
+
+        :param numpy.ndarray b: right hand side
+        :param int level: grid of b, 0 is the finest
+        :rtype: numpy.ndarray
+        :return: x
+        """
+        if level == len(self.levels):
+            return self.coarse.dot(b)
+
+        A, dinv, P = self.levels[level]
+        x = dinv * b
+        for _ in range(self.nSmooth - 1):
+            x += dinv * (b - A * x)
+        x += P * self.cycle(P.T * (b - A * x), level + 1)
+        for _ in range(self.nSmooth):
+            x += dinv * (b - A * x)
+        return x
+
+    def aslinearoperator(self):
+        """V-cycle as a scipy LinearOperator, e.g. a Krylov preconditioner"""
+        n = self.levels[0][0].shape[0] if self.levels else self.coarse.shape[0]
+        return linalg.LinearOperator(
+            (n, n), matvec=self.cycle, rmatvec=self.cycle, dtype=float
+        )
+
+
+class SolverMG(object):
+    """
+    Multigrid solver of cell centered or nodal Poisson operators on a
+    TensorMesh (e.g. DC resistivity or gravity problems).
+
+    The system is solved by a Krylov method (krylov='cg', 'bicgstab' or
+    'gmres') preconditioned by a multigrid V-cycle (see :code:`Multigrid`),
+    or by V-cycles alone (krylov=None). The iterations grow slowly with the
+    size of the mesh and only a few sparse matrices of the size of A are
+    stored, a memory-lean alternative to the factors of a direct solver.
+
+    The unknowns are on the cells or the nodes of the mesh, from the size of
+    A. The problems give their mesh to the solver, e.g.
+
+    ::
+
+        prob = DC.Problem3D_CC(mesh, Solver=SolverMG, solverOpts={'tol': 1e-8})
+
+    :param scipy.sparse.spmatrix A: operator
+    :param discretize.TensorMesh mesh: mesh of the operator
+    :param str krylov: Krylov method, None for V-cycles alone
+    :param float tol: relative tolerance on the residual
+    :param int maxiter: largest number of iterations
+    :param int n_cpu: number of right hand sides solved at the same time
+    :param kwargs: options of Multigrid (coarseSize, nSmooth)
+    """
+
+    _geometric = True  #: the problems give their mesh to the solver
+
+    def __init__(
+        self, A, mesh=None, krylov='bicgstab', tol=1e-6, maxiter=200,
+        n_cpu=1, **kwargs
+    ):
+        if mesh is None or getattr(mesh, '_meshType', None) != 'TENSOR':
+            raise NotImplementedError(
+                'SolverMG needs the TensorMesh of the operator'
+            )
+        nodes = [mesh.vectorNx, mesh.vectorNy, mesh.vectorNz][:mesh.dim]
+        if A.shape[0] == mesh.nC:
+            location = 'CC'
+        elif A.shape[0] == mesh.nN:
+            location = 'N'
+        else:
+            raise ValueError(
+                'A ({} unknowns) is not on the cells or nodes of the '
+                'mesh'.format(A.shape[0])
+            )
+        assert krylov in [None, 'cg', 'bicgstab', 'gmres'], (
+            'krylov must be None, cg, bicgstab or gmres, not {}'.format(krylov)
+        )
+
+        self.A = sp.csr_matrix(A)
+        self.krylov = krylov
+        self.tol = tol
+        self.maxiter = maxiter
+        self.n_cpu = n_cpu
+        self.mg = Multigrid(self.A, nodes, location=location, **kwargs)
+        self.info = 0
+
+    def _solve(self, b):
+        # solution of A*x = b, and the number of iterations
+        # (0 if converged)
+        if self.krylov is not None:
+            fun = getattr(linalg, self.krylov)
+            return _krylov(
+                fun, self.A, b, self.tol, self.maxiter,
+                self.mg.aslinearoperator()
+            )
+
+        x = np.zeros_like(b)
+        nrm_b = np.linalg.norm(b)
+        for _ in range(self.maxiter):
+            r = b - self.A * x
+            if np.linalg.norm(r) <= self.tol * nrm_b:
+                return x, 0
+            x += self.mg.cycle(r)
+        return x, self.maxiter
+
+    def __mul__(self, b):
+        if type(b) is not np.ndarray:
+            raise TypeError('Can only multiply by a numpy array.')
+
+        if len(b.shape) == 1 or b.shape[1] == 1:
+            X, self.info = self._solve(b.flatten().astype(float))
+        else:
+            def solve(i):
+                return self._solve(b[:, i].astype(float))
+
+            if self.n_cpu > 1:
+                pool = ThreadPool(min(self.n_cpu, b.shape[1]))
+                try:
+                    outs = pool.map(solve, range(b.shape[1]))
+                finally:
+                    pool.close()
+                    pool.join()
+            else:
+                outs = [solve(i) for i in range(b.shape[1])]
+
+            X = np.empty(b.shape)
+            self.info = 0
+            for i, (x, info) in enumerate(outs):
+                X[:, i] = x
+                self.info = max(self.info, info)
+
+        if self.info > 0:
+            msg = (
+                '### SolverWarning ###: Multigrid did not converge to '
+                '{0:e} in {1:d} iterations'.format(self.tol, self.maxiter)
+            )
+            print(msg)
+            warnings.warn(msg, RuntimeWarning)
+        return X
+
+    def clean(self):
+        pass
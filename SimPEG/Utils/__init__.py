@@ -7,7 +7,7 @@ from .matutils import (
     av_extrap, ndgrid, ind2sub, sub2ind, getSubArray,
     inv3X3BlockDiagonal, inv2X2BlockDiagonal, TensorType,
     makePropertyTensor, invPropertyTensor, diagEst, Zero,
-    Identity, uniqueRows
+    Identity, uniqueRows, blockDot
 )
 from .codeutils import (
     memProfileWrapper, hook, setKwargs,
@@ -16,7 +16,8 @@ from .codeutils import (
     asArray_N_x_Dim, requires
 )
 from .meshutils import (
-    exampleLrmGrid, meshTensor, closestPoints, ExtractCoreMesh
+    exampleLrmGrid, meshTensor, closestPoints, ExtractCoreMesh, cellBounds,
+    readUBCmesh, containingCells
 )
 from .curvutils import volTetra, faceInfo, indexCube
 from .CounterUtils import Counter, count, timeIt
@@ -81,3 +81,57 @@ def uniqueRows(M):
     _, invInd = np.unique(b, return_inverse=True)
     unqM = M[unqInd]
     return unqM, unqInd, invInd
+
+
+def blockDot(G, v, adjoint=False, maxBlockMemory=0.5):
+    """
+        Product of a stored operator with a vector, G*v or G.T*v.
+
+        Dense operators that are memory mapped, or stored in a lower
+        precision than float64 (e.g. float32), are multiplied by blocks of
+        rows. Each block is multiplied in the precision of G, at the BLAS
+        throughput of that precision, and the results of the blocks are
+        accumulated in float64. G is never copied or cast as a whole.
+
+        :param G: operator, dense (numpy.ndarray, numpy.memmap) or sparse
+        :param numpy.array v: vector
+        :param bool adjoint: multiply by G.T
+        :param float maxBlockMemory: memory (GB) of a block of rows of G
+        :rtype: numpy.array
+        :return: G*v or G.T*v (float64)
+    """
+    v = np.asarray(v)
+
+    if (
+        not isinstance(G, np.ndarray) or
+        (G.dtype == np.float64 and not isinstance(G, np.memmap))
+    ):
+        if adjoint:
+            return G.T.dot(v)
+        return G.dot(v)
+
+    nRow = int(maxBlockMemory*1e9 / (G.itemsize * max(G.shape[1], 1)))
+    nRow = max(nRow, 1)
+
+    # Vector in the precision of G, output accumulated in float64
+    dtype = np.result_type(np.float64, v.dtype)
+    if np.iscomplexobj(v):
+        vG = v
+    else:
+        vG = v.astype(G.dtype, copy=False)
+
+    if adjoint:
+        out = np.zeros(G.shape[1], dtype=dtype)
+    else:
+        out = np.zeros(G.shape[0], dtype=dtype)
+
+    for start in range(0, G.shape[0], nRow):
+        ind = slice(start, min(start+nRow, G.shape[0]))
+        block = np.asarray(G[ind, :])
+
+        if adjoint:
+            out += block.T.dot(vG[ind])
+        else:
+            out[ind] = block.dot(vG)
+
+    return out
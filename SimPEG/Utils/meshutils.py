@@ -1,3 +1,119 @@
+import numpy as np
+
+from discretize import TensorMesh, TreeMesh
 from discretize.utils import (
-    exampleLrmGrid, meshTensor, closestPoints, ExtractCoreMesh
+    exampleLrmGrid, meshTensor, closestPoints, ExtractCoreMesh, mkvc
 )
+
+
+def cellBounds(mesh, inds=None):
+    """
+    Lower and upper bounds of the cells of a 3D tensor or tree mesh.
+
+    :param discretize.BaseMesh mesh: TensorMesh or TreeMesh
+    :param numpy.ndarray inds: indices of the cells, optional (all cells)
+    :rtype: tuple
+    :return: (Xn, Yn, Zn), the bounds of each cell along x, y and z (nC, 2)
+    """
+    if mesh._meshType == 'TREE':
+        h = mesh.h_gridded
+        bounds = [
+            np.c_[mesh.gridCC[:, i] - h[:, i]/2., mesh.gridCC[:, i] + h[:, i]/2.]
+            for i in range(3)
+        ]
+    else:
+        xn = mesh.vectorNx
+        yn = mesh.vectorNy
+        zn = mesh.vectorNz
+
+        yn2, xn2, zn2 = np.meshgrid(yn[1:], xn[1:], zn[1:])
+        yn1, xn1, zn1 = np.meshgrid(yn[0:-1], xn[0:-1], zn[0:-1])
+
+        bounds = [
+            np.c_[mkvc(xn1), mkvc(xn2)],
+            np.c_[mkvc(yn1), mkvc(yn2)],
+            np.c_[mkvc(zn1), mkvc(zn2)]
+        ]
+
+    if inds is not None:
+        bounds = [b[inds, :] for b in bounds]
+    return tuple(bounds)
+
+
+def readUBCmesh(fileName):
+    """
+    Read a UBC mesh file, either a tensor mesh or an octree mesh.
+
+    The octree files list the number of cells on their fourth line, followed
+    by one line per cell, while the tensor files have five lines.
+
+    :param str fileName: path to the UBC mesh file
+    :rtype: discretize.BaseMesh
+    :return: TensorMesh or TreeMesh
+    """
+    with open(fileName, 'r') as fid:
+        lines = [
+            line.split('!')[0].strip() for line in fid
+            if len(line.split('!')[0].strip()) > 0
+        ]
+
+    if len(lines) > 5 and len(lines[3].split()) == 1:
+        return TreeMesh.readUBC(fileName)
+    return TensorMesh.readUBC(fileName)
+
+
+def containingCells(mesh, locs):
+    """
+    Index of the cell of a 3D tensor or tree mesh containing each location.
+
+    The cells of a tree mesh with sizes h*2**k are looked up on the regular
+    grid of cells of that size, h being the size of its smallest cells.
+
+    :param discretize.BaseMesh mesh: TensorMesh or TreeMesh
+    :param numpy.ndarray locs: locations (n, 3)
+    :rtype: numpy.ndarray
+    :return: index of the cells (n,), -1 outside of the mesh
+    """
+    locs = np.atleast_2d(locs)
+    index = -np.ones(locs.shape[0], dtype=np.int64)
+
+    if mesh._meshType != 'TREE':
+        inside = np.ones(locs.shape[0], dtype=bool)
+        ijk = []
+        for dim, xn in enumerate([mesh.vectorNx, mesh.vectorNy, mesh.vectorNz]):
+            i = np.searchsorted(xn, locs[:, dim], side='right') - 1
+            # last node included in the last cell
+            i[locs[:, dim] == xn[-1]] = len(xn) - 2
+            inside &= (i >= 0) & (i < len(xn) - 1)
+            ijk.append(i)
+        index[inside] = np.ravel_multi_index(
+            [i[inside] for i in ijk], mesh.vnC, order='F'
+        )
+        return index
+
+    bounds = cellBounds(mesh)
+    lower = np.c_[bounds[0][:, 0], bounds[1][:, 0], bounds[2][:, 0]]
+    size = np.c_[bounds[0][:, 1], bounds[1][:, 1], bounds[2][:, 1]] - lower
+    h = size.min(axis=0)
+    x0 = lower.min(axis=0)
+    nMax = np.ceil(((lower + size).max(axis=0) - x0) / h)
+    level = np.round(np.log2(size[:, 0] / h[0])).astype(int)
+
+    for k in np.unique(level):
+        cells = np.where(level == k)[0]
+        hk = h * 2**k
+        shape = tuple(np.ceil(nMax / 2**k).astype(int) + 1)
+
+        ijk = np.floor((lower[cells] - x0) / hk + 0.5).astype(np.int64)
+        keys = np.ravel_multi_index(ijk.T, shape)
+        order = np.argsort(keys)
+        keys, cells = keys[order], cells[order]
+
+        ijk = np.floor((locs - x0) / hk).astype(np.int64)
+        inside = np.all((ijk >= 0) & (ijk < np.r_[shape]), axis=1)
+        pts = np.ravel_multi_index(ijk[inside].T, shape)
+        pos = np.minimum(np.searchsorted(keys, pts), keys.size - 1)
+        found = keys[pos] == pts
+        index[np.where(inside)[0][found]] = cells[pos[found]]
+
+    return index
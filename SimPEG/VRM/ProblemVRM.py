@@ -1,4 +1,4 @@
-from SimPEG import Problem, mkvc, Maps, Props, Survey
+from SimPEG import Problem, mkvc, Maps, Props, Survey, Utils
 from SimPEG.VRM.SurveyVRM import SurveyVRM
 from SimPEG.VRM.RxVRM import Point, SquareLoop
 import numpy as np
@@ -669,6 +669,7 @@ class Problem_Linear(Problem_BaseVRM):
     _T = None
     _TisSet = False
     _xiMap = None
+    dtype = np.float64  #: Precision of the stored sensitivity A
 
     surveyPair = SurveyVRM  # Only linear problem can have survey and be inverted
 
@@ -703,7 +704,9 @@ class Problem_Linear(Problem_BaseVRM):
             print('CREATING A MATRIX')
 
             # COLLAPSE ALL A MATRICIES INTO SINGLE OPERATOR
-            self._A = np.vstack(self._getAMatricies())
+            self._A = np.asarray(
+                np.vstack(self._getAMatricies()), dtype=self.dtype
+            )
             self._AisSet = True
 
             return self._A
@@ -770,11 +773,10 @@ class Problem_Linear(Problem_BaseVRM):
         self.model = m   # Initiates/updates model and initiates mapping
 
         # Project to active mesh cells
-        # m = np.matrix(self.xiMap * m).T
-        m = np.matrix(self.xiMap * m).T
+        m = self.xiMap * m
 
         # Must return as a numpy array
-        return mkvc(sp.coo_matrix.dot(self.T, np.dot(self.A, m)))
+        return mkvc(sp.coo_matrix.dot(self.T, Utils.blockDot(self.A, m)))
 
     def Jvec(self, m, v, f=None):
 
@@ -785,11 +787,8 @@ class Problem_Linear(Problem_BaseVRM):
         # Jacobian of xi wrt model
         dxidm = self.xiMap.deriv(m)
 
-        # dxidm*v
-        v = np.matrix(dxidm*v).T
-
         # Dot product with A
-        v = self.A*v
+        v = Utils.blockDot(self.A, dxidm*v)
 
         # Get active time rows of T
         T = self.T.tocsr()[self.survey.t_active, :]
@@ -803,15 +802,12 @@ class Problem_Linear(Problem_BaseVRM):
 
         assert self.ispaired, "Problem must be paired with survey to predict data"
 
-        # Define v as a column vector
-        v = np.matrix(v).T
-
         # Get T'*Pd'*v
         T = self.T.tocsr()[self.survey.t_active, :]
         v = sp.csc_matrix.dot(T.transpose(), v)
 
         # Multiply by A'
-        v = (np.dot(v.T, self.A)).T
+        v = Utils.blockDot(self.A, v, adjoint=True)
 
         # Jacobian of xi wrt model
         dxidm = self.xiMap.deriv(m)
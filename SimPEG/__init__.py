@@ -21,7 +21,8 @@ from .Utils import mkvc
 from .Utils import versions
 from .Utils.SolverUtils import (
     _checkAccuracy, SolverWrapD, SolverWrapI,
-    Solver, SolverCG, SolverDiag, SolverLU, SolverBiCG,
+    Solver, SolverCG, SolverDiag, SolverLU, SolverBiCG, SolverCache,
+    SolverMG,
 )
 __version__   = '0.9.2'
 __author__    = 'SimPEG Team'
@@ -1,5 +1,8 @@
 import unittest
-from SimPEG import Mesh, Solver, SolverDiag, SolverCG, SolverLU, Utils
+from SimPEG import (
+    Mesh, Solver, SolverDiag, SolverCG, SolverLU, SolverCache, SolverMG,
+    Utils
+)
 from discretize import TensorMesh
 from SimPEG.Utils import sdiag
 import numpy as np
@@ -47,13 +50,100 @@ class TestSolver(unittest.TestCase):
 
     def test_direct_splu_1(self): self.assertLess(dotest(SolverLU, False),TOLD)
     def test_direct_splu_M(self): self.assertLess(dotest(SolverLU, True),TOLD)
+    def test_direct_splu_M_blocks(self): self.assertLess(dotest(SolverLU, False, maxBlockMemory=1e-5),TOLD)
+    def test_direct_spsolve_M_blocks(self): self.assertLess(dotest(Solver, False, maxBlockMemory=2e-5),TOLD)
 
     def test_iterative_diag_1(self): self.assertLess(dotest(SolverDiag, False, A=Utils.sdiag(np.random.rand(10)+1.0)),TOLI)
     def test_iterative_diag_M(self): self.assertLess(dotest(SolverDiag, True, A=Utils.sdiag(np.random.rand(10)+1.0)),TOLI)
 
     def test_iterative_cg_1(self): self.assertLess(dotest(SolverCG, False),TOLI)
     def test_iterative_cg_M(self): self.assertLess(dotest(SolverCG, True),TOLI)
-
+    def test_iterative_cg_M_threads(self): self.assertLess(dotest(SolverCG, False, n_cpu=2),TOLI)
+
+
+
+class TestSolverMG(unittest.TestCase):
+
+    def setUp(self):
+        h = [(10., 3, -1.3), (10., 16), (10., 3, 1.3)]
+        self.mesh = TensorMesh([h, h, h], 'CCC')
+
+    def dotest(self, A, **solverOpts):
+        e = np.ones(A.shape[0])
+        Ainv = SolverMG(A, mesh=self.mesh, tol=1e-10, **solverOpts)
+        self.assertGreater(Ainv.mg.nLevels, 2)
+        x = Ainv * (A * e)
+        X = Ainv * (A * np.c_[e, 2.*e])
+        Ainv.clean()
+        self.assertEqual(Ainv.info, 0)
+        self.assertLess(np.linalg.norm(e - x, np.inf), TOLI)
+        self.assertLess(np.linalg.norm(2.*e - X[:, 1], np.inf), TOLI)
+
+    def test_cell_centered(self):
+        # Poisson operator with Dirichlet boundary conditions
+        self.mesh.setCellGradBC('dirichlet')
+        G = self.mesh.cellGrad
+        A = -G.T * self.mesh.getFaceInnerProduct() * G
+        self.dotest(A)
+        self.dotest(A, krylov='cg')
+        self.dotest(A, krylov=None, maxiter=100)
+
+    def test_nodal(self):
+        # Variable coefficients, first row fixed as in the DC problem
+        G = self.mesh.nodalGrad
+        sigma = np.exp(np.random.RandomState(7).randn(self.mesh.nC))
+        A = (G.T * self.mesh.getEdgeInnerProduct(sigma) * G).tolil()
+        A[0, :] = 0.
+        A[0, 0] = 1.
+        self.dotest(A.tocsr(), n_cpu=2)
+
+
+class TestSolverCache(unittest.TestCase):
+
+    def setUp(self):
+        M = TensorMesh([np.ones(8), np.ones(8)])
+        self.A = M.faceDiv * M.faceDiv.T + Utils.speye(M.nC)
+        self.B = self.A + sparse.diags(np.r_[1., np.zeros(M.nC-2)], 1)
+
+    def test_reuse(self):
+        counter = Utils.Counter()
+        cache = SolverCache(SolverLU, counter=counter, name='cache')
+        Ainv = cache.get(1, self.A)
+        self.assertIs(cache.get(1, lambda: self.A), Ainv)
+        # symmetric matrices share the factors for transposed solves
+        self.assertIs(cache.get(1, self.A, transpose=True), Ainv)
+        self.assertEqual(counter._countList['cache.hit'], 2)
+        self.assertEqual(counter._countList['cache.miss'], 1)
+        cache.clean()
+        self.assertEqual(len(cache), 0)
+
+    def test_transpose(self):
+        cache = SolverCache(SolverLU)
+        e = np.ones(self.B.shape[0])
+        x = cache.get(2, self.B, transpose=True) * (self.B.T * e)
+        self.assertLess(np.linalg.norm(x - e, np.inf), TOLD)
+        x = cache.get(2, self.B) * (self.B * e)
+        self.assertLess(np.linalg.norm(x - e, np.inf), TOLD)
+        self.assertEqual(len(cache), 2)
+
+    def test_eviction(self):
+        cache = SolverCache(SolverLU, maxMemory=1e-12)
+        cache.get(1, self.A)
+        cache.get(2, self.B)
+        # only the most recently used factor is kept
+        self.assertNotIn(1, cache)
+        self.assertIn(2, cache)
+
+    def test_hold(self):
+        cache = SolverCache(SolverLU, maxMemory=1e-12)
+        Ainv = cache.get(1, self.A, hold=True)
+        cache.get(2, self.B)
+        # held factors are not evicted
+        self.assertIn(1, cache)
+        x = Ainv * (self.A * np.ones(self.A.shape[0]))
+        self.assertLess(np.linalg.norm(x - 1., np.inf), TOLD)
+        cache.release(1)
+        self.assertNotIn(1, cache)
 
 
 if __name__ == '__main__':
@@ -110,5 +110,32 @@ class FDEM_CrossCheck(unittest.TestCase):
         def test_HJ_CrossCheck_hzi_Jform(self):
             self.assertTrue(crossCheckTest(SrcList, 'j', 'h', 'hzi', verbose=verbose))
 
+class FDEM_forwardOnly(unittest.TestCase):
+
+    def test_forwardOnly(self):
+        for fdemType, comp in [('e', 'bzi'), ('b', 'exr'), ('j', 'hzr')]:
+            prb = getFDEMProblem(fdemType, comp, SrcList, 1e2)
+            m = np.log(np.ones(prb.sigmaMap.nP)*1e-2)
+            d = prb.survey.dpred(m)
+
+            # data projected as each frequency is solved
+            prb.forwardOnly = True
+            data = prb.fields(m)
+            self.assertTrue(isinstance(data, prb.dataPair))
+            self.assertTrue(np.allclose(prb.survey.dpred(m), d, rtol=1e-10))
+
+            # the streamed data are evaluated by the receivers (which can be
+            # shared by the sources)
+            rxs = {id(rx): rx for src in prb.survey.srcList
+                   for rx in src.rxList}
+            for rx in rxs.values():
+                rx.eval = (
+                    lambda src, mesh, f, ev=rx.eval: 2.*ev(src, mesh, f)
+                )
+            self.assertTrue(
+                np.allclose(prb.survey.dpred(m), 2.*d, rtol=1e-10)
+            )
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,7 +1,7 @@
 from __future__ import print_function
 import unittest
 import numpy as np
-from SimPEG import EM
+from SimPEG import EM, Utils
 from scipy.constants import mu_0
 from SimPEG.EM.Utils.testingUtils import getFDEMProblem
 
@@ -46,7 +46,29 @@ def adjointTest(fdemType, comp):
     print(vJw, wJtv, vJw - wJtv, tol, np.abs(vJw - wJtv) < tol)
     return np.abs(vJw - wJtv) < tol
 
+def factorReuseTest(fdemType, comp):
+    prb = getFDEMProblem(fdemType, comp, SrcList, freq)
+    prb.counter = Utils.Counter()
+    name = '{}.Ainv'.format(prb.__class__.__name__)
+
+    m = np.log(np.ones(prb.sigmaMap.nP)*CONDUCTIVITY)
+    u = prb.fields(m)
+    prb.Jvec(m, np.random.rand(prb.mesh.nC), u)
+    prb.Jtvec(m, np.random.rand(prb.survey.nD), u)
+
+    # one factorization, shared by Jvec and Jtvec
+    counts = prb.counter._countList
+    return counts[name + '.miss'] == 1 and counts[name + '.hit'] == 2
+
+
 class FDEM_AdjointTests(unittest.TestCase):
+
+    def test_factorReuse_Eform(self):
+        self.assertTrue(factorReuseTest('e', 'exr'))
+
+    def test_factorReuse_Bform(self):
+        self.assertTrue(factorReuseTest('b', 'bzi'))
+
     if testE:
         def test_Jtvec_adjointTest_exr_Eform(self):
             self.assertTrue(adjointTest('e', 'exr'))
@@ -42,6 +42,32 @@ def JvecAdjointTest(sigmaHalf, formulation='PrimSec'):
     return np.abs(vJw - wJtv) < tol
 
 
+def ParallelTest(sigmaHalf, n_cpu=2):
+    survey, sigma, sigBG, m1d = NSEM.Utils.testUtils.setup1DSurvey(sigmaHalf,tD=False,structure=False)
+    problem = NSEM.Problem1D_ePrimSec(m1d, sigmaPrimary=sigBG, sigmaMap=Maps.IdentityMap(m1d))
+    problem.pair(survey)
+    m = sigma
+
+    np.random.seed(1983)
+    v = np.random.rand(survey.nD,)
+    w = np.random.rand(problem.mesh.nC,)
+
+    # serial
+    u = problem.fields(m)
+    d, Jw, Jtv = survey.dpred(m, u), problem.Jvec(m, w, u), problem.Jtvec(m, v, u)
+
+    # frequencies solved on a pool of threads, with a fresh set of factors
+    problem.n_cpu = n_cpu
+    problem.Ainv.clean()
+    u = problem.fields(m)
+    # the results are assembled in the same order as the serial loop
+    return (
+        np.all(survey.dpred(m, u) == d) and
+        np.all(problem.Jvec(m, w, u) == Jw) and
+        np.all(problem.Jtvec(m, v, u) == Jtv)
+    )
+
+
 class NSEM_1D_AdjointTests(unittest.TestCase):
 
     def setUp(self):
@@ -57,6 +83,7 @@ class NSEM_1D_AdjointTests(unittest.TestCase):
     # def test_JvecAdjoint_zyyr(self):self.assertTrue(JvecAdjointTest(random(1e-2),'zyyr',.1))
     # def test_JvecAdjoint_zyyi(self):self.assertTrue(JvecAdjointTest(random(1e-2),'zyyi',.1))
     def test_JvecAdjoint_All(self):self.assertTrue(JvecAdjointTest(1e-2))
+    def test_parallel_freqs(self):self.assertTrue(ParallelTest(1e-2))
 
 
 if __name__ == '__main__':
@@ -34,6 +34,8 @@ class DCProblemAnalyticTests_PDP(unittest.TestCase):
         self.mesh = mesh
         self.sigma = sigma
         self.data_ana = data_ana
+        self.A0loc = A0loc
+        self.sighalf = sighalf
         self.plotIt = False
 
         try:
@@ -80,6 +82,55 @@ class DCProblemAnalyticTests_PDP(unittest.TestCase):
         self.assertTrue(passed)
 
 
+    def test_Problem2D_N_optimized(self, tolerance=0.05):
+        problem = DC.Problem2D_N(
+            self.mesh, sigma=self.sigma, kyQuadrature='optimized'
+        )
+        problem.Solver = self.Solver
+        problem.pair(self.survey)
+        data = self.survey.dpred()
+        err = (
+            np.linalg.norm((data-self.data_ana) / self.data_ana)**2 /
+            self.data_ana.size
+        )
+        print(">> Optimized quadrature, expected error", problem.kyError)
+        self.assertTrue(problem.nky == 7)
+        self.assertTrue(np.all(problem.kyWeights >= 0.))
+        self.assertTrue(problem.kyError < 1e-3)
+        self.assertTrue(err < tolerance)
+
+    def test_optimized_weights(self, tolerance=1e-3):
+        from scipy.special import k0
+        problem = DC.Problem2D_N(
+            self.mesh, sigma=self.sigma, kyQuadrature='optimized'
+        )
+        problem.pair(self.survey)
+        kys, weights = problem.kys, problem.kyWeights
+        self.assertTrue(np.all(weights >= 0.))
+
+        # Potential of the pole source on the cells of the half-space, from
+        # the analytic 2D potentials K0(ky*r)/(pi*sigma)
+        r = np.linalg.norm(self.mesh.gridCC - self.A0loc, axis=1)
+        r = r[r >= self.mesh.hx.min()]
+        phi = k0(np.outer(r, kys)).dot(weights) / (np.pi**2 * self.sighalf)
+        phi_ana = 1. / (2. * np.pi * self.sighalf * r)
+        self.assertTrue(np.abs(phi/phi_ana - 1.).max() < tolerance)
+
+    def test_trapezoidal_weights(self):
+        problem = DC.Problem2D_N(self.mesh, sigma=self.sigma)
+        kys = problem.kys
+        weights = problem.kyWeights
+        u = np.random.rand(kys.size)
+
+        # Same as the loop of the trapezoidal rule
+        dky = np.diff(kys)
+        dky = np.r_[dky[0], dky]
+        phi = u[0]*dky[0]
+        for iky in range(1, kys.size):
+            phi += (u[iky] + u[iky-1])*dky[iky]/2.
+        self.assertTrue(np.allclose(weights.dot(u), phi))
+
+
 class DCProblemAnalyticTests_DPP(unittest.TestCase):
 
     def setUp(self):
@@ -89,6 +89,25 @@ class DCProblem_2DTestsCC(unittest.TestCase):
         )
         self.assertTrue(passed)
 
+    def test_parallel_kys(self):
+        # Same products when the wavenumbers are solved by several threads
+        problem = DC.Problem2D_CC(
+            self.mesh, rhoMap=Maps.IdentityMap(self.mesh),
+            Solver=Solver, n_cpu=3
+        )
+        self.survey.unpair()
+        problem.pair(self.survey)
+        v = np.random.rand(self.mesh.nC)
+        w = np.random.rand(self.survey.nD)
+        Jv = problem.Jvec(self.m0, v)
+        Jtw = problem.Jtvec(self.m0, w)
+        self.assertTrue(problem.Ainv is not self.p.Ainv)
+        self.survey.unpair()
+        self.p.pair(self.survey)
+
+        self.assertTrue(np.allclose(Jv, self.p.Jvec(self.m0, v)))
+        self.assertTrue(np.allclose(Jtw, self.p.Jtvec(self.m0, w)))
+
 
 class DCProblemTestsN(unittest.TestCase):
 
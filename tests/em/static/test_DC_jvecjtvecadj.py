@@ -1,8 +1,13 @@
 from __future__ import print_function
 import unittest
+import os
+import gc
+import glob
+import shutil
+import tempfile
 import numpy as np
 from SimPEG import (Mesh, Maps, DataMisfit, Regularization, Inversion,
-                    Optimization, InvProblem, Tests)
+                    Optimization, InvProblem, Tests, Utils)
 import SimPEG.EM.Static.DC as DC
 
 np.random.seed(40)
@@ -61,6 +66,85 @@ class DCProblemTestsCC(unittest.TestCase):
         )
         self.assertTrue(passed)
 
+    def test_factor_reuse(self):
+        counter = Utils.Counter()
+        self.p.counter = counter
+        count = lambda prop: counter._countList.get(
+            '{}.{}'.format(self.p.__class__.__name__, prop), 0
+        )
+
+        # Same model as the synthetic data: fields and factors are re-used
+        f = self.p.fields(self.m0)
+        self.assertIs(self.p.fields(self.m0.copy()), f)
+        Ainv = self.p.Ainv
+        self.p.Jvec(self.m0, np.random.rand(self.mesh.nC))
+        self.p.Jtvec(self.m0, np.random.rand(self.survey.nD))
+        self.assertIs(self.p.Ainv, Ainv)
+        self.assertEqual(count('Ainv.miss'), 0)
+        self.assertEqual(count('fields.miss'), 0)
+        self.assertEqual(count('fields.hit'), 4)
+
+        # New model: A is factored again
+        d0 = self.survey.dpred(self.m0)
+        m = self.m0 * 2.
+        self.assertIsNot(self.p.fields(m), f)
+        self.assertEqual(count('Ainv.miss'), 1)
+        self.assertTrue(np.allclose(self.survey.dpred(m), 2.*d0))
+        self.p.counter = None
+
+    def test_superposition(self):
+        survey = DC.Survey(DC.Utils.WennerSrcList(5, 2.5, in2D=True))
+        problem = DC.Problem3D_CC(
+            self.mesh, rhoMap=Maps.IdentityMap(self.mesh), superposition=True
+        )
+        problem.pair(survey)
+
+        m = self.m0 * (1. + np.random.rand(self.mesh.nC))
+        v = np.random.rand(self.mesh.nC)
+        w = np.random.rand(self.survey.nD)
+        self.assertTrue(np.allclose(survey.dpred(m), self.survey.dpred(m)))
+
+        # One pole solve per current and per potential electrode
+        locs, _, _, _ = problem.getElectrodes()
+        U, V, _ = problem.getElectrodeFields()
+        self.assertEqual(locs.shape[0], 5)
+        self.assertTrue(U.shape[1] <= 5 and V.shape[1] <= 5)
+
+        self.assertTrue(np.allclose(problem.Jvec(m, v), self.p.Jvec(m, v)))
+        self.assertTrue(np.allclose(problem.Jtvec(m, w), self.p.Jtvec(m, w)))
+        self.assertTrue(np.allclose(problem.getJ(m), self.p.getJ(m)))
+
+    def test_blocked_J(self):
+        path = tempfile.mkdtemp()
+        try:
+            # Blocks of 3 adjoint solves, J memory mapped on disk
+            problem = DC.Problem3D_CC(
+                self.mesh, rhoMap=Maps.IdentityMap(self.mesh),
+                maxBlockMemory=3*8*self.mesh.nC*1e-9, sensitivityPath=path
+            )
+            survey = DC.Survey(DC.Utils.WennerSrcList(5, 2.5, in2D=True))
+            problem.pair(survey)
+
+            m = self.m0 * (1. + np.random.rand(self.mesh.nC))
+            v = np.random.rand(self.mesh.nC)
+            w = np.random.rand(self.survey.nD)
+            J = problem.getJ(m)
+            self.assertTrue(isinstance(J, np.memmap))
+            self.assertEqual(J.shape, (self.survey.nD, self.mesh.nC))
+            self.assertTrue(np.allclose(J.dot(v), self.p.Jvec(m, v)))
+            self.assertTrue(np.allclose(J.T.dot(w), self.p.Jtvec(m, w)))
+            del J
+
+            # The file of the previous J is deleted when J is rebuilt
+            problem.model = m * 2.
+            problem.getJ(m * 2.)
+            self.assertEqual(len(glob.glob(os.path.join(path, 'J_*.npy'))), 1)
+            del problem._Jmatrix
+            gc.collect()
+            self.assertEqual(len(glob.glob(os.path.join(path, 'J_*.npy'))), 0)
+        finally:
+            shutil.rmtree(path)
+
     def test_adjoint(self):
         # Adjoint Test
         # u = np.random.rand(self.mesh.nC*self.survey.nSrc)
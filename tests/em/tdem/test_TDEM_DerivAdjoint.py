@@ -44,9 +44,9 @@ def get_mapping(mesh):
     )
 
 
-def get_prob(mesh, mapping, formulation):
+def get_prob(mesh, mapping, formulation, timeIntegrator='BE'):
     prb = getattr(EM.TDEM, 'Problem3D_{}'.format(formulation))(
-        mesh, sigmaMap=mapping
+        mesh, sigmaMap=mapping, timeIntegrator=timeIntegrator
     )
     prb.timeSteps = [(1e-05, 10), (5e-05, 10), (2.5e-4, 10)]
     prb.Solver = Solver
@@ -63,12 +63,16 @@ def get_survey():
 
 class Base_DerivAdjoint_Test(unittest.TestCase):
 
+    timeIntegrator = 'BE'
+
     @classmethod
     def setUpClass(self):
         # create a prob where we will store the fields
         mesh = get_mesh()
         mapping = get_mapping(mesh)
-        self.prob = get_prob(mesh, mapping, self.formulation)
+        self.prob = get_prob(
+            mesh, mapping, self.formulation, self.timeIntegrator
+        )
         self.survey = get_survey()
         self.m = (
             np.log(1e-1)*np.ones(self.prob.sigmaMap.nP) +
@@ -84,7 +88,9 @@ class Base_DerivAdjoint_Test(unittest.TestCase):
         # iteration
         mesh = get_mesh()
         mapping = get_mapping(mesh)
-        self.probfwd = get_prob(mesh, mapping, self.formulation)
+        self.probfwd = get_prob(
+            mesh, mapping, self.formulation, self.timeIntegrator
+        )
         self.surveyfwd = get_survey()
         self.probfwd.pair(self.surveyfwd)
 
@@ -400,5 +406,254 @@ class DerivAdjoint_J(Base_DerivAdjoint_Test):
         def test_Jvec_adjoint_j_dbdtz(self):
             self.JvecVsJtvecTest('dbdtz')
 
+
+class DerivAdjoint_B_BDF2(Base_DerivAdjoint_Test):
+
+    formulation = 'b'
+    timeIntegrator = 'BDF2'
+
+    if testDeriv:
+        def test_Jvec_b_bz(self):
+            self.JvecTest('bz')
+
+        def test_Jvec_b_dbdtz(self):
+            self.JvecTest('dbdtz')
+
+    if testAdjoint:
+        def test_Jvec_adjoint_b_bz(self):
+            self.JvecVsJtvecTest('bz')
+
+        def test_Jvec_adjoint_b_dbdtz(self):
+            self.JvecVsJtvecTest('dbdtz')
+
+
+class DerivAdjoint_E_BDF2(Base_DerivAdjoint_Test):
+
+    formulation = 'e'
+    timeIntegrator = 'BDF2'
+
+    if testDeriv:
+        def test_Jvec_e_dbzdt(self):
+            self.JvecTest('dbdtz')
+
+        def test_Jvec_e_ey(self):
+            self.JvecTest('ey')
+
+    if testAdjoint:
+        def test_Jvec_adjoint_e_dbdtz(self):
+            self.JvecVsJtvecTest('dbdtz')
+
+        def test_Jvec_adjoint_e_ey(self):
+            self.JvecVsJtvecTest('ey')
+
+
+class Checkpointed_Fields(unittest.TestCase):
+
+    def test_checkpointed(self):
+        for formulation, timeIntegrator in [
+            ('b', 'BE'), ('e', 'BE'), ('b', 'BDF2')
+        ]:
+            mesh = get_mesh()
+            mapping = get_mapping(mesh)
+            m = np.log(1e-1)*np.ones(mapping.nP)
+            rxtimes = np.logspace(-4, -3, 20)
+
+            out = []
+            for interval in [None, 'auto']:
+                prob = get_prob(mesh, mapping, formulation, timeIntegrator)
+                prob.checkpointInterval = interval
+                survey = get_survey()
+                for src in survey.srcList:
+                    src.rxList = [
+                        EM.TDEM.Rx.Point_dbdt(
+                            locs=np.array([[15., 0., -1e-2]]),
+                            times=rxtimes, orientation='z'
+                        )
+                    ]
+                prob.pair(survey)
+                f = prob.fields(m)
+                v = np.random.RandomState(1).rand(mapping.nP)
+                w = np.random.RandomState(2).rand(survey.nD)
+                dpred = survey.dpred(m, f=f)
+                if interval is not None:
+                    # the data are projected while checkpointing
+                    store = f._fields[prob._fieldType + 'Solution']
+                    self.assertEqual(store.nRecomputed, 0)
+                    # the receivers are projected during the sweeps, no
+                    # derivatives are stored for all the time steps
+                    prob.Fields_Derivs = None
+                out.append([
+                    dpred, prob.Jvec(m, v, f=f), prob.Jtvec(m, w, f=f)
+                ])
+
+            # only the checkpoints are stored, the other steps are recomputed
+            self.assertTrue(store.nCheckpoints < prob.nT + 1)
+            self.assertTrue(store.nRecomputed > 0)
+
+            for x, y in zip(*out):
+                self.assertTrue(np.allclose(x, y, rtol=1e-8))
+
+            # the projections of the time steps add up to the receiver
+            src = survey.srcList[0]
+            rx = src.rxList[0]
+            u = np.random.RandomState(3).rand(
+                rx.getP(mesh, prob.timeMesh, f).shape[1]
+            )
+            d = np.random.RandomState(4).rand(rx.nD)
+            uSteps = np.reshape(u, (-1, prob.nT+1), order='F')
+            self.assertTrue(np.allclose(
+                sum(
+                    rx.evalDeriv(
+                        src, mesh, prob.timeMesh, f, uSteps[:, tInd],
+                        tInd=tInd
+                    ) for tInd in range(prob.nT+1)
+                ),
+                rx.evalDeriv(src, mesh, prob.timeMesh, f, u)
+            ))
+            self.assertTrue(np.allclose(
+                np.hstack([
+                    rx.evalDeriv(
+                        src, mesh, prob.timeMesh, f, d, adjoint=True,
+                        tInd=tInd
+                    ) for tInd in range(prob.nT+1)
+                ]),
+                rx.evalDeriv(src, mesh, prob.timeMesh, f, d, adjoint=True)
+            ))
+
+    def test_sweeps(self):
+        # each step is recomputed once per sweep, also with BDF2 (the step
+        # before a checkpoint is stored with it)
+        for timeIntegrator, nPrev in [('BE', 1), ('BDF2', 2)]:
+            prob = MarchingProblem(timeIntegrator)
+            uAll = prob.march()
+            store = EM.TDEM.CheckpointedSolution(
+                prob, uAll.shape, prob.interval
+            )
+            for tInd in range(uAll.shape[2]):
+                store.setState(tInd, uAll[:, :, tInd])
+
+            tInds = range(uAll.shape[2])
+            for sweep in [tInds, tInds[::-1]]:
+                nRecomputed = store.nRecomputed
+                for tInd in sweep:
+                    # e.g. Jtvec at tInd needs the solutions at tInd and
+                    # at the nPrev steps before it
+                    for t in range(tInd, tInd-nPrev-1, -1):
+                        if t >= 0:
+                            self.assertTrue(np.allclose(
+                                store[:, :, t], uAll[:, :, t]
+                            ))
+                self.assertTrue(
+                    store.nRecomputed - nRecomputed <= uAll.shape[2]
+                )
+
+
+class MarchingProblem(object):
+    # linear time stepping of a few parameters, stands in for a TDEM problem
+    interval = 5
+    counter = None
+
+    def __init__(self, timeIntegrator, nP=3, nSrc=2, nT=23):
+        self.timeIntegrator = timeIntegrator
+        self.nT = nT
+        self.u0 = np.random.RandomState(3).rand(nP, nSrc)
+        self.A = np.random.RandomState(4).rand(nP, nP) / nP
+
+    def _timeStep(self, tInd, u, srcInd=slice(None), uPrev=None):
+        u = self.A.dot(u) + 1.
+        if self.timeIntegrator == 'BDF2' and tInd > 0:
+            u = u - 0.5 * uPrev
+        return u
+
+    def march(self):
+        u, uPrev = self.u0, None
+        states = [u]
+        for tInd in range(self.nT):
+            u, uPrev = self._timeStep(tInd, u, uPrev=uPrev), u
+            states.append(u)
+        return np.dstack(states)
+
+
+class Partitioned_Sources(unittest.TestCase):
+
+    def test_partitioned(self):
+        for formulation in ['b', 'e']:
+            mesh = get_mesh()
+            mapping = get_mapping(mesh)
+            m = np.log(1e-1)*np.ones(mapping.nP)
+            rxtimes = np.logspace(-4, -3, 20)
+
+            out = []
+            for n_cpu, interval in [(1, None), (2, None), (2, 'auto')]:
+                prob = get_prob(mesh, mapping, formulation)
+                prob.n_cpu = n_cpu
+                prob.checkpointInterval = interval
+                survey = get_survey()
+                for src in survey.srcList:
+                    src.rxList = [
+                        EM.TDEM.Rx.Point_dbdt(
+                            locs=np.array([[15., 0., -1e-2]]),
+                            times=rxtimes, orientation='z'
+                        )
+                    ]
+                prob.pair(survey)
+                f = prob.fields(m)
+                v = np.random.RandomState(1).rand(mapping.nP)
+                w = np.random.RandomState(2).rand(survey.nD)
+                out.append([
+                    survey.dpred(m, f=f), prob.Jvec(m, v, f=f),
+                    prob.Jtvec(m, w, f=f)
+                ])
+
+            # one source per worker, each with its own factors
+            self.assertTrue(any(
+                isinstance(key, tuple) and key[0] == 1
+                for key in prob.Adiaginv._factors
+            ))
+
+            for res in out[1:]:
+                for x, y in zip(out[0], res):
+                    self.assertTrue(np.allclose(x, y, rtol=1e-8))
+
+
+class Adaptive_TimeSteps(unittest.TestCase):
+
+    def test_adaptive(self):
+        mesh = get_mesh()
+        mapping = get_mapping(mesh)
+        m = np.log(1e-1)*np.ones(mapping.nP)
+        rxtimes = np.logspace(-4, -3, 20)
+
+        for timeIntegrator in ['BE', 'BDF2']:
+            prob = get_prob(mesh, mapping, 'b', timeIntegrator)
+            survey = get_survey()
+            for src in survey.srcList:
+                src.rxList = [
+                    EM.TDEM.Rx.Point_dbdt(
+                        locs=np.array([[15., 0., -1e-2]]),
+                        times=rxtimes, orientation='z'
+                    )
+                ]
+            prob.pair(survey)
+            dtMin = 1e-5
+            timeSteps = prob.adaptTimeSteps(m, tol=1e-2, dtMin=dtMin)
+
+            # steps are dtMin times powers of two and reach the last time
+            ratio = np.log2(timeSteps / dtMin)
+            self.assertTrue(np.allclose(ratio, np.round(ratio)))
+            self.assertTrue(timeSteps.sum() >= rxtimes.max())
+            self.assertTrue(np.any(timeSteps > dtMin))
+            self.assertTrue(len(set(
+                prob._dtKey(tInd) for tInd in range(prob.nT)
+            )) < prob.nT)
+
+            # the sensitivities are those of the chosen steps
+            f = prob.fields(m)
+            v = np.random.RandomState(1).rand(mapping.nP)
+            w = np.random.RandomState(2).rand(survey.nD)
+            V1 = w.dot(prob.Jvec(m, v, f=f))
+            V2 = v.dot(prob.Jtvec(m, w, f=f))
+            self.assertTrue(np.abs(V1 - V2) < TOL * (np.abs(V1) + np.abs(V2)))
+
 if __name__ == '__main__':
     unittest.main()
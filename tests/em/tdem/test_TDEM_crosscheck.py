@@ -155,5 +155,74 @@ class TDEM_cross_check_EB(unittest.TestCase):
                 orientation=np.r_[1., 1., 0.]
             )
 
+class TDEM_forwardOnly(unittest.TestCase):
+
+    def test_forwardOnly(self):
+        for prbtype, rxcomp in [('b', 'dbdtz'), ('e', 'ey'), ('h', 'jy')]:
+            prb, m, mesh = setUp_TDEM(prbtype, rxcomp)
+            d = prb.survey.dpred(m)
+
+            # data projected at each time step, the fields are not stored
+            prb.forwardOnly = True
+            data = prb.fields(m)
+            self.assertTrue(isinstance(data, prb.dataPair))
+            self.assertTrue(np.allclose(prb.survey.dpred(m), d, rtol=1e-10))
+
+
+class TDEM_FD(unittest.TestCase):
+
+    def setUp_FD(self, rxcomp):
+        prb, m, mesh = setUp_TDEM('b', rxcomp)
+        survey, mapping = prb.survey, prb.sigmaMap
+        d = survey.dpred(m)
+
+        prb.unpair()
+        prbFD = EM.TDEM.Problem3D_FD(mesh, sigmaMap=mapping, Solver=Solver)
+        prbFD.pair(survey)
+        return prbFD, m, d
+
+    def test_FD_time_stepping(self):
+        for rxcomp in ['bz', 'dbdtz']:
+            prbFD, m, d = self.setUp_FD(rxcomp)
+            dFD = prbFD.survey.dpred(m)
+            # backward Euler is first order in time
+            err = np.linalg.norm(dFD - d) / np.linalg.norm(d)
+            self.assertTrue(err < 0.05, '{}: {:e}'.format(rxcomp, err))
+
+    def test_FD_adjoint(self):
+        prbFD, m, _ = self.setUp_FD('dbdtz')
+        f = prbFD.fields(m)
+        v = np.random.rand(prbFD.sigmaMap.nP)
+        w = np.random.rand(prbFD.survey.nD)
+
+        wJv = w.dot(prbFD.Jvec(m, v, f=f))
+        vJtw = v.dot(prbFD.Jtvec(m, w, f=f))
+        self.assertTrue(np.abs(wJv - vJtw) < 1e-8 * np.abs(wJv))
+
+
+class TDEM_Transform(unittest.TestCase):
+
+    def transform(self, kind, noise=0.):
+        # int_0^inf cos(xt)/(1+x^2) dx = int_0^inf x sin(xt)/(1+x^2) dx
+        #   = pi/2 exp(-t)
+        a, w = EM.TDEM.Transform.digitalFilter(kind)
+        t = np.logspace(-1, 0.5, 16)
+        x = a[None, :] / t[:, None]
+        K = 1. / (1. + x**2)
+        if kind == 'sin':
+            K = x * K
+        K = K * (1. + noise * np.random.RandomState(0).randn(*K.shape))
+        d = np.sum(w[None, :] * K, axis=1) / t
+        return np.max(np.abs(d / (np.pi / 2. * np.exp(-t)) - 1.))
+
+    def test_filters(self):
+        for kind in ['cos', 'sin']:
+            _, w = EM.TDEM.Transform.digitalFilter(kind)
+            self.assertTrue(np.abs(w).max() < 10.)
+            self.assertTrue(self.transform(kind) < 1e-5)
+            # 1% noise on the responses
+            self.assertTrue(self.transform(kind, noise=0.01) < 0.1)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,6 +1,50 @@
 import unittest
 from SimPEG import Mesh, Utils, PF, Maps
 import numpy as np
+import scipy.sparse as sp
+import os
+import shutil
+import tempfile
+
+
+def gravityKernel(Xn, Yn, Zn, rxLoc):
+    # Kernel of one observation, the prism formula written out one corner
+    # at a time, independent of PF.Gravity
+    from scipy.constants import G as NewtG
+
+    NewtG = NewtG*1e+8
+    eps = 1e-8
+
+    dz = rxLoc[2] - Zn
+    dy = Yn - rxLoc[1]
+    dx = Xn - rxLoc[0]
+
+    tx, ty, tz = 0., 0., 0.
+    for aa in range(2):
+        for bb in range(2):
+            for cc in range(2):
+                sign = NewtG * (-1) ** aa * (-1) ** bb * (-1) ** cc
+                r = np.sqrt(dx[:, aa]**2 + dy[:, bb]**2 + dz[:, cc]**2)
+
+                tx = tx - sign * (
+                    dy[:, bb] * np.log(dz[:, cc] + r + eps) +
+                    dz[:, cc] * np.log(dy[:, bb] + r + eps) -
+                    dx[:, aa] * np.arctan(dy[:, bb] * dz[:, cc] /
+                                          (dx[:, aa] * r + eps)))
+
+                ty = ty - sign * (
+                    dx[:, aa] * np.log(dz[:, cc] + r + eps) +
+                    dz[:, cc] * np.log(dx[:, aa] + r + eps) -
+                    dy[:, bb] * np.arctan(dx[:, aa] * dz[:, cc] /
+                                          (dy[:, bb] * r + eps)))
+
+                tz = tz - sign * (
+                    dx[:, aa] * np.log(dy[:, bb] + r + eps) +
+                    dy[:, bb] * np.log(dx[:, aa] + r + eps) -
+                    dz[:, cc] * np.arctan(dx[:, aa] * dy[:, bb] /
+                                          (dz[:, cc] * r + eps)))
+
+    return tx, ty, tz
 
 
 class GravFwdProblemTests(unittest.TestCase):
@@ -82,6 +126,181 @@ class GravFwdProblemTests(unittest.TestCase):
 
         self.assertTrue(err_xyz < 0.005 and err_tmi < 0.005)
 
+    def test_blocked_G(self):
+
+        prob = PF.Gravity.GravityIntegral(self.prob_z.mesh,
+                                          rhoMap=self.prob_z.rhoMap,
+                                          actInd=self.prob_z.actInd,
+                                          maxBlockMemory=1e-5)
+        self.survey.pair(prob)
+        G = prob.Intrgl_Fwr_Op('xyz')
+
+        # Several blocks of observations
+        self.assertTrue(prob._blockSize(len(self.model), 3) < self.locXyz.shape[0])
+
+        # Same kernel as one observation at the time
+        inds = np.where(prob.actInd)[0]
+        xn, yn, zn = prob.mesh.vectorNx, prob.mesh.vectorNy, prob.mesh.vectorNz
+        yn2, xn2, zn2 = np.meshgrid(yn[1:], xn[1:], zn[1:])
+        yn1, xn1, zn1 = np.meshgrid(yn[0:-1], xn[0:-1], zn[0:-1])
+        Xn = np.c_[Utils.mkvc(xn1), Utils.mkvc(xn2)][inds, :]
+        Yn = np.c_[Utils.mkvc(yn1), Utils.mkvc(yn2)][inds, :]
+        Zn = np.c_[Utils.mkvc(zn1), Utils.mkvc(zn2)][inds, :]
+
+        ndata = self.locXyz.shape[0]
+        for ii in [0, ndata//2, ndata-1]:
+            tx, ty, tz = gravityKernel(Xn, Yn, Zn, self.locXyz[ii, :])
+            self.assertTrue(np.allclose(G[ii, :], tx, rtol=1e-12))
+            self.assertTrue(np.allclose(G[ii+ndata, :], ty, rtol=1e-12))
+            self.assertTrue(np.allclose(G[ii+2*ndata, :], tz, rtol=1e-12))
+
+        # Response of the sphere from the blocked G
+        ga = np.hstack(PF.GravAnalytics.GravSphereFreeSpace(
+            self.locXyz[:, 0], self.locXyz[:, 1], self.locXyz[:, 2],
+            self.rad, 0, 0, 0, self.rho
+        ))
+        d = G.dot(self.model)
+        self.assertTrue(np.linalg.norm(d - ga) < 0.005*np.linalg.norm(ga))
+
+    def test_compressed_G(self):
+
+        prob = PF.Gravity.GravityIntegral(self.prob_z.mesh,
+                                          rhoMap=self.prob_z.rhoMap,
+                                          actInd=self.prob_z.actInd)
+        self.survey.pair(prob)
+        G = prob.G
+        self.survey.unpair()
+
+        tol = 1e-2
+        prob = PF.Gravity.GravityIntegral(self.prob_z.mesh,
+                                          rhoMap=self.prob_z.rhoMap,
+                                          actInd=self.prob_z.actInd,
+                                          compressionTol=tol)
+        self.survey.pair(prob)
+        Gc = prob.G
+
+        self.assertTrue(sp.issparse(Gc))
+        self.assertTrue(prob.compressionRatio > 1.)
+        self.assertTrue(prob.compressionError <= tol)
+
+        # Error controlled on each row
+        err = (np.linalg.norm(G - Gc.toarray(), axis=1) /
+               np.linalg.norm(G, axis=1))
+        self.assertTrue(np.all(err <= tol*(1. + 1e-8)))
+
+        # Same interface as the dense G
+        v = np.random.rand(G.shape[1])
+        w = np.random.rand(G.shape[0])
+        Jv = prob.Jvec(self.model, v)
+        Jtw = prob.Jtvec(self.model, w)
+        nG = np.linalg.norm(G)
+        self.assertTrue(np.linalg.norm(Jv - G.dot(v)) <= tol*nG*np.linalg.norm(v))
+        self.assertTrue(np.linalg.norm(Jtw - G.T.dot(w)) <= tol*nG*np.linalg.norm(w))
+        self.assertTrue(np.allclose(prob.getJtJdiag(self.model),
+                                    (Gc.toarray()**2.).sum(axis=0)))
+
+    def test_matrix_free_G(self):
+
+        prob = PF.Gravity.GravityIntegral(self.prob_z.mesh,
+                                          rhoMap=self.prob_z.rhoMap,
+                                          actInd=self.prob_z.actInd)
+        self.survey.pair(prob)
+        G = prob.G
+        self.survey.unpair()
+
+        # Receivers on a regular grid, G is applied by FFT convolutions
+        prob = PF.Gravity.GravityIntegral(self.prob_z.mesh,
+                                          rhoMap=self.prob_z.rhoMap,
+                                          actInd=self.prob_z.actInd,
+                                          matrixFree=True)
+        self.survey.pair(prob)
+        self.assertTrue(isinstance(prob.G, PF.Convolution.ConvolutionOperator))
+        self.assertEqual(self.survey.nD, G.shape[0])
+
+        v = np.random.rand(G.shape[1])
+        w = np.random.rand(G.shape[0])
+        self.assertTrue(np.allclose(prob.fields(self.model), G.dot(self.model)))
+        self.assertTrue(np.allclose(prob.Jvec(self.model, v), G.dot(v)))
+        self.assertTrue(np.allclose(prob.Jtvec(self.model, w), G.T.dot(w)))
+
+        W = sp.diags(np.random.rand(G.shape[0]))
+        self.assertTrue(np.allclose(prob.getJtJdiag(self.model, W=W),
+                                    ((W*G)**2.).sum(axis=0)))
+
+    def test_tree_mesh(self):
+
+        # Octree refined at the center, on the base of a tensor mesh
+        h = 0.5*np.ones(16)
+        tensor = Mesh.TensorMesh([h, h, h], x0='CCC')
+        tree = Mesh.TreeMesh([h, h, h], x0='CCC')
+        tree.insert_cells(np.zeros((1, 3)), np.r_[tree.max_level],
+                          finalize=False)
+        tree.finalize()
+        self.assertTrue(tree.nC < tensor.nC)
+
+        G = {}
+        for mesh in [tensor, tree]:
+            prob = PF.Gravity.GravityIntegral(
+                mesh, rhoMap=Maps.IdentityMap(nP=mesh.nC)
+            )
+            self.survey.pair(prob)
+            G[mesh._meshType] = prob.Intrgl_Fwr_Op('xyz')
+            self.survey.unpair()
+
+        # The kernel of an octree cell is the sum of the kernels of the
+        # tensor cells it contains
+        Xn, Yn, Zn = Utils.cellBounds(tree)
+        cc = tensor.gridCC
+        A = np.vstack([
+            (cc[:, 0] > Xn[i, 0]) & (cc[:, 0] < Xn[i, 1]) &
+            (cc[:, 1] > Yn[i, 0]) & (cc[:, 1] < Yn[i, 1]) &
+            (cc[:, 2] > Zn[i, 0]) & (cc[:, 2] < Zn[i, 1])
+            for i in range(tree.nC)
+        ]).T.astype(float)
+        self.assertTrue(np.all(A.sum(axis=1) == 1.))
+
+        err = np.abs(G['TREE'] - G['TENSOR'].dot(A)).max()
+        self.assertTrue(err < 1e-10*np.abs(G['TREE']).max())
+
+    def test_sensitivity_on_disk(self):
+
+        path = tempfile.mkdtemp()
+        try:
+            prob = PF.Gravity.GravityIntegral(self.prob_z.mesh,
+                                              rhoMap=self.prob_z.rhoMap,
+                                              actInd=self.prob_z.actInd)
+            self.survey.pair(prob)
+            G = prob.G
+            self.survey.unpair()
+
+            # G written to disk, rows streamed by small blocks
+            prob = PF.Gravity.GravityIntegral(self.prob_z.mesh,
+                                              rhoMap=self.prob_z.rhoMap,
+                                              actInd=self.prob_z.actInd,
+                                              sensitivityPath=path,
+                                              maxBlockMemory=1e-5)
+            self.survey.pair(prob)
+            self.assertTrue(isinstance(prob.G, np.memmap))
+            self.assertTrue(np.all(prob.G == G))
+
+            v = np.random.rand(G.shape[1])
+            w = np.random.rand(G.shape[0])
+            self.assertTrue(np.allclose(prob.Jvec(self.model, v), G.dot(v)))
+            self.assertTrue(np.allclose(prob.Jtvec(self.model, w), G.T.dot(w)))
+            self.survey.unpair()
+
+            # A new problem on the same mesh and survey re-uses the file
+            prob = PF.Gravity.GravityIntegral(self.prob_z.mesh,
+                                              rhoMap=self.prob_z.rhoMap,
+                                              actInd=self.prob_z.actInd,
+                                              sensitivityPath=path)
+            self.survey.pair(prob)
+            self.assertTrue(np.all(prob.G == G))
+            self.assertEqual(len(os.listdir(path)), 1)
+
+        finally:
+            shutil.rmtree(path)
+
 
 if __name__ == '__main__':
     unittest.main()
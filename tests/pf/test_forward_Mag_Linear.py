@@ -88,6 +88,111 @@ class MagFwdProblemTests(unittest.TestCase):
         err_tmi = np.linalg.norm(dtmi-btmi)/np.linalg.norm(btmi)
         self.assertTrue(err_xyz < 0.005 and err_tmi < 0.005)
 
+    def test_parallel_G(self):
+
+        mesh = self.prob_tmi.mesh
+        chiMap = self.prob_tmi.chiMap
+        actInd = self.prob_tmi.actInd
+
+        # Serial sensitivity
+        prob = PF.Magnetics.MagneticIntegral(mesh, chiMap=chiMap,
+                                             actInd=actInd)
+        self.survey.pair(prob)
+        G = prob.G
+        self.survey.unpair()
+
+        # Same rows computed by a pool of processes, with progress reported
+        # to a callback
+        done = []
+        prob = PF.Magnetics.MagneticIntegral(
+            mesh, chiMap=chiMap, actInd=actInd, n_cpu=2,
+            progressCallback=lambda nDone, ndata: done.append(nDone)
+        )
+        self.survey.pair(prob)
+
+        self.assertTrue(np.all(prob.G == G))
+        self.assertEqual(done[-1], self.locXyz.shape[0])
+        self.assertTrue(np.all(np.diff(done) > 0))
+
+        # Forward only data
+        prob = PF.Magnetics.MagneticIntegral(mesh, chiMap=chiMap,
+                                             actInd=actInd, n_cpu=2,
+                                             forwardOnly=True, rtype='tmi')
+        self.survey.unpair()
+        self.survey.pair(prob)
+        self.assertTrue(np.allclose(prob.fields(self.model), G.dot(self.model)))
+
+    def test_matrix_free_G(self):
+
+        mesh = self.prob_tmi.mesh
+        chiMap = self.prob_tmi.chiMap
+        actInd = self.prob_tmi.actInd
+
+        nC = len(self.model)
+        for probType, nP in [('MagneticIntegral', nC),
+                             ('MagneticVector', 3*nC)]:
+            idenMap = Maps.IdentityMap(nP=nP)
+            prob = getattr(PF.Magnetics, probType)(mesh, chiMap=idenMap,
+                                                   actInd=actInd)
+            self.survey.pair(prob)
+            G = prob.G
+            self.survey.unpair()
+
+            # The survey is gridded, G is applied by FFT convolutions
+            prob = getattr(PF.Magnetics, probType)(mesh, chiMap=idenMap,
+                                                   actInd=actInd,
+                                                   matrixFree=True)
+            self.survey.pair(prob)
+            self.assertTrue(isinstance(prob.G,
+                                       PF.Convolution.ConvolutionOperator))
+
+            v = np.random.rand(G.shape[1])
+            w = np.random.rand(G.shape[0])
+            self.assertTrue(np.allclose(prob.Jvec(v, v), G.dot(v)))
+            self.assertTrue(np.allclose(prob.Jtvec(v, w), G.T.dot(w)))
+            if probType == 'MagneticIntegral':
+                self.assertTrue(np.allclose(prob.getJtJdiag(self.model),
+                                            (G**2.).sum(axis=0)))
+            self.survey.unpair()
+
+        # Irregular receivers fall back to the stored G
+        locs = self.locXyz + np.random.rand(*self.locXyz.shape)*0.1
+        survey = PF.BaseMag.LinearSurvey(
+            PF.BaseMag.SrcField([PF.BaseMag.RxObs(locs)],
+                                param=self.survey.srcField.param)
+        )
+        prob = PF.Magnetics.MagneticIntegral(mesh, chiMap=chiMap,
+                                             actInd=actInd, matrixFree=True)
+        survey.pair(prob)
+        self.assertTrue(isinstance(prob.G, np.ndarray))
+
+    def test_amplitude_map(self):
+
+        mesh = self.prob_tmi.mesh
+        actInd = self.prob_tmi.actInd
+        nC = len(self.model)
+
+        # Amplitude data of the susceptibility, inverted for directly or
+        # for its logarithm
+        d = []
+        for chiMap, m in [(Maps.IdentityMap(nP=nC), self.model),
+                          (Maps.ExpMap(nP=nC), np.log(self.model))]:
+            prob = PF.Magnetics.MagneticAmplitude(mesh, chiMap=chiMap,
+                                                  actInd=actInd)
+            self.survey.pair(prob)
+            d.append(prob.fields(m))
+
+            # The sensitivity is the derivative of the data
+            v = np.random.RandomState(0).rand(nC)*1e-2
+            h = 1e-2
+            Jv = prob.Jvec(m, v)
+            dd = (prob.fwr_ind(m + h*v) - prob.fwr_ind(m - h*v))/(2.*h)
+            self.assertTrue(np.linalg.norm(Jv - dd) <
+                            1e-3*np.linalg.norm(Jv))
+            self.survey.unpair()
+
+        self.assertTrue(np.allclose(d[0], d[1]))
+
 
 if __name__ == '__main__':
     unittest.main()
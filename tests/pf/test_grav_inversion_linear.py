@@ -18,6 +18,8 @@ np.random.seed(43)
 
 class GravInvLinProblemTest(unittest.TestCase):
 
+    dtype = np.float64
+
     def setUp(self):
 
         ndv = -100
@@ -79,7 +81,8 @@ class GravInvLinProblemTest(unittest.TestCase):
         prob = PF.Gravity.GravityIntegral(
             self.mesh,
             rhoMap=idenMap,
-            actInd=actv
+            actInd=actv,
+            dtype=self.dtype
         )
 
         # Pair the survey and problem
@@ -150,5 +153,17 @@ class GravInvLinProblemTest(unittest.TestCase):
 
         self.assertTrue(residual < 0.05)
 
+
+class GravInvLinProblemTestFloat32(GravInvLinProblemTest):
+
+    # Sensitivity stored in single precision
+    dtype = np.float32
+
+    def test_grav_inverse(self):
+
+        self.assertEqual(self.inv.invProb.dmisfit.prob.G.dtype, np.float32)
+        super(GravInvLinProblemTestFloat32, self).test_grav_inverse()
+
+
 if __name__ == '__main__':
     unittest.main()
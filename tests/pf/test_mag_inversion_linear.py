@@ -16,6 +16,8 @@ import matplotlib.pyplot as plt
 
 class MagInvLinProblemTest(unittest.TestCase):
 
+    dtype = np.float64
+
     def setUp(self):
 
         np.random.seed(0)
@@ -79,7 +81,7 @@ class MagInvLinProblemTest(unittest.TestCase):
 
         # Create the forward model operator
         prob = PF.Magnetics.MagneticIntegral(self.mesh, chiMap=idenMap,
-                                             actInd=actv)
+                                             actInd=actv, dtype=self.dtype)
 
         # Pair the survey and problem
         survey.pair(prob)
@@ -147,5 +149,17 @@ class MagInvLinProblemTest(unittest.TestCase):
         self.assertTrue(residual < 0.05)
         # self.assertTrue(residual < 0.05)
 
+
+class MagInvLinProblemTestFloat32(MagInvLinProblemTest):
+
+    # Sensitivity stored in single precision
+    dtype = np.float32
+
+    def test_mag_inverse(self):
+
+        self.assertEqual(self.inv.invProb.dmisfit.prob.G.dtype, np.float32)
+        super(MagInvLinProblemTestFloat32, self).test_mag_inverse()
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,198 @@
+import unittest
+from SimPEG import (
+    Mesh, Utils, PF, Maps, Regularization, Optimization, InvProblem,
+    Directives, Inversion
+)
+import numpy as np
+
+
+class TiledGravityTests(unittest.TestCase):
+
+    def setUp(self):
+
+        # Tensor mesh with padding, below a flat topography
+        dx = 5.
+        hxind = [(dx, 3, -1.3), (dx, 12), (dx, 3, 1.3)]
+        hzind = [(dx, 3, -1.3), (dx, 8)]
+        self.mesh = Mesh.TensorMesh([hxind, hxind, hzind], 'CCN')
+        self.actv = np.where(self.mesh.gridCC[:, 2] < 0.)[0]
+
+        # Block in a half-space
+        cc = self.mesh.gridCC[self.actv, :]
+        self.model = np.zeros(self.actv.size)
+        self.model[
+            (np.abs(cc[:, 0] - 5.) < 10.) & (np.abs(cc[:, 1]) < 10.) &
+            (cc[:, 2] > -25.) & (cc[:, 2] < -10.)
+        ] = 0.5
+
+        xr = np.linspace(-25., 25., 10)
+        X, Y = np.meshgrid(xr, xr)
+        self.locXyz = np.c_[Utils.mkvc(X), Utils.mkvc(Y),
+                            np.ones(X.size)*2.5]
+
+        # Data of the global problem
+        survey = PF.BaseGrav.LinearSurvey(
+            PF.BaseGrav.SrcField([PF.BaseGrav.RxObs(self.locXyz)])
+        )
+        prob = PF.Gravity.GravityIntegral(
+            self.mesh, rhoMap=Maps.IdentityMap(nP=self.actv.size),
+            actInd=self.actv
+        )
+        survey.pair(prob)
+        self.G = prob.G
+        survey.dobs = prob.fields(self.model)
+        survey.std = np.ones(survey.nD)*1e-3
+        self.survey = survey
+
+        self.dmis = PF.Tiles.tiledMisfit(
+            PF.Gravity.GravityIntegral, self.mesh, survey, actInd=self.actv,
+            maxData=30, n_cpu=2
+        )
+
+    def test_tiles(self):
+
+        # Every receiver in one tile
+        tiles = self.dmis.tiles
+        self.assertEqual(len(tiles), len(self.dmis.objfcts))
+        self.assertTrue(all(len(ind) <= 30 for ind in tiles))
+        self.assertTrue(np.all(np.sort(np.hstack(tiles)) ==
+                               np.arange(self.locXyz.shape[0])))
+
+        for ind, dmis in zip(tiles, self.dmis.objfcts):
+            prob = dmis.prob
+
+            # Local meshes are smaller than the global mesh
+            self.assertTrue(prob.G.shape[1] < self.actv.size)
+
+            # The mass of the model is kept on the local mesh
+            tileMap = prob.rhoMap
+            vol = Utils.mkvc(tileMap.meshLocal.vol)[tileMap.activeLocal]
+            self.assertTrue(np.allclose(
+                np.sum(vol*(tileMap*self.model)),
+                np.sum(Utils.mkvc(self.mesh.vol)[self.actv]*self.model)
+            ))
+
+            # Data close to the data of the global mesh
+            d = prob.fields(self.model)
+            dG = self.G[ind, :].dot(self.model)
+            self.assertTrue(np.linalg.norm(d - dG) < 0.02*np.linalg.norm(dG))
+
+            # Diagonal of J.T*W.T*W*J on the global model
+            J = dmis.W * (prob.G * tileMap.P)
+            self.assertTrue(np.allclose(prob.getJtJdiag(self.model, W=dmis.W),
+                                        (J**2.).sum(axis=0)))
+
+    def test_misfit(self):
+
+        # Threaded sum of the misfits of the tiles
+        m = np.random.rand(self.actv.size)*0.1
+        v = np.random.rand(self.actv.size)
+        f = self.dmis.fields(m)
+
+        phi, g, H = 0., 0., 0.
+        for dmis in self.dmis.objfcts:
+            phi += dmis(m)
+            g += dmis.deriv(m)
+            H += dmis.deriv2(m, v)
+
+        self.assertTrue(np.allclose(self.dmis(m, f=f), phi))
+        self.assertTrue(np.allclose(self.dmis.deriv(m, f=f), g))
+        self.assertTrue(np.allclose(self.dmis.deriv2(m, v, f=f), H))
+
+    def test_inversion(self):
+
+        # Sparse inversion of the tiles, weighted by their sensitivities
+        idenMap = Maps.IdentityMap(nP=self.actv.size)
+        reg = Regularization.Sparse(
+            self.mesh, indActive=self.actv, mapping=idenMap
+        )
+        reg.norms = np.c_[0, 0, 0, 0]
+        opt = Optimization.ProjectedGNCG(
+            maxIter=20, lower=-1., upper=1., maxIterLS=20, maxIterCG=10,
+            tolCG=1e-3
+        )
+        invProb = InvProblem.BaseInvProblem(self.dmis, reg, opt)
+        updateSensW = Directives.UpdateSensitivityWeights(everyIter=False)
+        IRLS = Directives.Update_IRLS(
+            f_min_change=1e-4, minGNiter=1, maxIRLSiter=5
+        )
+        inv = Inversion.BaseInversion(invProb, directiveList=[
+            updateSensW, IRLS, Directives.BetaEstimate_ByEig(),
+            Directives.UpdatePreconditioner()
+        ])
+
+        m0 = np.ones(self.actv.size)*1e-4
+        phi0 = self.dmis(m0)
+        mrec = inv.run(m0)
+        self.assertTrue(self.dmis(mrec) < 1e-2*phi0)
+
+        # Sensitivities of the tiles, on the global model
+        JtJ = 0.
+        for dmis in self.dmis.objfcts:
+            J = dmis.W * (dmis.prob.G * dmis.prob.rhoMap.P)
+            JtJ += (J**2.).sum(axis=0)
+        self.assertTrue(np.allclose(sum(updateSensW.JtJdiag), JtJ))
+
+
+class TiledMagneticTests(unittest.TestCase):
+
+    def test_components(self):
+
+        dx = 5.
+        hxind = [(dx, 3, -1.3), (dx, 12), (dx, 3, 1.3)]
+        hzind = [(dx, 3, -1.3), (dx, 8)]
+        mesh = Mesh.TensorMesh([hxind, hxind, hzind], 'CCN')
+        actv = np.where(mesh.gridCC[:, 2] < 0.)[0]
+
+        cc = mesh.gridCC[actv, :]
+        model = np.zeros(actv.size)
+        model[
+            (np.abs(cc[:, 0] - 5.) < 10.) & (np.abs(cc[:, 1]) < 10.) &
+            (cc[:, 2] > -25.) & (cc[:, 2] < -10.)
+        ] = 0.05
+
+        xr = np.linspace(-25., 25., 10)
+        X, Y = np.meshgrid(xr, xr)
+        locXyz = np.c_[Utils.mkvc(X), Utils.mkvc(Y), np.ones(X.size)*2.5]
+        nRx = locXyz.shape[0]
+
+        # Total field data, or the three components stacked [x, y, z]
+        for rxType, nComp in [('tmi', 1), ('xyz', 3)]:
+            rx = PF.BaseMag.RxObs(locXyz)
+            rx.rxType = rxType
+            survey = PF.BaseMag.LinearSurvey(
+                PF.BaseMag.SrcField([rx], param=(50000., 60., 30.))
+            )
+            prob = PF.Magnetics.MagneticIntegral(
+                mesh, chiMap=Maps.IdentityMap(nP=actv.size), actInd=actv
+            )
+            survey.pair(prob)
+            G = prob.G
+            survey.dobs = prob.fields(model)
+            survey.std = np.arange(survey.dobs.size)*1e-3 + 1.
+            self.assertEqual(survey.dobs.size, nComp*nRx)
+
+            dmis = PF.Tiles.tiledMisfit(
+                PF.Magnetics.MagneticIntegral, mesh, survey, actInd=actv,
+                maxData=30, n_cpu=2
+            )
+            for ind, tile in zip(dmis.tiles, dmis.objfcts):
+                dataInd = np.hstack([ind + k*nRx for k in range(nComp)])
+
+                # Data and uncertainties of the receivers of the tile
+                self.assertTrue(np.all(tile.survey.dobs ==
+                                       survey.dobs[dataInd]))
+                self.assertTrue(np.all(tile.survey.std ==
+                                       survey.std[dataInd]))
+
+                # Data close to the data of the global mesh
+                d = tile.prob.fields(model)
+                dG = G[dataInd, :].dot(model)
+                self.assertEqual(d.size, dataInd.size)
+                self.assertTrue(
+                    np.linalg.norm(d - dG) < 0.02*np.linalg.norm(dG)
+                )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,162 @@
+import unittest
+from SimPEG import Mesh, Utils, PF
+import numpy as np
+import scipy.sparse as sp
+import os
+import shutil
+import tempfile
+
+
+def loopDistanceWeighting(mesh, rxLoc, inds, R, R0):
+    # distance weighting looping over the receivers
+    p = 1/np.sqrt(3)
+    Xm, Ym, Zm = [mesh.gridCC[inds, dim] for dim in range(3)]
+    hX, hY, hZ = [mesh.h_gridded[inds, dim] for dim in range(3)]
+    V = mesh.vol[inds]
+
+    wr = np.zeros(inds.size)
+    for dd in range(rxLoc.shape[0]):
+        temp = 0.
+        for x in [Xm - hX*p, Xm + hX*p]:
+            for y in [Ym - hY*p, Ym + hY*p]:
+                for z in [Zm - hZ*p, Zm + hZ*p]:
+                    r = np.sqrt(
+                        (x - rxLoc[dd, 0])**2 + (y - rxLoc[dd, 1])**2 +
+                        (z - rxLoc[dd, 2])**2
+                    )
+                    temp = temp + (r + R0)**-R
+        wr = wr + (V*temp/8.)**2.
+
+    wr = np.sqrt(wr)/V
+    return np.sqrt(wr/np.max(wr))
+
+
+class WeightingTests(unittest.TestCase):
+
+    def setUp(self):
+
+        h = [(5., 3, -1.3), (5., 6), (5., 3, 1.3)]
+        self.mesh = Mesh.TensorMesh([h, h, h], 'CCN')
+        self.actv = self.mesh.gridCC[:, 2] < 0.
+        self.inds = np.where(self.actv)[0]
+
+        xr = np.linspace(-15., 15., 7)
+        X, Y = np.meshgrid(xr, xr)
+        self.rxLoc = np.c_[Utils.mkvc(X), Utils.mkvc(Y), np.ones(X.size)*2.5]
+
+    def test_distance(self):
+
+        wr = PF.Weighting.distanceWeighting(
+            self.mesh, self.rxLoc, actInd=self.actv, exponent=3., R0=1.
+        )
+        self.assertTrue(np.allclose(
+            wr, loopDistanceWeighting(self.mesh, self.rxLoc, self.inds, 3., 1.)
+        ))
+
+        # Small blocks of receivers, shared by threads
+        wrBlocks = PF.Magnetics.get_dist_wgt(
+            self.mesh, self.rxLoc, self.actv, 3., 1.,
+            maxBlockMemory=1e-5, n_cpu=2
+        )
+        self.assertTrue(np.allclose(wr, wrBlocks))
+
+    def test_tree_mesh(self):
+
+        # Octree with the cells of the tensor mesh
+        h = 5.*np.ones(8)
+        tensor = Mesh.TensorMesh([h, h, h], x0='CCC')
+        tree = Mesh.TreeMesh([h, h, h], x0=tensor.x0)
+        tree.refine(tree.max_level)
+
+        actv = tensor.gridCC[:, 2] < 0.
+        actvTree = tree.gridCC[:, 2] < 0.
+
+        # Same cells, in another order
+        order = np.lexsort(tree.gridCC[actvTree, :].T[::-1])
+        orderTensor = np.lexsort(tensor.gridCC[actv, :].T[::-1])
+
+        for weighting in [
+            lambda mesh, act: PF.Weighting.distanceWeighting(
+                mesh, self.rxLoc, actInd=act, exponent=2., R0=1.
+            ),
+            lambda mesh, act: PF.Weighting.depthWeighting(
+                mesh, self.rxLoc, actInd=act, exponent=2.
+            )
+        ]:
+            self.assertTrue(np.allclose(
+                weighting(tree, actvTree)[order],
+                weighting(tensor, actv)[orderTensor]
+            ))
+
+    def test_depth(self):
+
+        wr = PF.Weighting.depthWeighting(
+            self.mesh, 2.5, actInd=self.actv, exponent=3., threshold=1.
+        )
+        z = self.mesh.gridCC[self.inds, 2]
+        wz = (2.5 - z + 1.)**-1.5
+        self.assertTrue(np.allclose(wr, wz/wz.max()))
+
+        # Reference elevation from the receivers
+        wrRx = PF.Weighting.depthWeighting(
+            self.mesh, self.rxLoc, actInd=self.actv, exponent=3.,
+            threshold=1.
+        )
+        self.assertTrue(np.allclose(wr, wrRx))
+
+    def test_sensitivity(self):
+
+        G = np.random.randn(20, self.inds.size)
+        W = Utils.sdiag(np.random.rand(20) + 0.5)
+        JtJ = np.sum((W*G)**2., axis=0)
+        wr = np.sqrt(JtJ + 1e-12)
+        wr /= wr.max()
+
+        self.assertTrue(np.allclose(
+            PF.Weighting.sensitivityWeighting(G, W=W), wr
+        ))
+        self.assertTrue(np.allclose(
+            PF.Weighting.sensitivityWeighting(sp.csr_matrix(G), W=W), wr
+        ))
+
+        # Memory mapped G, squared by blocks of rows
+        path = tempfile.mkdtemp()
+        try:
+            Gmap = np.memmap(
+                os.path.join(path, 'G.dat'), dtype=np.float64, mode='w+',
+                shape=G.shape
+            )
+            Gmap[:] = G
+            self.assertTrue(np.allclose(
+                PF.Weighting.sensitivityWeighting(
+                    Gmap, W=W, maxBlockMemory=1e-6
+                ), wr
+            ))
+            del Gmap
+        finally:
+            shutil.rmtree(path)
+
+    def test_sensitivity_map(self):
+
+        G = np.random.randn(20, self.inds.size)
+        W = Utils.sdiag(np.random.rand(20) + 0.5)
+
+        # Derivative of a map that is not a projection, applied to blocks of
+        # rows of G
+        D = sp.random(
+            self.inds.size, 30, density=0.2, format='csr',
+            random_state=np.random.RandomState(0)
+        )
+        JtJ = np.sum((W*G*D)**2., axis=0)
+        for Dk in [D, D.toarray()]:
+            self.assertTrue(np.allclose(
+                PF.Sensitivity.JtJdiag(G, W=W, D=Dk, maxBlockMemory=1e-6),
+                JtJ
+            ))
+        self.assertTrue(np.allclose(
+            PF.Sensitivity.JtJdiag(sp.csr_matrix(G), W=W, D=D), JtJ
+        ))
+
+
+if __name__ == '__main__':
+    unittest.main()